@@ -1,12 +1,20 @@
 # -*- mode: python ; coding: utf-8 -*-
+import tomllib
+
+# Вшиваем версию в сборку, чтобы приложение не читало pyproject.toml при запуске
+# (см. utils/get_version.py). Файл генерируется и не хранится в git.
+with open('pyproject.toml', 'rb') as f:
+    _version = tomllib.load(f)['project']['version']
+with open('utils/_build_version.py', 'w', encoding='utf-8') as f:
+    f.write(f'VERSION = {_version!r}\n')
 
 
 a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[('pyproject.toml', '.')],
-    hiddenimports=[],
+    datas=[],
+    hiddenimports=['utils._build_version'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -1,12 +1,17 @@
-import os, sys, json
-import swatch
-import configparser
+import os, sys
+
+from models.ase_parser import read_ase
+from models.json_io import write_blocks_json
+
 
 def decrypt(input_ase, output_json):
-    items = swatch.parse(input_ase)
+    """
+    Конвертирует ASE в JSON (формат swatch.parse). Блоки читаются и пишутся
+    по одному, поэтому файл любого размера не держится в памяти целиком.
+    """
     with open(output_json, 'w', encoding='utf-8') as f:
-        json.dump(items, f, ensure_ascii=False, indent=2)
-    print(f"✅ Saved {len(items)} swatches/palettes to {output_json}")
+        items, _ = write_blocks_json(read_ase(input_ase), f)
+    print(f"✅ Saved {items} swatches/palettes to {output_json}")
 
 
 if __name__ == '__main__':
@@ -1,18 +1,33 @@
 #!/usr/bin/env python3
-import sys, json
-import swatch
+import sys
 import configparser
 
+from models.ase_parser import write_ase
+from models.json_io import blocks_from_items, iter_json_items
+
+
 def encrypt(input_json, output_ase):
-    with open(input_json, 'r', encoding='utf-8') as f:
-        items = json.load(f)
-    swatch.write(items, output_ase)
-    print(f"✅ Wrote {len(items)} items to {output_ase}")
+    """Конвертирует JSON или NDJSON в ASE, читая файл потоково (по элементу верхнего уровня)."""
+    items = 0
+
+    def counted(source):
+        nonlocal items
+        for item in source:
+            items += 1
+            yield item
+
+    with open(input_json, 'rb') as f:
+        write_ase(blocks_from_items(counted(iter_json_items(f))), output_ase)
+    print(f"✅ Wrote {items} items to {output_ase}")
 
 if __name__ == '__main__':
-    config = configparser.ConfigParser()
-    config.read('config.ini')
-    swatch_file = config['Settings']['swatch_file']
-    json_file = config['Settings']['json_file']
+    if len(sys.argv) == 3:
+        # ase_encryptor.py <файл.json> <файл.ase>
+        json_file, swatch_file = sys.argv[1], sys.argv[2]
+    else:
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+        swatch_file = config['Settings']['swatch_file']
+        json_file = config['Settings']['json_file']
 
     encrypt(json_file, swatch_file)
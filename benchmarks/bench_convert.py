@@ -0,0 +1,57 @@
+"""
+Сравнение пакетной конвертации (color_engine.convert_many) с поштучной
+(Color.convert_to) на синтетической палитре.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_convert [--count 20000] [--source LAB] [--target CMYK]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from models import Color, ColorMode
+from models.color_engine import convert_many, CONVERSION_TOLERANCE
+
+
+def make_colors(count: int, mode: ColorMode, seed: int = 42) -> list[Color]:
+    rnd = random.Random(seed)
+    color_class = Color.get_class_by_mode(mode)
+    if mode is ColorMode.LAB:
+        return [color_class(rnd.random(), rnd.uniform(-128, 127), rnd.uniform(-128, 127), is_normalized=True)
+                for _ in range(count)]
+    channels = len(color_class.get_metadata()[0])
+    return [color_class(*(rnd.random() for _ in range(channels)), is_normalized=True) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--source", default="LAB", choices=[m.value for m in ColorMode])
+    parser.add_argument("--target", default="CMYK", choices=[m.value for m in ColorMode])
+    args = parser.parse_args()
+
+    source, target = ColorMode(args.source), ColorMode(args.target)
+    colors = make_colors(args.count, source)
+
+    start = time.perf_counter()
+    reference = [c.convert_to(target) for c in colors]
+    per_object = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = convert_many(colors, target)
+    batched = time.perf_counter() - start
+
+    ref = np.array([c.to_normalized() for c in reference])
+    got = np.array([c.to_normalized() for c in batch])
+    max_error = float(np.abs(ref - got).max())
+
+    print(f"{args.count} colors {source.value} -> {target.value}")
+    print(f"  Color.convert_to: {per_object:8.3f} s")
+    print(f"  convert_many:     {batched:8.3f} s  (x{per_object / batched:.1f})")
+    print(f"  max error:        {max_error:.2e} (tolerance {CONVERSION_TOLERANCE:.0e})")
+
+
+if __name__ == "__main__":
+    main()
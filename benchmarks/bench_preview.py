@@ -0,0 +1,60 @@
+"""
+Сравнение быстрого пути для показа (Color.preview_rgb / preview_lab,
+формулы color_formulas) с точной конвертацией через colormath (Color.convert_to):
+время на цвет и наибольшее расхождение по каждому направлению. Цвета
+случайные, в том числе за пределами охвата sRGB. Код возврата 1, если
+расхождение больше CONVERSION_TOLERANCE.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_preview [--count 20000]
+"""
+import argparse
+import sys
+import time
+
+from models import ColorMode, conversion_cache
+from models.color_engine import CONVERSION_TOLERANCE
+
+from .bench_convert import make_colors
+
+# (исходный режим, цель) - направления, которые считает быстрый путь
+DIRECTIONS = [
+    (ColorMode.CMYK, ColorMode.RGB),
+    (ColorMode.RGB, ColorMode.LAB),
+    (ColorMode.LAB, ColorMode.RGB),
+    (ColorMode.CMYK, ColorMode.LAB),
+]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{args.count} colors per direction")
+    for source, target in DIRECTIONS:
+        colors = make_colors(args.count, source)
+        fast = (lambda c: c.preview_rgb()) if target is ColorMode.RGB else (lambda c: c.preview_lab())
+        # LAB в convert_to нормализован (L 0-1), preview_lab - в единицах пользователя
+        scale = (1.0, 1.0, 1.0) if target is ColorMode.RGB else (100.0, 1.0, 1.0)
+
+        conversion_cache.clear()
+        start = time.perf_counter()
+        reference = [c.convert_to(target).to_normalized() for c in colors]
+        exact = time.perf_counter() - start
+
+        start = time.perf_counter()
+        got = [fast(c) for c in colors]
+        quick = time.perf_counter() - start
+
+        max_error = max(abs(r * s - g) / s for ref, row in zip(reference, got) for r, g, s in zip(ref, row, scale))
+        failed |= max_error > CONVERSION_TOLERANCE
+        print(f"  {source.value:>4} -> {target.value:<4}  colormath {exact / args.count * 1e6:7.1f} us"
+              f"  fast {quick / args.count * 1e6:5.2f} us  (x{exact / quick:.0f})"
+              f"  max error {max_error:.1e} (tolerance {CONVERSION_TOLERANCE:.0e})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Детерминированный генератор синтетических ASE библиотек для бенчмарков.
+
+Одинаковые count и seed всегда дают побайтно одинаковый файл. В библиотеке
+смешаны режимы RGB/LAB/CMYK и типы Global/Spot/Process, часть образцов
+собрана в группы, в именах встречаются кириллица, CJK и символы вне BMP.
+
+    python -m benchmarks.generate 100000 big.ase [--seed 0]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+from typing import Iterator
+
+from models.ase_parser import AseBlock, BlockKind, group_start, group_end, write_ase
+
+_NAME_PARTS = ["PANTONE", "Red", "Синий", "Зелёный", "紅色", "青", "Ocre", "Grün", "🎨", "Ω"]
+_TYPES = ["Global", "Spot", "Process"]
+
+# Каждые GROUP_EVERY образцов начинается группа из GROUP_SIZE образцов
+GROUP_EVERY = 500
+GROUP_SIZE = 100
+
+
+def _random_color(rnd: random.Random, index: int) -> AseBlock:
+    name = f"{rnd.choice(_NAME_PARTS)} {index} {rnd.choice(_NAME_PARTS)}"
+    mode = rnd.choice(["RGB", "LAB", "CMYK"])
+    if mode == "LAB":
+        values = [rnd.random(), rnd.uniform(-128, 127), rnd.uniform(-128, 127)]
+    else:
+        values = [rnd.random() for _ in range(4 if mode == "CMYK" else 3)]
+    swatch_type = "Process" if mode == "CMYK" and rnd.random() < 0.5 else rnd.choice(_TYPES)
+    return AseBlock(BlockKind.COLOR, name, swatch_type, mode, values)
+
+
+def iter_library(count: int, seed: int = 0) -> Iterator[AseBlock]:
+    """Поток блоков библиотеки из count цветов."""
+    rnd = random.Random(seed)
+    index = 0
+    while index < count:
+        if index % GROUP_EVERY == 0 and count - index >= GROUP_SIZE:
+            yield group_start(f"Группа {index // GROUP_EVERY} 色")
+            for _ in range(GROUP_SIZE):
+                yield _random_color(rnd, index)
+                index += 1
+            yield group_end()
+        else:
+            yield _random_color(rnd, index)
+            index += 1
+
+
+def generate_ase(path: str, count: int, seed: int = 0) -> str:
+    write_ase(iter_library(count, seed), path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("count", type=int)
+    parser.add_argument("output")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_ase(args.output, args.count, args.seed)
+    print(f"Wrote {args.count} swatches to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Нагрузочный тест сервера yase serve: несколько клиентов с постоянными
+соединениями вызывают nearest, convert, load и export, пока не выполнят
+--requests запросов каждый. Выводит пропускную способность и задержки
+(p50/p95/p99) по методам, статистику сервера и, для сравнения, время
+конвертации того же файла отдельным процессом (python main.py convert).
+Код возврата 1, если были ошибки.
+
+Без --connect тест запускает сервер сам (на свободном порту, кэш разбора во
+временном каталоге) на сгенерированной библиотеке из --count образцов.
+
+Запуск из корня проекта:
+    python -m benchmarks.load_serve [--clients 16] [--requests 200] [--pipeline 4] [--jobs 4]
+    python -m benchmarks.load_serve --connect 127.0.0.1:7424 --library big.ase
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from .generate import generate_ase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Доля запросов каждого метода в нагрузке
+MIX = {"nearest": 6, "convert": 3, "load": 1}
+CONVERT_BATCH = 256
+
+
+class RpcClient:
+    """Клиент JSON-RPC с одним постоянным соединением; вызовы можно делать параллельно."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader, self.writer = reader, writer
+        self.ids = itertools.count(1)
+        self.waiting: dict[int, asyncio.Future] = {}
+        self.receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, address: str) -> "RpcClient":
+        if address.startswith("unix:"):
+            reader, writer = await asyncio.open_unix_connection(address[5:], limit=1 << 26)
+        else:
+            host, port = address.rsplit(":", 1)
+            reader, writer = await asyncio.open_connection(host, int(port), limit=1 << 26)
+        return cls(reader, writer)
+
+    async def _receive(self) -> None:
+        while line := await self.reader.readline():
+            message = json.loads(line)
+            future = self.waiting.pop(message.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(message)
+        for future in self.waiting.values():
+            future.set_exception(ConnectionError("connection closed"))
+
+    async def call(self, method: str, **params) -> dict:
+        """Ответ сервера целиком (с result или error)."""
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request_id] = future
+        self.writer.write(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method,
+                                      "params": params}).encode() + b"\n")
+        await self.writer.drain()
+        return await future
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.receiver.cancel()
+
+
+def make_request(rnd: random.Random, library: str) -> tuple[str, dict]:
+    method = rnd.choices(list(MIX), weights=list(MIX.values()))[0]
+    if method == "nearest":
+        return method, {"path": library, "k": 5,
+                        "color": [rnd.uniform(0, 100), rnd.uniform(-100, 100), rnd.uniform(-100, 100)]}
+    if method == "convert":
+        return method, {"mode": "LAB", "to": "CMYK",
+                        "values": [[rnd.random(), rnd.uniform(-100, 100), rnd.uniform(-100, 100)]
+                                   for _ in range(CONVERT_BATCH)]}
+    return method, {"path": library}
+
+
+async def run_client(address: str, library: str, requests: int, pipeline: int, seed: int,
+                     latencies: dict[str, list[float]], errors: list[str]) -> None:
+    client = await RpcClient.connect(address)
+    rnd = random.Random(seed)
+    remaining = iter(range(requests))
+
+    async def lane():
+        for _ in remaining:
+            method, params = make_request(rnd, library)
+            start = time.perf_counter()
+            response = await client.call(method, **params)
+            latencies.setdefault(method, []).append(time.perf_counter() - start)
+            if "error" in response:
+                errors.append(f"{method}: {response['error']['message']}")
+
+    try:
+        await asyncio.gather(*(lane() for _ in range(pipeline)))
+    finally:
+        await client.close()
+
+
+async def load_test(args: argparse.Namespace, address: str, library: str, export_dir: str) -> int:
+    client = await RpcClient.connect(address)
+    start = time.perf_counter()
+    loaded = await client.call("load", path=library)
+    if "error" in loaded:
+        print(f"load failed: {loaded['error']['message']}", file=sys.stderr)
+        return 1
+    print(f"Library: {library} ({loaded['result']['count']} swatches), first load {time.perf_counter() - start:.3f} s")
+
+    latencies: dict[str, list[float]] = {}
+    errors: list[str] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(address, library, args.requests, args.pipeline, seed, latencies, errors)
+                           for seed in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    total = sum(map(len, latencies.values()))
+    print(f"{args.clients} clients x {args.requests} requests (pipeline {args.pipeline}): "
+          f"{total} requests in {elapsed:.2f} s, {total / elapsed:.0f} req/s, {len(errors)} errors")
+    print(f"  {'method':<8} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for method, values in sorted(latencies.items()):
+        q = statistics.quantiles(values, n=100) if len(values) > 1 else values * 99
+        print(f"  {method:<8} {len(values):>6} {q[49] * 1e3:8.2f} {q[94] * 1e3:8.2f} {q[98] * 1e3:8.2f}"
+              f" {max(values) * 1e3:8.2f}")
+    for message in sorted(set(errors))[:10]:
+        print(f"  error: {message}", file=sys.stderr)
+
+    # Конвертация файла: запрос к серверу против отдельного процесса на файл
+    target = os.path.join(export_dir, "export.json")
+    times = []
+    for _ in range(args.exports):
+        start = time.perf_counter()
+        response = await client.call("export", source=library, target=target, format="compact",
+                                     overwrite=True)
+        times.append(time.perf_counter() - start)
+        if "error" in response:
+            errors.append(f"export: {response['error']['message']}")
+    stats = await client.call("stats")
+    await client.close()
+
+    if args.exports:
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "convert", library, "-o", export_dir,
+                        "--json-format", "compact", "--jobs", "1"], check=True, capture_output=True)
+        print(f"Export to JSON: serve {statistics.median(times) * 1e3:.1f} ms (median of {args.exports}), "
+              f"separate process {(time.perf_counter() - start) * 1e3:.1f} ms")
+    print("Server stats:", json.dumps(stats.get("result"), indent=1))
+    return 1 if errors else 0
+
+
+def start_server(args: argparse.Namespace, cache_dir: str) -> tuple[subprocess.Popen, str]:
+    """Запускает python main.py serve на свободном порту и ждет строки 'Listening on ...'."""
+    command = [sys.executable, os.path.join(ROOT, "main.py"), "serve", "--port", "0",
+               "--jobs", str(args.jobs), "--cache-dir", cache_dir]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, cwd=ROOT)
+    line = process.stdout.readline()
+    if not line.startswith("Listening on "):
+        process.kill()
+        raise RuntimeError(f"Server did not start: {line!r}")
+    print(line.strip())
+    return process, line.split()[2]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent connections")
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--pipeline", type=int, default=1, help="requests in flight per connection")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="server worker processes")
+    parser.add_argument("--count", type=int, default=20000, help="swatches in the generated library")
+    parser.add_argument("--exports", type=int, default=5, help="export requests to compare with a process per file")
+    parser.add_argument("--connect", metavar="ADDRESS", help="use a running server (HOST:PORT or unix:PATH)")
+    parser.add_argument("--library", help="ASE file to query (default: a generated one)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        library = os.path.abspath(args.library or generate_ase(os.path.join(tmp, "load.ase"), args.count))
+        process = None
+        if args.connect:
+            address = args.connect
+        else:
+            process, address = start_server(args, os.path.join(tmp, "cache"))
+        try:
+            return asyncio.run(load_test(args, address, library, tmp))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
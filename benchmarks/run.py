@@ -0,0 +1,200 @@
+"""
+Набор бенчмарков YASE на синтетических библиотеках (см. benchmarks/generate.py).
+
+Измеряет load_from_ase (разбор файла и повторное открытие из кэша разбора), save_to_ase (файл целиком и сохранение одной правки на месте),
+export_to_json, импорт JSON, где вся библиотека - одна группа (iter_json_items
+разбирает ее по образцу), Color.convert_to (с пустым кэшем конвертации и попадания в
+заполненный кэш), Color.to_hex (быстрый путь без colormath, см. color_formulas;
+не кэшируется), расчет сетки без окна (GridLayout) при прокрутке
+всей библиотеки, построение индекса ближайших цветов и поиск по нему (ColorIndex). Результаты сохраняются в JSON и сравниваются с порогами
+из benchmarks/thresholds.json (микросекунды на образец); при превышении
+код возврата - 1.
+
+    python -m benchmarks.run                          # 1k, 10k, 100k
+    python -m benchmarks.run --sizes 1000 1000000 --output results.json
+    python -m benchmarks.run --baseline old.json      # сравнить с прошлым прогоном
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from models import SwatchModel, ColorMode, ColorIndex, ParseCache, conversion_cache
+from models.ase_parser import BlockKind, group_start, group_end
+from models.json_io import write_blocks_json
+from views.grid_layout import GridLayout
+
+from .generate import generate_ase, iter_library
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_THRESHOLDS = os.path.join(HERE, "thresholds.json")
+DEFAULT_OUTPUT = os.path.join(HERE, "results", "latest.json")
+
+# Поштучные операции (convert_to, to_hex) меряются на выборке, чтобы прогон 1M не шел часами
+PER_OBJECT_SAMPLE = 20000
+# Количество запросов поиска ближайших цветов (k = 5)
+NEAREST_QUERIES = 500
+# Параметры окна для расчета сетки: как у SwatchEditorView по умолчанию
+LAYOUT = dict(padding_x=10, padding_y=5, swatch_size=40, text_gap=10, text_width=150)
+VIEWPORT = (600, 400)
+
+
+def _measure(func: Callable[[], object], repeat: int) -> float:
+    """Лучшее время из repeat запусков, в секундах."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _scroll_whole_library(count: int) -> None:
+    """Прокрутка сетки от начала до конца с расчетом позиций всех видимых ячеек."""
+    layout = GridLayout(**LAYOUT)
+    width, height = VIEWPORT
+    cols = layout.columns(width)
+    total = layout.content_height(count, cols)
+    top = 0
+    while top < total:
+        for index in layout.visible_range(top, height, count, cols):
+            layout.cell_origin(index, cols)
+        top += height
+
+
+def run_size(count: int, workdir: str, repeat: int) -> dict:
+    source = generate_ase(os.path.join(workdir, f"lib_{count}.ase"), count)
+    model = SwatchModel()
+    results: dict[str, dict] = {}
+
+    def record(name: str, seconds: float, items: int):
+        results[name] = {"seconds": seconds, "items": items, "us_per_item": seconds / items * 1e6}
+        print(f"  {name:<18} {seconds:9.4f} s  {results[name]['us_per_item']:8.2f} us/item", flush=True)
+
+    record("load_from_ase", _measure(lambda: model.load_from_ase(source), repeat), count)
+    cached = SwatchModel()
+    cached.parse_cache = ParseCache(os.path.join(workdir, f"cache_{count}"))
+    cached.load_from_ase(source)  # первое открытие заполняет кэш
+    record("load_cached", _measure(lambda: cached.load_from_ase(source), repeat), count)
+    saved = os.path.join(workdir, "saved.ase")
+    record("save_to_ase", _measure(lambda: model.save_to_ase(saved, full=True), repeat), count)
+
+    def save_one_edit():
+        middle = count // 2
+        model.update_swatch(middle, model.get_swatch(middle))
+        model.save_to_ase()
+
+    # Время одного сохранения (а не на образец): блок правки переписывается на месте
+    record("save_one_edit", _measure(save_one_edit, repeat), 1)
+    record("export_to_json", _measure(lambda: model.export_to_json(os.path.join(workdir, "export.json")), repeat), count)
+
+    group_json = os.path.join(workdir, f"group_{count}.json")
+    with open(group_json, "w", encoding="utf-8") as f:
+        colors = (block for block in iter_library(count) if block.kind is BlockKind.COLOR)
+        write_blocks_json([group_start("Все образцы"), *colors, group_end()], f)
+    record("import_json_group", _measure(lambda: SwatchModel().read_json_store(group_json), repeat), count)
+
+    sample = [sw.color for sw in model.get_swatches()[:PER_OBJECT_SAMPLE]]
+
+    def convert_cold():
+        conversion_cache.clear()
+        for color in sample:
+            color.convert_to(ColorMode.LAB)
+
+    def to_hex_cold():
+        conversion_cache.clear()
+        for color in sample:
+            color.to_hex()
+
+    def convert_cached():
+        for color in sample:
+            color.convert_to(ColorMode.LAB)
+
+    # Первая конвертация импортирует colormath: без прогрева при --repeat 1 она попала бы в замер
+    for color in {color.mode: color for color in sample}.values():
+        color.convert_to(ColorMode.LAB)
+    record("convert_to", _measure(convert_cold, repeat), len(sample))
+    record("to_hex_cold", _measure(to_hex_cold, repeat), len(sample))
+    convert_cached()  # заполняем кэш конвертации: дальше меряются только попадания
+    record("convert_to_cached", _measure(convert_cached, repeat), len(sample))
+    record("layout_scroll", _measure(lambda: _scroll_whole_library(count), repeat), count)
+
+    index = ColorIndex()
+    record("index_build", _measure(lambda: (index.detach(model), index.attach(model)), repeat), count)
+    rnd = random.Random(0)
+    queries = [(rnd.uniform(0, 100), rnd.uniform(-100, 100), rnd.uniform(-100, 100)) for _ in range(NEAREST_QUERIES)]
+    record("find_similar", _measure(lambda: [index.nearest(q, 5) for q in queries], repeat), len(queries))
+    return results
+
+
+def check(results: dict, thresholds: dict, baseline: dict | None, max_regression: float) -> list[str]:
+    """Возвращает список нарушений порогов и регрессий относительно baseline."""
+    problems = []
+    for size, benches in results.items():
+        for name, data in benches.items():
+            limit = thresholds.get(name)
+            if limit is not None and data["us_per_item"] > limit:
+                problems.append(f"{name} @ {size}: {data['us_per_item']:.2f} us/item > threshold {limit}")
+            if baseline:
+                old = baseline.get("results", {}).get(size, {}).get(name)
+                if old and data["us_per_item"] > old["us_per_item"] * max_regression:
+                    problems.append(f"{name} @ {size}: {data['us_per_item']:.2f} us/item, "
+                                    f"baseline {old['us_per_item']:.2f} (x{max_regression} allowed)")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, best time is kept")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS)
+    parser.add_argument("--baseline", help="results JSON of a previous run to compare with")
+    parser.add_argument("--max-regression", type=float, default=1.25,
+                        help="allowed slowdown factor relative to --baseline")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="yase-bench-") as workdir:
+        for count in args.sizes:
+            print(f"{count} swatches:", flush=True)
+            # Для больших библиотек одного прогона достаточно
+            results[str(count)] = run_size(count, workdir, args.repeat if count <= 100000 else 1)
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "sizes": args.sizes,
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    with open(args.thresholds, encoding="utf-8") as f:
+        thresholds = json.load(f)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    problems = check(results, thresholds, baseline, args.max_regression)
+    for problem in problems:
+        print(f"REGRESSION: {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+"""
+Командная строка YASE. Запуск: python main.py <команда> ... (или YASE.exe <команда> ...).
+Без команды main.py открывает графический редактор.
+"""
+import argparse
+
+from . import convert, serve
+
+# Подкоманды: имя -> модуль с функциями add_parser(subparsers) и run(args) -> int
+COMMANDS = {
+    "convert": convert,
+    "serve": serve,
+}
+
+
+def is_cli_command(argv: list[str]) -> bool:
+    """Проверяет, что первый аргумент - подкоманда CLI, а не запуск GUI."""
+    return len(argv) > 0 and argv[0] in COMMANDS
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="yase", description="Yet Another aSe Editor - command line tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for module in COMMANDS.values():
+        module.add_parser(subparsers)
+    args = parser.parse_args(argv)
+    return COMMANDS[args.command].run(args)
+
+
+__all__ = ["COMMANDS", "is_cli_command", "main"]
@@ -0,0 +1,192 @@
+"""
+yase convert - пакетная конвертация ASE <-> JSON.
+
+Направление определяется расширением исходного файла: .ase -> .json (.ndjson
+при --json-format ndjson), .json/.ndjson -> .ase. JSON читается и пишется
+потоково, поэтому размер файла не ограничен памятью. Файлы обрабатываются
+параллельно в пуле процессов; ошибка в одном файле не останавливает остальные.
+Файл не конвертируется, если его результат - другой исходный файл того же
+запуска (X.ase и X.json в одном каталоге без -o) или результат еще одного файла.
+Примеры:
+
+    python main.py convert vendor_libs/ -r -o out/
+    python main.py convert "incoming/**/*.ase" --jobs 8 --json-format ndjson
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from models.ase_parser import read_ase, write_ase, atomic_write, BlockKind
+from models.json_io import write_blocks_json, blocks_from_items, iter_json_items, JSON_FORMATS
+
+# Расширение источника -> расширение результата
+TARGET_EXTENSIONS = {".ase": ".json", ".json": ".ase", ".ndjson": ".ase"}
+
+
+def target_extension(source_ext: str, json_format: str = "indented") -> str | None:
+    """Расширение результата для расширения источника (None - файл не конвертируется)."""
+    target_ext = TARGET_EXTENSIONS.get(source_ext.lower())
+    if target_ext == ".json" and json_format == "ndjson":
+        return ".ndjson"
+    return target_ext
+
+
+@dataclass(frozen=True)
+class ConvertJob:
+    source: str
+    target: str
+
+
+def add_parser(subparsers) -> None:
+    parser = subparsers.add_parser(
+        "convert", help="convert ASE files to JSON and back",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="files, directories or glob patterns (quote patterns)")
+    parser.add_argument("-o", "--output-dir", help="write results here (default: next to the source files)")
+    parser.add_argument("-r", "--recursive", action="store_true", help="scan directories recursively")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: CPU count; 1 - no pool)")
+    parser.add_argument("--to", choices=["json", "ase"], help="convert only the sources that produce this format")
+    parser.add_argument("--skip-existing", action="store_true", help="do not overwrite existing results")
+    parser.add_argument("--json-format", choices=JSON_FORMATS, default="indented",
+                        help="layout of JSON results: indented (default), compact, "
+                             "or ndjson - one item per line, written to .ndjson files")
+
+
+def _is_pattern(path: str) -> bool:
+    return any(ch in path for ch in "*?[")
+
+
+def collect_jobs(inputs: list[str], output_dir: str | None = None, recursive: bool = False,
+                 to: str | None = None, json_format: str = "indented") -> list[ConvertJob]:
+    """Разворачивает файлы, каталоги и glob-шаблоны в список заданий (без повторов)."""
+    jobs: dict[str, ConvertJob] = {}
+    for item in inputs:
+        base = None
+        if os.path.isdir(item):
+            base = item
+            pattern = os.path.join(glob.escape(item), "**", "*") if recursive else os.path.join(glob.escape(item), "*")
+            sources = glob.glob(pattern, recursive=recursive)
+        elif _is_pattern(item):
+            sources = glob.glob(item, recursive=True)
+        else:
+            sources = [item]
+
+        for source in sorted(sources):
+            stem, ext = os.path.splitext(source)
+            target_ext = target_extension(ext, json_format)
+            if target_ext is None or not os.path.isfile(source):
+                continue
+            if to and (target_ext == ".ase") != (to == "ase"):
+                continue
+            if output_dir:
+                relative = os.path.relpath(stem, base) if base else os.path.basename(stem)
+                target = os.path.join(output_dir, relative + target_ext)
+            else:
+                target = stem + target_ext
+            jobs.setdefault(os.path.abspath(source), ConvertJob(source, target))
+    return list(jobs.values())
+
+
+def _path_key(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def find_conflicts(jobs: list[ConvertJob]) -> dict[ConvertJob, str]:
+    """
+    Задания, которые нельзя выполнять: результат - исходный файл этого же запуска
+    (X.ase и X.json в одном каталоге без -o перезаписали бы друг друга) или
+    результат другого задания. Значение - причина.
+    """
+    sources = {_path_key(job.source) for job in jobs}
+    by_target: dict[str, list[ConvertJob]] = {}
+    for job in jobs:
+        by_target.setdefault(_path_key(job.target), []).append(job)
+    conflicts = {}
+    for target, same_target in by_target.items():
+        for job in same_target:
+            if target in sources:
+                conflicts[job] = f"{job.target} is also an input of this run (use --to or -o)"
+            elif len(same_target) > 1:
+                conflicts[job] = f"{job.target} is also the result of {len(same_target) - 1} other input(s) (rename one of them)"
+    return conflicts
+
+
+def convert_file(source: str, target: str, json_format: str = "indented") -> int:
+    """
+    Конвертирует один файл и возвращает количество цветов в нем.
+    Выполняется в рабочем процессе. Результат пишется атомарно (см. atomic_write):
+    при ошибке недописанный файл не остается.
+    """
+    target_dir = os.path.dirname(target)
+    if target_dir:
+        os.makedirs(target_dir, exist_ok=True)
+    if source.lower().endswith(".ase"):
+        with atomic_write(target, "w", encoding="utf-8") as f:
+            _, colors = write_blocks_json(read_ase(source), f, json_format)
+        return colors
+
+    colors = 0
+
+    def counted(blocks):
+        nonlocal colors
+        for block in blocks:
+            colors += block.kind is BlockKind.COLOR
+            yield block
+
+    with open(source, "rb") as f:
+        write_ase(counted(blocks_from_items(iter_json_items(f))), target)
+    return colors
+
+
+def run(args: argparse.Namespace) -> int:
+    jobs = collect_jobs(args.inputs, args.output_dir, args.recursive, args.to, args.json_format)
+    if args.skip_existing:
+        jobs = [job for job in jobs if not os.path.exists(job.target)]
+    if not jobs:
+        print("No .ase/.json/.ndjson files to convert.", file=sys.stderr)
+        return 1
+
+    total = len(jobs)
+    done = failed = swatches = 0
+    conflicts = find_conflicts(jobs)
+    for job, reason in conflicts.items():
+        done += 1
+        failed += 1
+        print(f"[{done}/{total}] SKIPPED {job.source}: {reason}", file=sys.stderr, flush=True)
+    jobs = [job for job in jobs if job not in conflicts]
+    start = time.perf_counter()
+
+    def report(job: ConvertJob, count: int | None, error: BaseException | None):
+        nonlocal done, failed, swatches
+        done += 1
+        if error is None:
+            swatches += count
+            print(f"[{done}/{total}] {job.source} -> {job.target} ({count} swatches)", flush=True)
+        else:
+            failed += 1
+            print(f"[{done}/{total}] FAILED {job.source}: {error}", file=sys.stderr, flush=True)
+
+    if args.jobs <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            try:
+                report(job, convert_file(job.source, job.target, args.json_format), None)
+            except Exception as e:
+                report(job, None, e)
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(jobs))) as pool:
+            futures = {pool.submit(convert_file, job.source, job.target, args.json_format): job for job in jobs}
+            for future in as_completed(futures):
+                error = future.exception()
+                report(futures[future], None if error else future.result(), error)
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"Converted {done - failed}/{total} files ({failed} failed), {swatches} swatches "
+          f"in {elapsed:.2f} s: {(done - failed) / elapsed:.1f} files/s, {swatches / elapsed:.0f} swatches/s")
+    return 1 if failed else 0
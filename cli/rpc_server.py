@@ -0,0 +1,437 @@
+"""
+Сервер JSON-RPC 2.0 команды yase serve (описание протокола и методов - в cli.serve).
+
+Цикл asyncio в основном процессе разбирает сообщения и пишет ответы, методы
+load, convert, export и nearest выполняются в пуле процессов (WORKER_METHODS).
+Состояние рабочего процесса - открытые библиотеки и кэш разбора - лежит в
+глобальных переменных модуля и создается инициализатором _init_worker.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import inspect
+import json
+import os
+import signal
+import socket
+import stat
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from models import Color, ColorMode, ParseCache, SwatchModel, NO_GROUP
+from models.json_io import JSON_FORMATS
+from models.parse_cache import DEFAULT_MAX_BYTES, default_cache_dir
+from utils.get_version import get_version_from_pyproject
+
+from .convert import convert_file, target_extension
+from .serve import DEFAULT_MAX_LIBRARIES
+
+# Наибольшая длина одного сообщения (строки) от клиента
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+# Сколько запросов одного соединения выполняется одновременно; дальше сервер
+# перестает читать соединение, пока не ответит на уже принятые
+MAX_PENDING = 64
+
+# Коды ошибок JSON-RPC 2.0
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000  # исключение при выполнении метода (нет файла, ошибка формата, ...)
+TARGET_EXISTS = -32001  # export: файл результата уже есть, а overwrite не задан
+
+
+class RpcError(Exception):
+    """Ошибка с кодом JSON-RPC. Выбрасывается и в рабочих процессах (переносится через pickle)."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(code, message)
+        self.code = code
+        self.message = message
+
+
+# --- Рабочие процессы ---
+
+# Открытые библиотеки процесса: нормализованный путь -> ((размер, время изменения), модель)
+_libraries: OrderedDict[str, tuple[tuple[int, int], SwatchModel]] = OrderedDict()
+_parse_cache: ParseCache | None = None
+_max_libraries = DEFAULT_MAX_LIBRARIES
+
+
+def _init_worker(cache_dir: str | None, cache_bytes: int, max_libraries: int) -> None:
+    """Инициализатор рабочего процесса: кэш разбора и прогрев движка конвертации."""
+    global _parse_cache, _max_libraries
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C обрабатывает основной процесс
+    _parse_cache = ParseCache(cache_dir, cache_bytes) if cache_bytes > 0 else None
+    _max_libraries = max_libraries
+    from models.color_engine import convert_array
+    convert_array([[0.5, 0.5, 0.5]], ColorMode.RGB, ColorMode.CMYK)
+
+
+def _library(path: str) -> SwatchModel:
+    """Открытая библиотека path; файл перечитывается, если изменился с прошлого открытия."""
+    key = os.path.normcase(os.path.abspath(path))
+    file_stat = os.stat(key)
+    stamp = (file_stat.st_size, file_stat.st_mtime_ns)
+    entry = _libraries.get(key)
+    if entry is not None and entry[0] == stamp:
+        _libraries.move_to_end(key)
+        return entry[1]
+
+    ext = os.path.splitext(key)[1].lower()
+    if ext not in (".ase", ".json", ".ndjson"):
+        raise RpcError(INVALID_PARAMS, f"Unsupported file type: {path}")
+    model = SwatchModel()
+    model.parse_cache = _parse_cache
+    if ext == ".ase":
+        model.load_from_ase(key)
+    else:
+        model.import_from_json(key)
+    _libraries[key] = (stamp, model)
+    _libraries.move_to_end(key)
+    while len(_libraries) > _max_libraries:
+        _libraries.popitem(last=False)
+    return model
+
+
+def _mode(name) -> ColorMode:
+    try:
+        return ColorMode(str(name).upper())
+    except ValueError:
+        raise RpcError(INVALID_PARAMS, f"Unknown color mode: {name}") from None
+
+
+def rpc_load(path: str, swatches: bool = False, offset: int = 0, limit: int | None = None) -> dict:
+    """Сводка по библиотеке; swatches=True - и образцы с offset (не больше limit)."""
+    model = _library(path)
+    count = model.swatch_count()
+    result = {"path": os.path.abspath(path), "count": count,
+              "groups": len({group for group, _, _ in model.get_group_runs()} - {NO_GROUP})}
+    if swatches:
+        start = max(int(offset), 0)
+        stop = count if limit is None else min(start + max(int(limit), 0), count)
+        items = []
+        for index in range(start, stop):
+            swatch = model.get_swatch(index)
+            group = model.group_of(index)
+            items.append({"name": swatch.name, "type": swatch.type.value,
+                          "group": None if group == NO_GROUP else model.get_group_name(group),
+                          "data": swatch.color.to_data(), "hex": swatch.color.to_hex()})
+        result["swatches"] = items
+    return result
+
+
+def rpc_convert(mode: str, values: list, to: str) -> dict:
+    """Цвета режима mode (список нормализованных значений) в режиме to."""
+    from models.color_engine import convert_array
+    source, target = _mode(mode), _mode(to)
+    channels = len(Color.get_class_by_mode(source).get_metadata()[0])
+    if not isinstance(values, list) or \
+            not all(isinstance(row, list) and len(row) == channels for row in values):
+        raise RpcError(INVALID_PARAMS, f"values must be a list of {source.value} colors ({channels} numbers each)")
+    if not values:
+        return {"mode": target.value, "values": []}
+    try:
+        converted = convert_array(values, source, target)
+    except (TypeError, ValueError):
+        raise RpcError(INVALID_PARAMS, "values must be numbers") from None
+    return {"mode": target.value, "values": converted.tolist()}
+
+
+def rpc_export(source: str, target: str | None = None, format: str = "indented", overwrite: bool = False) -> dict:
+    """
+    Конвертирует файл source (ASE -> JSON или JSON -> ASE), как yase convert.
+    Существующий файл результата перезаписывается только при overwrite=True:
+    рядом с X.ase может лежать не прошлый результат, а исходный X.json.
+    """
+    if format not in JSON_FORMATS:
+        raise RpcError(INVALID_PARAMS, f"format must be one of: {', '.join(JSON_FORMATS)}")
+    stem, ext = os.path.splitext(source)
+    target_ext = target_extension(ext, format)
+    if target_ext is None:
+        raise RpcError(INVALID_PARAMS, f"Unsupported file type: {source}")
+    target = target or stem + target_ext
+    if os.path.normcase(os.path.abspath(target)) == os.path.normcase(os.path.abspath(source)):
+        raise RpcError(INVALID_PARAMS, "target is the source file")
+    if not overwrite and os.path.exists(target):
+        raise RpcError(TARGET_EXISTS, f"{target} already exists (pass overwrite=true to replace it)")
+    return {"target": os.path.abspath(target), "colors": convert_file(source, target, format)}
+
+
+def rpc_nearest(path: str, color, k: int = 5) -> list[dict]:
+    """k образцов библиотеки path, ближайших к color по CIEDE2000 (см. SwatchModel.find_similar)."""
+    if isinstance(color, dict):
+        try:
+            query = Color.create_from_data(color, is_normalized=True)
+        except (KeyError, TypeError, ValueError) as e:
+            raise RpcError(INVALID_PARAMS, f"Invalid color: {e}") from None
+    elif isinstance(color, list) and len(color) == 3 and all(isinstance(v, (int, float)) for v in color):
+        query = color
+    else:
+        raise RpcError(INVALID_PARAMS, 'color must be [L, a, b] or {"mode": ..., "values": [...]}')
+    model = _library(path)
+    result = []
+    for match in model.find_similar(query, int(k)):
+        index = model.index_of(match.swatch_id)
+        result.append({"index": index, "name": match.name, "lab": list(match.lab),
+                       "delta_e2000": match.delta_e2000, "delta_e76": match.delta_e76,
+                       "hex": model.get_swatch(index).color.to_hex()})
+    return result
+
+
+# Методы, которые выполняются в пуле процессов
+WORKER_METHODS = {
+    "load": rpc_load,
+    "convert": rpc_convert,
+    "export": rpc_export,
+    "nearest": rpc_nearest,
+}
+
+
+# --- Сервер ---
+
+def _error(request_id, code: int, message: str) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def _encode(message) -> bytes:
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class RpcServer:
+    """
+    Разбирает сообщения из соединений, ставит вызовы в пул процессов и пишет ответы.
+    Все методы выполняются в цикле asyncio, поэтому счетчики не требуют блокировок.
+    """
+
+    def __init__(self, pool: Executor, workers: int):
+        self.pool = pool
+        self.workers = workers
+        self.started = time.monotonic()
+        self.connections: set[asyncio.StreamWriter] = set()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        # метод -> [вызовов, ошибок, суммарное время, наибольшее время]
+        self.method_stats: dict[str, list] = {}
+        self.inline = {"ping": self.ping, "stats": self.stats}
+        self.signatures = {name: inspect.signature(func)
+                           for name, func in (*self.inline.items(), *WORKER_METHODS.items())}
+
+    # --- Встроенные методы ---
+
+    def ping(self) -> dict:
+        return {"version": get_version_from_pyproject(), "pid": os.getpid()}
+
+    def stats(self) -> dict:
+        return {
+            "uptime": round(time.monotonic() - self.started, 3),
+            "workers": self.workers,
+            "connections": len(self.connections),
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "methods": {name: {"calls": calls, "errors": errors, "mean_ms": round(total / calls * 1000, 3),
+                               "max_ms": round(longest * 1000, 3)}
+                        for name, (calls, errors, total, longest) in self.method_stats.items()},
+        }
+
+    # --- Соединения ---
+
+    def close_connections(self) -> None:
+        """Закрывает открытые соединения (при остановке: Server.wait_closed ждет их закрытия)."""
+        for writer in list(self.connections):
+            writer.close()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Читает запросы соединения, пока клиент его не закроет. Запросы выполняются
+        параллельно (не больше MAX_PENDING сразу); после конца входных данных
+        сервер дописывает ответы на принятые запросы и закрывает соединение.
+        """
+        self.connections.add(writer)
+        write_lock = asyncio.Lock()
+        pending = asyncio.Semaphore(MAX_PENDING)
+        tasks: set[asyncio.Task] = set()
+
+        async def send(data: bytes) -> None:
+            async with write_lock:
+                writer.write(data)
+                await writer.drain()
+
+        async def respond(line: bytes) -> None:
+            try:
+                response = await self.dispatch(line)
+                if response is not None:
+                    await send(response)
+            except ConnectionError:
+                pass  # клиент ушел, не дождавшись ответа
+            finally:
+                pending.release()
+
+        try:
+            while True:
+                await pending.acquire()
+                try:
+                    line = await reader.readline()
+                except ValueError:  # строка длиннее MAX_MESSAGE_SIZE: дальше поток не разобрать
+                    await send(_encode(_error(None, INVALID_REQUEST, "Message too large")))
+                    break
+                if not line.strip():
+                    pending.release()
+                    if not line:
+                        break
+                    continue
+                task = asyncio.create_task(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def dispatch(self, line: bytes) -> bytes | None:
+        """Ответ на одну строку (запрос или пакет) или None, если отвечать не нужно."""
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return _encode(_error(None, PARSE_ERROR, "Parse error"))
+        if isinstance(message, list):
+            if not message:
+                return _encode(_error(None, INVALID_REQUEST, "Empty batch"))
+            responses = [r for r in await asyncio.gather(*map(self.call, message)) if r is not None]
+            return _encode(responses) if responses else None
+        response = await self.call(message)
+        return None if response is None else _encode(response)
+
+    async def call(self, message) -> dict | None:
+        """Выполняет один запрос. Для уведомлений (без id) возвращает None."""
+        if not isinstance(message, dict):
+            return _error(None, INVALID_REQUEST, "Invalid Request")
+        request_id = message.get("id")
+        method, params = message.get("method"), message.get("params", {})
+        if message.get("jsonrpc") != "2.0" or not isinstance(method, str) or not isinstance(params, (list, dict)):
+            return _error(request_id, INVALID_REQUEST, "Invalid Request")
+
+        self.requests += 1
+        start = time.perf_counter()
+        try:
+            response = {"jsonrpc": "2.0", "id": request_id, "result": await self.invoke(method, params)}
+        except RpcError as e:
+            response = _error(request_id, e.code, e.message)
+        except Exception as e:
+            response = _error(request_id, SERVER_ERROR, f"{type(e).__name__}: {e}")
+        failed = "error" in response
+        self.errors += failed
+        if method in self.signatures:
+            elapsed = time.perf_counter() - start
+            entry = self.method_stats.setdefault(method, [0, 0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += failed
+            entry[2] += elapsed
+            entry[3] = max(entry[3], elapsed)
+        return response if "id" in message else None
+
+    async def invoke(self, method: str, params: list | dict):
+        signature = self.signatures.get(method)
+        if signature is None:
+            raise RpcError(METHOD_NOT_FOUND, f"Method not found: {method}")
+        args, kwargs = (params, {}) if isinstance(params, list) else ((), params)
+        try:
+            signature.bind(*args, **kwargs)
+        except TypeError as e:
+            raise RpcError(INVALID_PARAMS, str(e)) from None
+        if method in self.inline:
+            return self.inline[method](*args, **kwargs)
+
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.pool, functools.partial(WORKER_METHODS[method], *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+
+
+def _prepare_unix_socket(path: str) -> None:
+    """Удаляет оставшийся от прошлого запуска сокет; занятый другим сервером - ошибка."""
+    try:
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            raise OSError(f"{path} exists and is not a socket")
+    except FileNotFoundError:
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except OSError:
+            os.remove(path)
+            return
+    raise OSError(f"{path} is in use by another server")
+
+
+async def serve(args: argparse.Namespace, pool: Executor) -> None:
+    """Слушает адрес из args до SIGINT/SIGTERM (на Windows - до Ctrl+C)."""
+    loop = asyncio.get_running_loop()
+    # Запускаем и прогреваем рабочие процессы заранее, а не на первом запросе
+    await asyncio.gather(*(loop.run_in_executor(pool, os.getpid) for _ in range(args.jobs)))
+
+    server = RpcServer(pool, args.jobs)
+    if args.unix:
+        _prepare_unix_socket(args.unix)
+        listener = await asyncio.start_unix_server(server.handle_connection, path=args.unix, limit=MAX_MESSAGE_SIZE)
+        address = f"unix:{args.unix}"
+    else:
+        listener = await asyncio.start_server(server.handle_connection, args.host, args.port, limit=MAX_MESSAGE_SIZE)
+        address = "{}:{}".format(*listener.sockets[0].getsockname()[:2])
+        if not any(sock.getsockname()[0] in ("127.0.0.1", "::1") for sock in listener.sockets):
+            print(f"Warning: {args.host} is reachable from the network and the server has no authentication",
+                  file=sys.stderr)
+
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C придет как KeyboardInterrupt
+    print(f"Listening on {address} ({args.jobs} workers)", flush=True)
+    try:
+        await stop.wait()
+    finally:
+        listener.close()
+        server.close_connections()
+        await listener.wait_closed()
+        if args.unix:
+            try:
+                os.remove(args.unix)
+            except OSError:
+                pass
+    print("Server stopped", flush=True)
+
+
+def run_server(args: argparse.Namespace) -> int:
+    """Запускает пул процессов и сервер с параметрами команды serve. Код возврата - как у run."""
+    args.jobs = max(args.jobs, 1)
+    cache_bytes = 0 if args.no_cache else DEFAULT_MAX_BYTES
+    pool = ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker,
+                               initargs=(args.cache_dir or default_cache_dir(), cache_bytes,
+                                         max(args.max_libraries, 1)))
+    try:
+        asyncio.run(serve(args, pool))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Cannot listen: {e}", file=sys.stderr)
+        return 1
+    finally:
+        pool.shutdown(cancel_futures=True)
+    return 0
@@ -0,0 +1,76 @@
+"""
+yase serve - локальный сервер JSON-RPC 2.0 для сборочных скриптов и плагинов.
+
+Запуск процесса на каждый файл каждый раз платит за импорт NumPy и разбор
+библиотеки. Сервер держит движок конвертации и открытые библиотеки (SwatchModel
+с индексом поиска) в рабочих процессах, а клиенты держат с ним соединение.
+
+Сообщения - JSON-RPC 2.0, по одному на строку (UTF-8, '\\n' в конце), ответы
+приходят так же. Соединение после ответа не закрывается, и по нему можно
+отправлять следующие запросы, не дожидаясь ответов: ответы сопоставляются по
+id, их порядок может отличаться от порядка запросов. Поддерживаются пакеты
+(массив запросов) и уведомления (запрос без id, ответа нет).
+
+Методы (параметры - по имени или по позиции; цвета - нормализованные значения
+0-1, как в JSON экспорте, LAB для nearest - в единицах пользователя):
+
+    ping()                                        версия и pid сервера
+    stats()                                       счетчики запросов и время по методам
+    load(path, swatches=false, offset=0, limit=null)
+                                                  открыть библиотеку ASE/JSON: сводка и образцы
+    convert(mode, values, to)                     список цветов в другой режим (color_engine)
+    export(source, target=null, format="indented", overwrite=false)
+                                                  ASE -> JSON или JSON -> ASE, как yase convert;
+                                                  существующий результат - ошибка -32001
+    nearest(path, color, k=5)                     k ближайших образцов (color - [L, a, b]
+                                                  или {"mode": ..., "values": [...]})
+
+Цикл asyncio только читает и пишет сообщения; все методы, кроме ping и stats,
+выполняются в пуле процессов (--jobs). Каждый рабочий процесс держит свои
+открытые библиотеки (до --max-libraries, давно не использованные закрываются)
+и перечитывает файл, если он изменился; повторное открытие берет данные из
+кэша разбора (см. models.parse_cache). Аутентификации нет: слушайте только
+localhost или Unix-сокет. Примеры:
+
+    python main.py serve --port 7424 --jobs 4
+    python main.py serve --unix /tmp/yase.sock
+    printf '%s\\n' '{"jsonrpc": "2.0", "id": 1, "method": "nearest",
+        "params": {"path": "lib.ase", "color": [50, 10, -20]}}' | nc -N 127.0.0.1 7424
+
+Нагрузочный тест: python -m benchmarks.load_serve
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7424
+DEFAULT_MAX_LIBRARIES = 16
+
+
+def add_parser(subparsers) -> None:
+    parser = subparsers.add_parser(
+        "serve", help="run a local JSON-RPC server for build tools and plugins",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT,
+                        help=f"TCP port (default: {DEFAULT_PORT}; 0 - any free port)")
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("--max-libraries", type=int, default=DEFAULT_MAX_LIBRARIES,
+                        help=f"libraries kept open in each worker (default: {DEFAULT_MAX_LIBRARIES})")
+    parser.add_argument("--cache-dir", help="parse cache directory (default: $YASE_CACHE_DIR or the user cache)")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the parse cache")
+
+
+def run(args: argparse.Namespace) -> int:
+    if args.unix and sys.platform == "win32":
+        print("Unix sockets are not supported on this platform.", file=sys.stderr)
+        return 2
+    # Сервер (asyncio, пул процессов) импортируется только здесь: main.py
+    # импортирует cli при каждом запуске, в том числе GUI
+    from .rpc_server import run_server
+    return run_server(args)
@@ -0,0 +1,100 @@
+"""
+Выполнение долгих операций модели в фоновом потоке.
+
+Tkinter можно вызывать только из главного потока, поэтому фоновый поток ничего
+не знает о GUI: прогресс и результат он кладет в очередь, а главный поток
+забирает их опросом через after(). Отмена - кооперативная: операция сама
+проверяет флаг (см. CancelCheck в models) и завершается исключением OperationCancelled.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Any, Callable
+
+from models import OperationCancelled
+from utils.instrumentation import instrumentation
+
+# Работа получает функцию прогресса (обработано, всего) и функцию проверки отмены
+Work = Callable[[Callable[[int, int], None], Callable[[], bool]], Any]
+
+
+class BackgroundTask:
+    """
+    Одна фоновая операция. Все обратные вызовы (on_progress, on_done, on_error,
+    on_cancelled) выполняются в главном потоке Tk.
+    """
+
+    # Период опроса очереди, мс
+    POLL_INTERVAL_MS = 50
+
+    def __init__(self, widget, work: Work,
+                 on_done: Callable[[Any], None],
+                 on_error: Callable[[Exception], None],
+                 on_progress: Callable[[int, int], None] | None = None,
+                 on_cancelled: Callable[[], None] | None = None):
+        self._widget = widget  # любой виджет Tk: нужен только его after()
+        self._work = work
+        self._on_done = on_done
+        self._on_error = on_error
+        self._on_progress = on_progress
+        self._on_cancelled = on_cancelled
+        self._messages: queue.Queue[tuple[str, Any]] = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.finished = False
+
+    def start(self) -> BackgroundTask:
+        self._thread.start()
+        self._widget.after(self.POLL_INTERVAL_MS, self._poll)
+        return self
+
+    def cancel(self) -> None:
+        """Просит операцию прерваться. Она завершится при ближайшей проверке флага."""
+        self._cancel_event.set()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_event.is_set()
+
+    # --- Фоновый поток ---
+
+    def _run(self) -> None:
+        try:
+            with instrumentation.profile_thread():  # cProfile в этом потоке (режим --profile=cprofile)
+                result = self._work(self._report_progress, self._cancel_event.is_set)
+        except OperationCancelled:
+            self._messages.put(("cancelled", None))
+        except Exception as e:
+            self._messages.put(("error", e))
+        else:
+            self._messages.put(("done", result))
+
+    def _report_progress(self, processed: int, total: int) -> None:
+        self._messages.put(("progress", (processed, total)))
+
+    # --- Главный поток ---
+
+    def _poll(self) -> None:
+        """Забирает накопленные сообщения. Из нескольких отметок прогресса показывается последняя."""
+        latest_progress = None
+        while True:
+            try:
+                kind, payload = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                latest_progress = payload
+                continue
+            self.finished = True
+            if kind == "done":
+                self._on_done(payload)
+            elif kind == "error":
+                self._on_error(payload)
+            elif self._on_cancelled:
+                self._on_cancelled()
+            return
+
+        if latest_progress and self._on_progress:
+            self._on_progress(*latest_progress)
+        self._widget.after(self.POLL_INTERVAL_MS, self._poll)
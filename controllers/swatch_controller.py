@@ -1,15 +1,93 @@
-from models import SwatchModel
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Sequence
+
+from models import SwatchModel, Workspace
 from views import SwatchEditorView
-from models import Swatch
+from models import Swatch, ModelEvent, ModelChange, DedupReport, NO_GROUP, ColorMode, SwatchType
+from utils.instrumentation import instrumentation
+from .background import BackgroundTask
 
 
 class SwatchController:
     """
     Контроллер связывает действия пользователя в View с логикой в Model.
+    Открытые библиотеки хранит Workspace; self.model - активная библиотека,
+    только на ее изменения контроллер подписан, и только ее показывает View.
     """
-    def __init__(self, model: SwatchModel, view: SwatchEditorView):
-        self.model = model
+    # Пакет изменений больше этого размера выгоднее показать полной перерисовкой
+    MAX_INCREMENTAL_CHANGES = 200
+    # Сколько строк отчета о дубликатах показывать в диалоге
+    MAX_REPORT_LINES = 10
+
+    def __init__(self, workspace: Workspace, view: SwatchEditorView):
+        self.workspace = workspace
+        self.model: SwatchModel = workspace.active
         self.view = view
+        self.model.subscribe(self._on_model_changed)
+        # Текущая фоновая операция с файлом (одновременно выполняется не больше одной)
+        self._task: BackgroundTask | None = None
+        # Окно закрывается, как только завершится (или прервется) фоновая операция
+        self._closing = False
+        # Библиотека, которую сохраняет текущая фоновая операция (None - операция не сохранение)
+        self._saving: SwatchModel | None = None
+        # Показана ли в заголовке отметка несохраненных правок
+        self._title_modified = False
+        # Текст поля фильтра по имени (пустой - показываются все образцы)
+        self._filter_text = ""
+        # Развернутые группы (Color Group); остальные группы показываются свернутыми.
+        # Для неактивных библиотек - запоминаются до переключения на них
+        self._expanded_groups: set[int] = set()
+        self._expanded_by_library: dict[SwatchModel, set[int]] = {}
+        # Выделенные образцы активной библиотеки (id, а не индексы: индексы сдвигаются
+        # при вставках и удалениях) и образец, от которого считается Shift+щелчок
+        self._selection: set[int] = set()
+        self._anchor: int | None = None
+
+    def _on_model_changed(self, change: ModelChange):
+        """
+        Переносит изменения модели во View. Одиночные правки обновляют только
+        свои ячейки, структурные изменения и крупные пакеты - весь View.
+        """
+        if change.event is ModelEvent.RESET:
+            self._expanded_groups.clear()  # новый файл открывается со свернутыми группами
+            self._set_selection(set())
+        if self._uses_display_list() and change.event is not ModelEvent.FILE_PATH_CHANGED:
+            self._on_filtered_model_changed(change)
+        elif change.event is ModelEvent.BATCH:
+            if change.is_structural or len(change.changes) > self.MAX_INCREMENTAL_CHANGES:
+                self._update_view()
+            else:
+                for single_change in change.changes:
+                    self._on_model_changed(single_change)
+        elif change.event is ModelEvent.ADDED:
+            self.view.swatch_added(change.index)
+        elif change.event is ModelEvent.UPDATED:
+            self.view.swatch_updated(change.index)
+        elif change.event is ModelEvent.REMOVED:
+            self.view.swatch_removed(change.index)
+        elif change.event is ModelEvent.FILE_PATH_CHANGED:
+            self._update_title()
+        else:  # RESET, REORDERED
+            self._update_view()
+        if self.model.is_modified() != self._title_modified:
+            self._update_title()
+
+    def _on_filtered_model_changed(self, change: ModelChange):
+        """
+        При включенном фильтре или при наличии групп позиции в сетке не совпадают
+        с индексами модели, поэтому после вставок и удалений список показываемых
+        элементов пересчитывается (поиск по индексу имен дешев), а пакеты
+        перерисовываются целиком.
+        """
+        if change.event is ModelEvent.UPDATED:
+            self.view.swatch_updated(change.index)
+            self._apply_filter()  # имя могло перестать (или начать) подходить под фильтр
+        elif change.event in (ModelEvent.ADDED, ModelEvent.REMOVED):
+            self._apply_filter()
+        else:  # BATCH, RESET, REORDERED
+            self._update_view()
 
     def _update_view(self):
         """
@@ -17,96 +95,530 @@ class SwatchController:
         Это ключевая концепция: Модель - единственный источник правды.
         """
         swatches = self.model.get_swatches()
-        file_path = self.model.get_file_path()
-        self.view.update_swatches(swatches)
-        self.view.update_title(file_path)
+        entries, headers = self._display_list()
+        self.view.update_swatches(swatches, self.model.get_swatch_ids(), entries, headers,
+                                  self.model.get_preview_colors())
+        self._update_title()
+
+    def _update_title(self):
+        self._title_modified = self.model.is_modified()
+        self.view.update_title(self.model.get_file_path(), self._title_modified)
+        self._update_tabs()
+
+    def _update_tabs(self):
+        titles = [self.workspace.title(i) + (" *" if library.is_modified() else "")
+                  for i, library in enumerate(self.workspace)]
+        self.view.update_library_tabs(titles, self.workspace.active_index)
 
     def run_initial_load(self, file_path: str | None):
         """Загрузка файла при старте приложения, если он указан в config.ini."""
-        if not file_path:
-            self._update_view() # Просто отрисовываем пустой интерфейс
+        self._update_view()  # Сразу показываем пустой интерфейс, файл загрузится в фоне
+        if file_path:
+            # Окно еще не показано, но messagebox при ошибке откроется уже из главного цикла
+            self._load_in_background(file_path, "Initial Load Error", report_success=False)
+
+    # --- Фильтр по имени ---
+
+    def filter_changed(self, text: str):
+        """Обрабатывает ввод в поле фильтра: показывает только образцы с подходящими именами."""
+        self._filter_text = text
+        self._apply_filter(scroll_to_top=True)
+
+    def _is_filtered(self) -> bool:
+        return bool(self._filter_text.strip())
+
+    def _uses_display_list(self) -> bool:
+        """Показываются ли образцы не один к одному с моделью (фильтр или группы)."""
+        return self._is_filtered() or self.model.has_groups()
+
+    def _display_list(self) -> tuple[list[int] | None, dict[int, str]]:
+        """
+        Список элементов сетки для View и подписи заголовков групп.
+        Элемент >= 0 - индекс образца в модели, элемент < 0 - заголовок группы -id.
+        Образцы свернутой группы в список не попадают, поэтому View их не рисует
+        и даже не переводит их цвета в RGB. Под фильтром показываются группы с
+        найденными образцами - развернутыми, чтобы результаты были видны.
+        None - все образцы подряд, без групп и фильтра.
+        """
+        if not self._uses_display_list():
+            return None, {}
+        entries: list[int] = []
+        headers: dict[int, str] = {}
+        if self._is_filtered():
+            hits = self.model.filter_by_name(self._filter_text)
+            if not self.model.has_groups():
+                return hits, headers
+            counts = Counter(self.model.group_of(index) for index in hits)
+            current = NO_GROUP
+            for index in hits:
+                group = self.model.group_of(index)
+                if group != current and group != NO_GROUP:
+                    entries.append(-group)
+                    headers[-group] = f"▾ {self.model.get_group_name(group)} ({counts[group]} found)"
+                current = group
+                entries.append(index)
+            return entries, headers
+
+        for group, start, stop in self.model.get_group_runs():
+            if group == NO_GROUP:
+                entries.extend(range(start, stop))
+                continue
+            expanded = group in self._expanded_groups
+            entries.append(-group)
+            headers[-group] = f"{'▾' if expanded else '▸'} {self.model.get_group_name(group)} ({stop - start})"
+            if expanded:
+                entries.extend(range(start, stop))
+        return entries, headers
+
+    def _apply_filter(self, scroll_to_top: bool = False):
+        entries, headers = self._display_list()
+        self.view.set_display_indices(entries, headers, scroll_to_top)
+
+    def toggle_group(self, group: int):
+        """Обрабатывает щелчок по заголовку группы: сворачивает или разворачивает ее."""
+        if self._is_filtered():
+            return  # под фильтром группы с найденными образцами всегда развернуты
+        self._expanded_groups ^= {group}
+        self._apply_filter()
+
+    # --- Выделение ---
+
+    def _set_selection(self, swatch_ids: set[int], anchor: int | None = None):
+        self._selection = swatch_ids
+        self._anchor = anchor
+        self.view.set_selection(swatch_ids)
+        if swatch_ids:
+            self.view.show_status(f"{len(swatch_ids)} selected")
+
+    def _selected_indices(self) -> list[int]:
+        """Индексы выделенных образцов в модели (удаленные из модели образцы пропускаются)."""
+        return self.model.indices_of(self._selection) if self._selection else []
+
+    def _shown_indices(self) -> Sequence[int]:
+        """Индексы образцов в порядке показа в сетке (без заголовков и свернутых групп)."""
+        entries, _ = self._display_list()
+        if entries is None:
+            return range(self.model.swatch_count())
+        return [entry for entry in entries if entry >= 0]
+
+    def click_swatch(self, index: int, toggle: bool = False, extend: bool = False):
+        """
+        Обрабатывает щелчок по образцу: выделяет только его; toggle (Ctrl) - добавляет
+        или снимает выделение; extend (Shift) - выделяет образцы от предыдущего щелчка
+        до этого в порядке показа.
+        """
+        swatch_id = self.model.get_swatch_id(index)
+        if extend and self._anchor is not None:
+            shown = self._shown_indices()
+            anchor_index = self.model.index_of(self._anchor) if self._anchor in self._selection else None
+            if anchor_index in shown and index in shown:
+                first, last = sorted((shown.index(anchor_index), shown.index(index)))
+                ids = self.model.get_swatch_ids()
+                self._set_selection(self._selection | {ids[i] for i in shown[first:last + 1]}, self._anchor)
+                return
+        if toggle:
+            self._set_selection(self._selection ^ {swatch_id}, swatch_id)
+        else:
+            self._set_selection({swatch_id}, swatch_id)
+
+    def select_swatches(self, indices: Sequence[int], add: bool = False):
+        """Обрабатывает выделение рамкой: indices - образцы в рамке; add - добавить к выделенным."""
+        ids = self.model.get_swatch_ids()
+        selected = {ids[index] for index in indices}
+        self._set_selection(self._selection | selected if add else selected, self._anchor)
+
+    def select_all(self):
+        """Обрабатывает 'Select All' (Ctrl+A): выделяет все показанные образцы."""
+        ids = self.model.get_swatch_ids()
+        self._set_selection({ids[index] for index in self._shown_indices()})
+
+    def clear_selection(self):
+        if self._selection:
+            self._set_selection(set())
+            self.view.show_status("")
+
+    # --- Пакетные правки выделения (каждая - одна транзакция модели) ---
+
+    def _indices_to_edit(self) -> list[int]:
+        """Индексы выделенных образцов для правки; пустой список - править нечего или идет операция."""
+        if not self._ensure_idle():
+            return []
+        indices = self._selected_indices()
+        if not indices:
+            self.view.show_status("No swatches selected: click, Ctrl/Shift+click or drag a frame")
+        return indices
+
+    def convert_selection(self, mode: ColorMode):
+        """Обрабатывает 'Selection > Convert To'."""
+        indices = self._indices_to_edit()
+        if indices:
+            count = self.model.convert_swatches(indices, mode)
+            self.view.show_status(f"Converted {count} swatches to {mode.value}")
+
+    def set_selection_type(self, swatch_type: SwatchType):
+        """Обрабатывает 'Selection > Set Type'."""
+        indices = self._indices_to_edit()
+        if indices:
+            count = self.model.set_swatch_type(indices, swatch_type)
+            self.view.show_status(f"Changed type of {count} swatches to {swatch_type.value}")
+
+    def rename_selection(self):
+        """Обрабатывает 'Selection > Rename...': замена в именах по регулярному выражению."""
+        indices = self._indices_to_edit()
+        if not indices:
+            return
+        answer = self.view.ask_rename_pattern(len(indices))
+        if answer is None:
             return
         try:
-            self.model.load_from_ase(file_path)
-        except Exception as e:
-            # На раннем этапе View может быть еще не готов к показу messagebox,
-            # поэтому можно ограничиться выводом в консоль или отложить показ ошибки.
-            # Но для простоты сразу используем View.
-            self.view.show_error("Initial Load Error", str(e))
-        finally:
-            self._update_view()
+            count = self.model.rename_swatches(indices, *answer)
+        except re.error as e:
+            self.view.show_error("Rename", f"Invalid regular expression: {e}")
+            return
+        self.view.show_status(f"Renamed {count} swatches")
+
+    def adjust_selection_lightness(self):
+        """Обрабатывает 'Selection > Adjust Lightness...'."""
+        indices = self._indices_to_edit()
+        if not indices:
+            return
+        delta = self.view.ask_number("Adjust Lightness", "Change lightness L* by (-100..100):", -100, 100)
+        if delta:
+            self.model.adjust_lightness(indices, delta)
+            self.view.show_status(f"Lightness of {len(indices)} swatches changed by {delta:+g}")
+
+    def tint_selection(self):
+        """Обрабатывает 'Selection > Tint...': осветление к белому."""
+        indices = self._indices_to_edit()
+        if not indices:
+            return
+        percent = self.view.ask_number("Tint", "Lighten toward white, % (0..100):", 0, 100, 50)
+        if percent:
+            self.model.tint_swatches(indices, percent / 100)
+            self.view.show_status(f"Tinted {len(indices)} swatches by {percent:g}%")
+
+    def delete_selection(self):
+        """Обрабатывает 'Selection > Delete' (Delete)."""
+        indices = self._indices_to_edit()
+        if not indices:
+            return
+        if len(indices) > 1 and not self.view.ask_yes_no("Delete Swatches", f"Delete {len(indices)} swatches?"):
+            return
+        count = self.model.delete_swatches(indices)
+        self._set_selection(set())
+        self.view.show_status(f"Deleted {count} swatches")
+
+    # --- Фоновые операции с файлами ---
+
+    def is_busy(self) -> bool:
+        """Выполняется ли сейчас фоновая операция (правки модели в это время запрещены)."""
+        return self._task is not None
+
+    def _ensure_idle(self) -> bool:
+        """Проверка перед любой командой, меняющей модель или файл."""
+        if self._task is None:
+            return True
+        self.view.bell()
+        return False
+
+    def _start_task(self, description: str, work, on_done, error_title: str, cancellable: bool):
+        """Запускает работу в фоновом потоке и показывает ее прогресс во View."""
+        def finish(completed: bool) -> bool:
+            """
+            Возвращает False, если окно закрыто и результат уже не нужен. Если
+            сохранение не завершилось, окно не закрывается: иначе правки потеряются.
+            """
+            saving, self._saving = self._saving, None
+            self._task = None
+            if self._closing:
+                self._closing = False
+                if completed or saving is None:
+                    self.view.destroy()
+                    return False
+            self.view.hide_progress()
+            return True
+
+        def done(result):
+            if finish(True):
+                on_done(result)
+
+        def failed(error: Exception):
+            if finish(False):
+                self.view.show_error(error_title, str(error))
+
+        def cancelled():
+            if finish(False):
+                self.view.show_status(f"{description} cancelled")
+
+        self.view.show_progress(description, cancellable)
+        self._task = BackgroundTask(self.view, work, on_done=done, on_error=failed,
+                                    on_progress=self.view.update_progress,
+                                    on_cancelled=cancelled).start()
+
+    def _load_in_background(self, filename: str, error_title: str, report_success: bool = True):
+        def loaded(store):
+            # Модель меняется только здесь, в главном потоке
+            self.model.apply_loaded_store(store, filename)
+            self.workspace.enforce_budget()  # загруженная библиотека могла выйти за бюджет памяти
+            if report_success:
+                self.view.show_info("Load", f"Successfully loaded from {filename}")
+
+        self._start_task(f"Loading {Path(filename).name}",
+                         lambda progress, cancel: self.model.read_ase_store(filename, progress, cancel),
+                         loaded, error_title, cancellable=True)
+
+    def _save_in_background(self, filename: str | None, info_title: str):
+        try:
+            path_to_save = self.model.resolve_save_path(filename)
+        except ValueError as e:
+            self.view.show_error("Error", f"Failed to save ASE file: {e}")
+            return
+        if not self.model.needs_save(path_to_save):
+            self.view.show_status("No changes to save")
+            return
+
+        def saved(_):
+            self.model.mark_saved(path_to_save)
+            self._update_title()  # путь мог не измениться, а отметка правок - сняться
+            self.view.show_info(info_title, f"Saved to {path_to_save}")
+
+        # Файл пишется через временный, поэтому прерванное сохранение не портит его
+        self._saving = self.model
+        self._start_task(f"Saving {Path(path_to_save).name}",
+                         lambda progress, cancel: self.model.write_ase_file(path_to_save, progress, cancel),
+                         saved, "Error", cancellable=True)
+
+    def cancel_operation(self):
+        """Обрабатывает нажатие 'Cancel' в строке состояния."""
+        if self._task is not None:
+            self._task.cancel()
+
+    def _confirm_discard(self, libraries: list[SwatchModel] | None = None) -> bool:
+        """
+        Спрашивает, можно ли потерять несохраненные правки (если они есть)
+        в библиотеках libraries (по умолчанию - в активной).
+        """
+        modified = [library for library in (libraries if libraries is not None else [self.model])
+                    if library.is_modified()]
+        if not modified:
+            return True
+        if len(modified) == 1:
+            return self.view.ask_yes_no("Unsaved Changes", "There are unsaved changes. Discard them?")
+        return self.view.ask_yes_no("Unsaved Changes",
+                                    f"{len(modified)} open libraries have unsaved changes. Discard them?")
+
+    def close(self):
+        """
+        Закрытие окна. Несохраненные правки подтверждаются сразу, в том числе
+        во время фоновой операции (кроме библиотеки, которая сейчас сохраняется).
+        Если операция идет, окно закроется, когда ее поток завершится: сохранение
+        доделывается, остальные операции прерываются. Если сохранение не удалось,
+        окно остается открытым и показывает ошибку.
+        """
+        if self._closing:
+            return
+        if not self._confirm_discard([library for library in self.workspace if library is not self._saving]):
+            return
+        if self._task is None:
+            self.view.destroy()
+            return
+        self._closing = True
+        if self._saving is None:
+            self._task.cancel()
+
+    # --- Библиотеки (вкладки) ---
+
+    def _activate_library(self, index: int):
+        """Переключает контроллер и View на библиотеку index."""
+        self._expanded_by_library[self.model] = self._expanded_groups
+        self.model.unsubscribe(self._on_model_changed)
+        self.workspace.activate(index)
+        self._attach_active_library()
+
+    def _attach_active_library(self):
+        """Подписывается на активную библиотеку и показывает ее; выгруженная библиотека загружается заново."""
+        self.model = self.workspace.active
+        self.model.subscribe(self._on_model_changed)
+        self._expanded_groups = self._expanded_by_library.pop(self.model, set())
+        self._set_selection(set())
+        self._update_view()
+        if self.model.is_unloaded():
+            self._load_in_background(self.model.get_file_path(), "Error", report_success=False)
+
+    def select_library(self, index: int):
+        """Обрабатывает выбор вкладки библиотеки."""
+        if index == self.workspace.active_index:
+            return
+        if not self._ensure_idle():
+            self._update_tabs()  # вкладка уже выбрана во View - возвращаем выбор активной
+            return
+        self._activate_library(index)
+
+    def close_library(self):
+        """Обрабатывает 'Close Tab': закрывает активную библиотеку (последняя заменяется пустой)."""
+        if not self._ensure_idle() or not self._confirm_discard():
+            return
+        self.model.unsubscribe(self._on_model_changed)
+        self._expanded_by_library.pop(self.model, None)
+        self.workspace.remove_library(self.workspace.active_index)
+        self._attach_active_library()
 
     # --- Обработчики команд из меню ---
 
     def new_swatch_file(self):
-        """Создает новый, пустой список образцов."""
-        # В будущем здесь можно добавить диалог с подтверждением,
-        # если есть несохраненные изменения.
-        self.model.clear()
-        self._update_view()
+        """Открывает новую пустую библиотеку в отдельной вкладке."""
+        if not self._ensure_idle():
+            return
+        model = self.workspace.add_library()
+        self._activate_library(self.workspace.index_of(model))
+
+    def open_in_new_tab_dialog(self):
+        """Обрабатывает 'Open in New Tab...': ASE файл открывается рядом с текущими библиотеками."""
+        if not self._ensure_idle():
+            return
+        filename = self.view.ask_open_filename()
+        if not filename:
+            return
+        existing = self.workspace.find_by_path(filename)
+        if existing is not None:
+            self._activate_library(existing)
+            self.view.show_status(f"{Path(filename).name} is already open")
+            return
+        model = self.workspace.add_library()
+        self._activate_library(self.workspace.index_of(model))
+        self._load_in_background(filename, "Error")
 
     def load_ase_dialog(self):
         """Обрабатывает нажатие 'Load' в меню."""
+        if not self._ensure_idle() or not self._confirm_discard():
+            return
         filename = self.view.ask_open_filename()
         if not filename:
             return  # Пользователь отменил выбор файла
 
-        try:
-            self.model.load_from_ase(filename)
-            self._update_view()
-            self.view.show_info("Load", f"Successfully loaded from {filename}")
-        except Exception as e:
-            self.view.show_error("Error", f"Failed to load ASE file: {e}")
+        self._load_in_background(filename, "Error")
 
     def save_ase(self):
         """Обрабатывает нажатие 'Save'."""
+        if not self._ensure_idle():
+            return
         if not self.model.has_file_path():
             # Если проект еще не сохранялся, перенаправляем на 'Save As...'
             self.save_ase_as_dialog()
             return
 
-        try:
-            saved_path = self.model.save_to_ase()
-            self._update_view() # Обновляем заголовок, если нужно
-            self.view.show_info("Save", f"Saved to {saved_path}")
-        except Exception as e:
-            self.view.show_error("Error", f"Failed to save ASE file: {e}")
+        self._save_in_background(None, "Save")
 
     def save_ase_as_dialog(self):
         """Обрабатывает нажатие 'Save As...'."""
+        if not self._ensure_idle():
+            return
         filename = self.view.ask_save_as_filename(".ase", [("ASE files", "*.ase")])
         if not filename:
             return
 
-        try:
-            # Передаем новый путь в модель
-            self.model.save_to_ase(filename)
-            self._update_view() # Обновляем заголовок окна с новым путем
-            self.view.show_info("Save As", f"Saved to {filename}")
-        except Exception as e:
-            self.view.show_error("Error", f"Failed to save ASE file: {e}")
+        self._save_in_background(filename, "Save As")
 
-    def export_json_dialog(self):
-        """Обрабатывает нажатие 'Export Json'."""
-        filename = self.view.ask_save_as_filename(".json", [("JSON files", "*.json")])
+    def export_json_dialog(self, fmt: str = "indented"):
+        """Обрабатывает пункты 'Export JSON': fmt - indented, compact или ndjson (см. models.json_io)."""
+        if not self._ensure_idle():
+            return
+        if fmt == "ndjson":
+            filename = self.view.ask_save_as_filename(".ndjson", [("NDJSON files", "*.ndjson")])
+        else:
+            filename = self.view.ask_save_as_filename(".json", [("JSON files", "*.json")])
         if not filename:
             return
-        try:
-            self.model.export_to_json(filename)
-            self.view.show_info("Export JSON", f"Exported to {filename}")
-        except Exception as e:
-            self.view.show_error("Error", f"Failed to export to JSON: {e}")
+
+        def exported(colors: int):
+            self.view.show_info("Export JSON", f"Exported {colors} swatches to {filename}")
+
+        self._start_task(f"Exporting {Path(filename).name}",
+                         lambda progress, cancel: self.model.export_to_json(filename, fmt, progress, cancel),
+                         exported, "Failed to export to JSON", cancellable=True)
+
+    def import_json_dialog(self):
+        """Обрабатывает нажатие 'Import JSON...': JSON или NDJSON заменяет текущую библиотеку."""
+        if not self._ensure_idle() or not self._confirm_discard():
+            return
+        filename = self.view.ask_open_filename([("JSON files", "*.json *.ndjson"), ("All files", "*")])
+        if not filename:
+            return
+
+        def imported(store):
+            self.model.apply_imported_store(store)
+            self.view.show_info("Import JSON", f"Imported {self.model.swatch_count()} swatches from {filename}")
+
+        self._start_task(f"Importing {Path(filename).name}",
+                         lambda progress, cancel: self.model.read_json_store(filename, progress, cancel),
+                         imported, "Failed to import JSON", cancellable=True)
+
+    def find_duplicates(self):
+        """Обрабатывает нажатие 'Find Duplicates...': отчет и, с согласия пользователя, слияние."""
+        if not self._ensure_idle():
+            return
+
+        def found(report: DedupReport):
+            if not report.clusters and not report.duplicate_names:
+                self.view.show_info("Find Duplicates", "No duplicates found.")
+                return
+            message = self._describe_duplicates(report)
+            if not report.clusters:
+                self.view.show_info("Find Duplicates", message)
+                return
+            if self.view.ask_yes_no("Find Duplicates", message + "\n\nMerge similar swatches (keep the first of each group)?"):
+                removed = self.model.merge_duplicates(report.clusters)
+                self.view.show_info("Find Duplicates", f"Removed {removed} duplicate swatches.")
+
+        self._start_task("Searching for duplicates",
+                         lambda progress, cancel: self.model.find_duplicates(),
+                         found, "Error", cancellable=False)
+
+    def _describe_duplicates(self, report: DedupReport) -> str:
+        """Текст отчета: сводка и первые MAX_REPORT_LINES групп и повторяющихся имен."""
+        def name_of(swatch_id: int) -> str:
+            return self.model.get_swatch(self.model.index_of(swatch_id)).name
+
+        lines = [report.summary()]
+        for cluster in report.clusters[:self.MAX_REPORT_LINES]:
+            lines.append(f"  {name_of(cluster.representative)} <- "
+                         + ", ".join(name_of(i) for i in cluster.duplicates[:5])
+                         + (" ..." if len(cluster.duplicates) > 5 else ""))
+        if report.duplicate_names:
+            lines.append("Repeated names:")
+            for name, ids in list(report.duplicate_names.items())[:self.MAX_REPORT_LINES]:
+                lines.append(f"  {name} (x{len(ids)})")
+        return "\n".join(lines)
 
     # --- Обработчики редактирования ---
 
+    def undo(self):
+        """Обрабатывает 'Undo' (Ctrl+Z): отменяет последнюю правку модели."""
+        if not self._ensure_idle():
+            return
+        description = self.model.undo()
+        if description is None:
+            self.view.bell()
+        else:
+            self.view.show_status(f"Undo: {description}")
+
+    def redo(self):
+        """Обрабатывает 'Redo' (Ctrl+Y): повторяет отмененную правку."""
+        if not self._ensure_idle():
+            return
+        description = self.model.redo()
+        if description is None:
+            self.view.bell()
+        else:
+            self.view.show_status(f"Redo: {description}")
+
     def add_swatch(self):
         """Обрабатывает нажатие 'Add'."""
+        if not self._ensure_idle():
+            return
         # Создаем новый образец по умолчанию
         default_swatch = self.model.create_default_swatch()
-        self.model.add_swatch(default_swatch)
-
-        # Обновляем интерфейс, чтобы новый образец появился
-        self._update_view()
+        self.model.add_swatch(default_swatch)  # View добавит ячейку по уведомлению ADDED
 
         # Сразу открываем окно редактирования для нового образца
         new_index = len(self.model.get_swatches()) - 1
@@ -114,6 +626,8 @@ class SwatchController:
 
     def edit_swatch(self, index: int):
         """Открывает окно редактирования для выбранного образца."""
+        if not self._ensure_idle():
+            return
         try:
             swatch_to_edit = self.model.get_swatch(index)
             # View отвечает за отображение окна, передаем ему нужные данные
@@ -121,10 +635,47 @@ class SwatchController:
         except IndexError:
             self.view.show_error("Error", "Swatch not found. It might have been deleted.")
 
+    # View обновляется точечно по уведомлениям модели (см. _on_model_changed)
+
     def save_edited_swatch(self, index: int, updated_swatch: Swatch):
+        if not self._ensure_idle():
+            return
         self.model.update_swatch(index, updated_swatch)
-        self._update_view()
 
     def delete_swatch(self, index: int):
+        if not self._ensure_idle():
+            return
         self.model.delete_swatch(index)
-        self._update_view()
+
+    # --- Профилирование (режим --profile, см. utils.instrumentation) ---
+
+    def is_profiling(self) -> bool:
+        return instrumentation.enabled
+
+    def show_profile_stats(self):
+        """Обрабатывает 'Profiling Stats...': окно с замерами горячих участков."""
+        self.view.open_stats_window(instrumentation.is_cprofile_enabled())
+
+    def get_profile_stats(self) -> dict:
+        return instrumentation.snapshot()
+
+    def reset_profile_stats(self):
+        instrumentation.reset()
+
+    def save_profile_stats_dialog(self, kind: str = "json"):
+        """Сохраняет замеры в JSON (kind='json') или статистику cProfile (kind='cprofile')."""
+        if kind == "cprofile":
+            filename = self.view.ask_save_as_filename(".prof", [("cProfile stats", "*.prof")])
+        else:
+            filename = self.view.ask_save_as_filename(".json", [("JSON files", "*.json")])
+        if not filename:
+            return
+        try:
+            if kind == "cprofile":
+                instrumentation.dump_cprofile(filename)
+            else:
+                instrumentation.dump_json(filename)
+        except (OSError, ValueError) as e:
+            self.view.show_error("Profiling", f"Failed to save profile: {e}")
+            return
+        self.view.show_status(f"Profile saved to {filename}")
@@ -1,17 +1,28 @@
+import time
+# Отсчет для режима --startup-time: как можно раньше, до остальных импортов
+_STARTUP_BEGIN = time.perf_counter()
+
 import os
 import sys
 import configparser
+import multiprocessing
+
+from utils.startup_timer import StartupTimer
+from utils.instrumentation import instrumentation, profile_mode, is_profile_flag, default_dump_dir
+
+STARTUP_TIME_FLAG = "--startup-time"
+
+
+def get_application_path() -> str:
+    """Каталог программы: рядом с exe в сборке PyInstaller, иначе каталог main.py."""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
 
-from views import SwatchEditorView
-from controllers import SwatchController
-from models import SwatchModel
 
 def get_initial_file_path() -> str | None:
     """Определяет путь к файлу для загрузки на старте из config.ini."""
-    if getattr(sys, 'frozen', False):
-        application_path = os.path.dirname(sys.executable)
-    else:
-        application_path = os.path.dirname(os.path.abspath(__file__))
+    application_path = get_application_path()
 
     try:
         config_path = os.path.join(application_path, 'config.ini')
@@ -28,13 +39,40 @@ def get_initial_file_path() -> str | None:
     return None
 
 
-if __name__ == '__main__':
-    # Шаг 1: Создаем все компоненты MVC
-    model = SwatchModel()
+def get_memory_settings() -> tuple[str | None, int, int]:
+    """
+    Настройки памяти из config.ini: каталог и размер (МБ) кэша разбора ASE файлов -
+    cache_dir (по умолчанию - пользовательский каталог кэшей), cache_size_mb
+    (по умолчанию 256; 0 отключает кэш) - и memory_budget_mb, объем данных открытых
+    библиотек, сверх которого неактивные библиотеки выгружаются (по умолчанию 512).
+    """
+    config = configparser.ConfigParser()
+    try:
+        config.read(os.path.join(get_application_path(), 'config.ini'))
+        return (config.get('Settings', 'cache_dir', fallback=None) or None,
+                config.getint('Settings', 'cache_size_mb', fallback=256),
+                config.getint('Settings', 'memory_budget_mb', fallback=512))
+    except (configparser.Error, ValueError) as e:
+        print(f"Error reading memory settings: {e}")
+        return None, 256, 512
+
+
+def run_gui(timer: StartupTimer):
+    # GUI импортируется только здесь: подкомандам CLI и рабочим процессам Tkinter не нужен
+    from views import SwatchEditorView
+    from controllers import SwatchController
+    from models import Workspace, ParseCache
+    timer.mark("imports")
+
+    # Шаг 1: Создаем все компоненты MVC. Модель - рабочее пространство с открытыми библиотеками
+    cache_dir, cache_size_mb, memory_budget_mb = get_memory_settings()
+    parse_cache = ParseCache(cache_dir, cache_size_mb * 1024 * 1024) if cache_size_mb > 0 else None
+    workspace = Workspace(memory_budget_mb * 1024 * 1024, parse_cache)
     view = SwatchEditorView()  # Создаем View без контроллера
+    timer.mark("window created")
 
     # Шаг 2: Создаем Контроллер, передавая ему уже созданные Модель и Представление
-    controller = SwatchController(model=model, view=view)
+    controller = SwatchController(workspace=workspace, view=view)
 
     # Шаг 3: Теперь, когда Контроллер готов, связываем его с Представлением.
     # Это позволит View завершить свою настройку (например, создать меню).
@@ -43,6 +81,40 @@ if __name__ == '__main__':
     # Шаг 4: Запускаем начальную загрузку через контроллер
     initial_file = get_initial_file_path()
     controller.run_initial_load(initial_file)
+    timer.mark("initial load")
+
+    # В режиме замера ждем первой отрисовки окна, выводим отчет и закрываемся
+    if timer.enabled:
+        def finish_measurement():
+            view.update()
+            timer.mark("first paint")
+            timer.write_report(get_application_path())
+            view.destroy()
+        view.after_idle(finish_measurement)
 
     # Шаг 5: Запускаем главный цикл приложения
     view.mainloop()
+
+
+if __name__ == '__main__':
+    # Нужен для пула процессов в собранном PyInstaller exe
+    multiprocessing.freeze_support()
+
+    # Режим профилирования (--profile[=cprofile] или YASE_PROFILE): замеры участков,
+    # окно Tools > Profiling Stats и отчет при выходе (см. utils.instrumentation)
+    try:
+        mode = profile_mode(sys.argv[1:])
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+    if mode:
+        instrumentation.enable(cprofile=mode == "cprofile", dump_dir=default_dump_dir())
+    argv = [arg for arg in sys.argv[1:] if not is_profile_flag(arg)]
+
+    # Подкоманды (convert, ...) выполняются без GUI
+    import cli
+    if cli.is_cli_command(argv):
+        sys.exit(cli.main(argv))
+
+    timer = StartupTimer(_STARTUP_BEGIN, enabled=STARTUP_TIME_FLAG in argv)
+    run_gui(timer)
@@ -1,6 +1,15 @@
-from .color_data_class import Color, ColorLAB, ColorRGB, ColorCMYK
+from .color_data_class import Color, ColorLAB, ColorRGB, ColorCMYK, conversion_cache
 from .swatch_model import SwatchModel
-from .common_data_classes import SwatchType, ColorMode, Swatch
+from .swatch_store import NO_GROUP
+from .color_index import ColorIndex, ColorMatch
+from .dedup import DedupReport, DuplicateCluster
+from .name_index import NameIndex
+from .parse_cache import ParseCache
+from .workspace import Workspace
+from .common_data_classes import SwatchType, ColorMode, Swatch, ModelEvent, ModelChange, OperationCancelled
 
 __all__ = ["Color", "ColorLAB", "ColorRGB", "ColorCMYK", "SwatchModel",
-           "SwatchType", "ColorMode", "Swatch"]
+           "SwatchType", "ColorMode", "Swatch", "conversion_cache",
+           "ModelEvent", "ModelChange", "OperationCancelled",
+           "ColorIndex", "ColorMatch", "DedupReport", "DuplicateCluster",
+           "NameIndex", "NO_GROUP", "ParseCache", "Workspace"]
@@ -0,0 +1,279 @@
+"""
+Потоковое чтение и запись файлов Adobe Swatch Exchange (.ase).
+
+Формат файла:
+    'ASEF' + версия (2 x uint16) + количество блоков (uint32)
+    далее блоки: тип (uint16) + длина данных (uint32) + данные
+
+Типы блоков:
+    0x0001 - цвет: имя (UTF-16BE с '\\0'), режим ('RGB ', 'LAB ', 'CMYK', 'Gray'),
+             значения (float32), тип образца (int16: 0 - Global, 1 - Spot, 2 - Process)
+    0xC001 - начало группы (Color Group): только имя
+    0xC002 - конец группы: пустые данные
+
+В отличие от swatch.parse/swatch.write, здесь файл не собирается целиком
+в список словарей: чтение - генератор блоков, запись - из любого итерируемого
+объекта. Это позволяет обрабатывать библиотеки любого размера с постоянным
+расходом памяти.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import struct
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import Enum
+from typing import IO, BinaryIO, Iterable, Iterator
+
+from .common_data_classes import Swatch
+
+ASE_SIGNATURE = b"ASEF"
+ASE_VERSION = (1, 0)
+
+_HEADER = struct.Struct(">4sHHI")
+_BLOCK_HEAD = struct.Struct(">HI")
+_NAME_LENGTH = struct.Struct(">H")
+_SWATCH_TYPE = struct.Struct(">h")
+
+# Количество float-значений для каждого режима (режим в файле дополнен пробелами до 4 байт)
+_MODE_CHANNELS = {"RGB": 3, "LAB": 3, "CMYK": 4, "Gray": 1}
+_SWATCH_TYPES = ["Global", "Spot", "Process"]
+
+# Размер порции чтения. Блоки читаются по одному, но через буфер файла.
+READ_BUFFER_SIZE = 1 << 16
+
+
+class AseFormatError(ValueError):
+    """Файл не является корректным ASE файлом."""
+
+
+class BlockKind(Enum):
+    COLOR = 0x0001
+    GROUP_START = 0xC001
+    GROUP_END = 0xC002
+
+
+@dataclass(slots=True)
+class AseBlock:
+    """Один блок ASE файла в том виде, в каком он записан на диске."""
+    kind: BlockKind
+    name: str = ""
+    type: str | None = None            # 'Global' | 'Spot' | 'Process' (только для цветов)
+    mode: str | None = None            # 'RGB' | 'LAB' | 'CMYK' | 'Gray' (только для цветов)
+    values: list[float] | None = None  # нормализованные значения, как в swatch.parse
+    offset: int = 0                    # смещение начала блока в файле
+    size: int = 0                      # размер блока в файле вместе с заголовком
+
+    def to_dict(self) -> dict:
+        """Возвращает словарь в формате swatch.parse (для групп - без 'swatches')."""
+        if self.kind is BlockKind.COLOR:
+            return {
+                'name': self.name,
+                'type': self.type,
+                'data': {'mode': self.mode, 'values': list(self.values)}
+            }
+        return {'name': self.name, 'type': 'Color Group'}
+
+
+def group_start(name: str) -> AseBlock:
+    """Маркер начала группы для передачи в write_ase вместе с образцами."""
+    return AseBlock(BlockKind.GROUP_START, name)
+
+
+def group_end() -> AseBlock:
+    """Маркер конца группы для передачи в write_ase."""
+    return AseBlock(BlockKind.GROUP_END)
+
+
+# --- Чтение ---
+
+def read_header(fp: BinaryIO) -> int:
+    """Читает заголовок файла и возвращает заявленное количество блоков."""
+    raw = fp.read(_HEADER.size)
+    if len(raw) < _HEADER.size:
+        raise AseFormatError("File is too short to be an ASE file.")
+    signature, v_major, v_minor, block_count = _HEADER.unpack(raw)
+    if signature != ASE_SIGNATURE:
+        raise AseFormatError("Not an ASE file: wrong signature.")
+    if (v_major, v_minor) != ASE_VERSION:
+        raise AseFormatError(f"Unsupported ASE version {v_major}.{v_minor}.")
+    return block_count
+
+
+def _decode_block(kind: BlockKind, payload: bytes, offset: int) -> AseBlock:
+    """Разбирает данные одного блока."""
+    size = _BLOCK_HEAD.size + len(payload)
+    if kind is BlockKind.GROUP_END:
+        return AseBlock(kind, offset=offset, size=size)
+
+    name_units = _NAME_LENGTH.unpack_from(payload)[0]
+    name_end = _NAME_LENGTH.size + name_units * 2
+    name = payload[_NAME_LENGTH.size:name_end].decode("utf-16-be").rstrip("\0")
+
+    if kind is BlockKind.GROUP_START:
+        return AseBlock(kind, name, offset=offset, size=size)
+
+    mode = payload[name_end:name_end + 4].decode("ascii").strip()
+    channels = _MODE_CHANNELS.get(mode)
+    if channels is None:
+        raise AseFormatError(f"Unknown color mode '{mode}' in swatch '{name}'.")
+    values = list(struct.unpack_from(f">{channels}f", payload, name_end + 4))
+    type_index = _SWATCH_TYPE.unpack_from(payload, name_end + 4 + channels * 4)[0]
+    # Тип - знаковое int16: отрицательный индекс в списке брал бы тип с конца
+    if not 0 <= type_index < len(_SWATCH_TYPES):
+        raise AseFormatError(f"Unknown swatch type {type_index} in swatch '{name}'.")
+    return AseBlock(kind, name, _SWATCH_TYPES[type_index], mode, values, offset, size)
+
+
+def iter_blocks(fp: BinaryIO) -> Iterator[AseBlock]:
+    """
+    Генератор блоков из открытого (бинарного) файла.
+    Ожидает, что заголовок уже прочитан через read_header.
+    """
+    offset = fp.tell()
+    while True:
+        head = fp.read(_BLOCK_HEAD.size)
+        if not head:
+            return
+        if len(head) < _BLOCK_HEAD.size:
+            raise AseFormatError(f"Truncated block header at offset {offset}.")
+        code, length = _BLOCK_HEAD.unpack(head)
+        try:
+            kind = BlockKind(code)
+        except ValueError:
+            raise AseFormatError(f"Unknown block type 0x{code:04X} at offset {offset}.") from None
+        payload = fp.read(length)
+        if len(payload) < length:
+            raise AseFormatError(f"Truncated block at offset {offset}.")
+        yield _decode_block(kind, payload, offset)
+        offset += _BLOCK_HEAD.size + length
+
+
+def read_ase(filename: str) -> Iterator[AseBlock]:
+    """Открывает файл и по одному отдает его блоки. Файл закрывается по окончании."""
+    with open(filename, "rb", buffering=READ_BUFFER_SIZE) as fp:
+        read_header(fp)
+        yield from iter_blocks(fp)
+
+
+# --- Запись ---
+
+def _encode_name(name: str) -> bytes:
+    encoded = (name + "\0").encode("utf-16-be")
+    return _NAME_LENGTH.pack(len(encoded) // 2) + encoded
+
+
+def encode_color(name: str, swatch_type: str, mode: str, values: Iterable[float]) -> bytes:
+    """Кодирует блок цвета целиком (вместе с заголовком блока)."""
+    values = list(values)
+    if _MODE_CHANNELS.get(mode) != len(values):
+        raise ValueError(f"Color mode '{mode}' expects {_MODE_CHANNELS.get(mode)} values, got {len(values)}.")
+    payload = b"".join((
+        _encode_name(name),
+        mode.ljust(4).encode("ascii"),
+        struct.pack(f">{len(values)}f", *values),
+        _SWATCH_TYPE.pack(_SWATCH_TYPES.index(swatch_type)),
+    ))
+    return _BLOCK_HEAD.pack(BlockKind.COLOR.value, len(payload)) + payload
+
+
+def encode_group_start(name: str) -> bytes:
+    payload = _encode_name(name)
+    return _BLOCK_HEAD.pack(BlockKind.GROUP_START.value, len(payload)) + payload
+
+
+def encode_group_end() -> bytes:
+    return _BLOCK_HEAD.pack(BlockKind.GROUP_END.value, 0)
+
+
+def encode_item(item: Swatch | AseBlock) -> bytes:
+    """Кодирует образец или маркер группы в байты блока."""
+    if isinstance(item, Swatch):
+        return encode_color(item.name, item.type.value, item.mode.value, item.color.to_normalized())
+    if item.kind is BlockKind.GROUP_START:
+        return encode_group_start(item.name)
+    if item.kind is BlockKind.GROUP_END:
+        return encode_group_end()
+    return encode_color(item.name, item.type, item.mode, item.values)
+
+
+def _is_color(item: Swatch | AseBlock) -> bool:
+    return isinstance(item, Swatch) or item.kind is BlockKind.COLOR
+
+
+def write_blocks(fp: BinaryIO, items: Iterable[Swatch | AseBlock], spans: array | None = None) -> int:
+    """
+    Пишет блоки в открытый файл, поддерживающий seek. Количество блоков
+    заранее неизвестно, поэтому в заголовок сначала пишется 0, а после
+    записи всех блоков заголовок исправляется. Возвращает количество блоков.
+    spans - если передан, в него добавляются смещение и размер каждого блока цвета
+    (по два числа на цвет) - по ним потом можно переписать блок на месте (patch_blocks).
+    """
+    start = fp.tell()
+    fp.write(_HEADER.pack(ASE_SIGNATURE, *ASE_VERSION, 0))
+    offset = fp.tell()
+    count = 0
+    for item in items:
+        data = encode_item(item)
+        fp.write(data)
+        if spans is not None and _is_color(item):
+            spans.extend((offset, len(data)))
+        offset += len(data)
+        count += 1
+    end = fp.tell()
+    fp.seek(start)
+    fp.write(_HEADER.pack(ASE_SIGNATURE, *ASE_VERSION, count))
+    fp.seek(end)
+    return count
+
+
+@contextmanager
+def atomic_write(filename: str, mode: str = "wb", **open_kwargs) -> Iterator[IO]:
+    """
+    Открывает для записи временный файл рядом с filename; после успешного выхода
+    из блока with он переименовывается в filename. При ошибке или прерывании
+    прежний файл остается нетронутым, а временный удаляется.
+    """
+    temp_name = f"{filename}.{os.getpid()}.tmp"
+    try:
+        with open(temp_name, mode, **open_kwargs) as fp:
+            yield fp
+            fp.flush()
+            os.fsync(fp.fileno())
+        if os.path.exists(filename):
+            shutil.copymode(filename, temp_name)
+        os.replace(temp_name, filename)
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+        raise
+
+
+def write_ase(items: Iterable[Swatch | AseBlock], filename: str, spans: array | None = None) -> int:
+    """
+    Записывает образцы (и маркеры групп group_start/group_end) в ASE файл.
+    Если файл существует, он будет заменен. Возвращает количество блоков.
+    Запись атомарная (см. atomic_write): исключение из items не портит прежний файл.
+    """
+    with atomic_write(filename) as fp:
+        return write_blocks(fp, items, spans)
+
+
+def patch_blocks(filename: str, blocks: Iterable[tuple[int, bytes]]) -> int:
+    """
+    Переписывает на месте блоки существующего файла: (смещение, новые байты блока).
+    Размер каждого блока должен совпадать со старым - это проверяет вызывающий
+    (см. spans в write_blocks). Остальная часть файла не читается и не пишется.
+    Возвращает количество переписанных блоков.
+    """
+    count = 0
+    with open(filename, "r+b") as fp:
+        for offset, data in blocks:
+            fp.seek(offset)
+            fp.write(data)
+            count += 1
+        fp.flush()
+        os.fsync(fp.fileno())
+    return count
@@ -1,12 +1,87 @@
+from __future__ import annotations
+import functools
 from abc import ABC, abstractmethod
-from colormath.color_objects import LabColor, sRGBColor, CMYKColor
-from colormath.color_conversions import convert_color
-from typing import List, Union, Type
+from collections import OrderedDict
+from typing import List, Union, Type, TYPE_CHECKING
 from .common_data_classes import ColorMode
+from . import color_formulas
+
+from utils.instrumentation import instrumented
+
+if TYPE_CHECKING:
+    from colormath.color_objects import LabColor, sRGBColor, CMYKColor
+
+
+@functools.cache
+def _colormath():
+    """
+    Ленивый импорт colormath. Вместе с ним загружаются NumPy и networkx,
+    а это большая часть времени запуска, хотя нужен он только при первой конвертации.
+    Возвращает (модуль color_objects, функция convert_color).
+    """
+    from colormath import color_objects
+    from colormath.color_conversions import convert_color
+    return color_objects, convert_color
+
+
+class ConversionCache:
+    """
+    Ограниченный (LRU) кэш результатов конвертации цветов.
+    Ключ - (режим, нормализованные значения, цель), где цель - ColorMode или 'HEX'.
+    Значение - нормализованные значения результата (или строка для 'HEX').
+    """
+    HEX = "HEX"
+
+    def __init__(self, maxsize: int = 65536):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+
+    @staticmethod
+    def make_key(color: 'Color', target) -> tuple:
+        return color.mode, tuple(color.to_normalized()), target
+
+    def get(self, key: tuple):
+        """Возвращает значение или None. Найденный ключ становится самым "свежим"."""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: tuple, value) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, color: 'Color') -> None:
+        """Удаляет из кэша все результаты для данного цвета."""
+        values = tuple(color.to_normalized())
+        for target in (*ColorMode, self.HEX):
+            self._data.pop((color.mode, values, target), None)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = self.misses = 0
+
+    def info(self) -> dict:
+        """Счетчики попаданий/промахов и текущий размер кэша."""
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._data), 'maxsize': self.maxsize}
+
+
+# Общий кэш для всех цветов приложения
+conversion_cache = ConversionCache()
 
 
 class Color(ABC):
-    colormath_class = None  # будет переопределен в подклассах
+    __slots__ = ()  # значения хранятся в слотах подклассов, без __dict__ на каждый цвет
+    colormath_class_name: str = None  # будет переопределен в подклассах (имя класса из colormath.color_objects)
 
     @abstractmethod
     def to_normalized(self) -> List[float]:
@@ -23,6 +98,11 @@ class Color(ABC):
         """Возвращает объект colormath для конвертации"""
         pass
 
+    @classmethod
+    def get_colormath_class(cls):
+        """Класс colormath для этого режима (colormath импортируется при первом вызове)."""
+        return getattr(_colormath()[0], cls.colormath_class_name)
+
     @classmethod
     @abstractmethod
     def from_colormath(cls, color):
@@ -35,8 +115,28 @@ class Color(ABC):
         """Инкапсулируем метаданные о названиях каналов и диапазоне, в котором может меняться числовое значение канала (со стороны юзера)"""
         pass
 
+    @abstractmethod
+    def _srgb(self) -> tuple[float, float, float]:
+        """sRGB 0-1 без ограничения охватом, по формулам color_formulas"""
+        pass
+
+    def preview_rgb(self) -> tuple[float, float, float]:
+        """
+        Цвет для показа: sRGB 0-1, ограниченный охватом. Считается в замкнутой
+        форме (color_formulas), без colormath; совпадает с convert_to(RGB) до ~1e-12.
+        """
+        return color_formulas.clamp_rgb(*self._srgb())
+
+    def preview_lab(self) -> tuple[float, float, float]:
+        """LAB в единицах пользователя (L 0-100), как convert_to(LAB), но без colormath."""
+        return color_formulas.srgb_to_lab(*self._srgb())
+
+    @instrumented("color.convert_to")
     def convert_to(self, target_mode: ColorMode) -> 'Color':
-        """Конвертирует цвет в другой формат"""
+        """
+        Конвертирует цвет в другой формат через colormath. Это точный путь для
+        значений, которые попадут в файл; для показа - preview_rgb/preview_lab.
+        """
         # Определяем класс цвета по целевому режиму
         target_class = {
             ColorMode.RGB: ColorRGB,
@@ -44,12 +144,20 @@ class Color(ABC):
             ColorMode.LAB: ColorLAB
         }[target_mode]
 
+        key = conversion_cache.make_key(self, target_mode)
+        cached = conversion_cache.get(key)
+        if cached is not None:
+            return target_class(*cached, is_normalized=True)
+
         # Используем colormath для конвертации
         source_colormath = self.to_colormath()
-        data_from_colormath = convert_color(source_colormath, target_class.colormath_class)
+        convert_color = _colormath()[1]
+        data_from_colormath = convert_color(source_colormath, target_class.get_colormath_class())
 
         # Создаем новый объект нужного типа
-        return target_class.from_colormath(data_from_colormath)
+        result = target_class.from_colormath(data_from_colormath)
+        conversion_cache.put(key, tuple(result.to_normalized()))
+        return result
 
     @staticmethod
     def create_from_data(data: dict, is_normalized: bool) -> 'Color':
@@ -100,19 +208,23 @@ class Color(ABC):
 
         return found_class
 
+    @instrumented("color.to_hex")
     def to_hex(self) -> str:
-        """Возвращает HEX-представление цвета, используя RGB"""
+        """
+        Возвращает HEX-представление цвета для показа (см. preview_rgb).
+        Считается быстрее, чем ищется в conversion_cache, поэтому не кэшируется.
+        """
         try:
-            rgb_color = self.convert_to(ColorMode.RGB)
-            rgb = rgb_color.to_user()
-            return '#{:02x}{:02x}{:02x}'.format(*[int(round(c)) for c in rgb])
-        except Exception:
+            r, g, b = self.preview_rgb()
+            return '#{:02x}{:02x}{:02x}'.format(round(r * 255), round(g * 255), round(b * 255))
+        except (ArithmeticError, TypeError, ValueError):
             return "#888888"
 
 
 class ColorRGB(Color):
+    __slots__ = ('_r', '_g', '_b')
     mode = ColorMode.RGB
-    colormath_class = sRGBColor
+    colormath_class_name = 'sRGBColor'
 
     def __init__(self, r: float, g: float, b: float, is_normalized: bool = False):
         if is_normalized:
@@ -129,7 +241,10 @@ class ColorRGB(Color):
         return [round(self._r * 255), round(self._g * 255), round(self._b * 255)]
 
     def to_colormath(self) -> sRGBColor:
-        return sRGBColor(self._r, self._g, self._b)
+        return self.get_colormath_class()(self._r, self._g, self._b)
+
+    def _srgb(self) -> tuple[float, float, float]:
+        return self._r, self._g, self._b
 
 
     # @classmethod
@@ -167,8 +282,9 @@ class ColorRGB(Color):
         return ["R", "G", "B"], [(0, 255)] * 3
 
 class ColorLAB(Color):
+    __slots__ = ('_l', '_a', '_b')
     mode = ColorMode.LAB
-    colormath_class = LabColor
+    colormath_class_name = 'LabColor'
 
     def __init__(self, l: float, a: float, b: float, is_normalized: bool):
         if is_normalized:
@@ -183,7 +299,13 @@ class ColorLAB(Color):
         return [round(self._l * 100), round(self._a), round(self._b)]
 
     def to_colormath(self) -> LabColor:
-        return LabColor(self._l * 100, self._a, self._b)
+        return self.get_colormath_class()(self._l * 100, self._a, self._b)
+
+    def _srgb(self) -> tuple[float, float, float]:
+        return color_formulas.lab_to_srgb(self._l * 100, self._a, self._b)
+
+    def preview_lab(self) -> tuple[float, float, float]:
+        return self._l * 100, self._a, self._b
 
     @classmethod
     def from_colormath(cls, color: LabColor) -> 'ColorLAB':
@@ -194,8 +316,9 @@ class ColorLAB(Color):
         return ["L", "a", "b"], [(0, 100), (-128, 127), (-128, 127)]
 
 class ColorCMYK(Color):
+    __slots__ = ('_c', '_m', '_y', '_k')
     mode = ColorMode.CMYK
-    colormath_class = CMYKColor
+    colormath_class_name = 'CMYKColor'
 
     def __init__(self, c: float, m: float, y: float, k: float, is_normalized: bool = False):
         if is_normalized:
@@ -213,7 +336,10 @@ class ColorCMYK(Color):
         return [round(v * 100) for v in [self._c, self._m, self._y, self._k]]
 
     def to_colormath(self) -> CMYKColor:
-        return CMYKColor(self._c, self._m, self._y, self._k)
+        return self.get_colormath_class()(self._c, self._m, self._y, self._k)
+
+    def _srgb(self) -> tuple[float, float, float]:
+        return color_formulas.cmyk_to_srgb(self._c, self._m, self._y, self._k)
 
     @classmethod
     def get_metadata(cls) -> tuple[list[str], list[tuple[float, float]]]:
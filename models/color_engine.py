@@ -0,0 +1,328 @@
+"""
+Пакетная конвертация цветов на NumPy.
+
+Color.convert_to работает с одним цветом и на каждый вызов создает несколько
+объектов colormath. Здесь те же формулы применяются сразу ко всему массиву
+значений, поэтому палитра из десятков тысяч цветов конвертируется за один проход.
+
+Формулы повторяют colormath 3.0 (sRGB, наблюдатель 2°):
+    LAB -> RGB:  LAB (D50) -> XYZ -> адаптация Bradford D50 -> D65 -> sRGB
+    RGB -> LAB:  sRGB -> XYZ (D65) -> LAB относительно D65 (colormath не делает
+                 обратную адаптацию, и мы тоже, чтобы результаты совпадали)
+    CMYK <-> RGB: через CMY, как в colormath
+
+Значения на входе и выходе - в нормализованном формате (как Color.to_normalized):
+RGB и CMYK в диапазоне 0-1, L в LAB - 0-1, a и b - как есть.
+
+Расхождение с colormath не превышает CONVERSION_TOLERANCE по каждому
+нормализованному каналу (проверяется в benchmarks/bench_convert.py).
+"""
+from __future__ import annotations
+
+import functools
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from . import color_formulas
+from .common_data_classes import ColorMode
+from .color_data_class import Color
+from .swatch_store import SwatchStore, CHANNELS, MODE_CODES
+
+from utils.instrumentation import instrumented
+
+# Допустимое расхождение с colormath (нормализованные единицы).
+# Разница возникает только из-за порядка операций с плавающей точкой.
+CONVERSION_TOLERANCE = 1e-6
+
+CHANNEL_COUNT = {ColorMode.RGB: 3, ColorMode.LAB: 3, ColorMode.CMYK: 4}
+
+# Константы colormath (см. color_formulas - там же поштучный вариант формул)
+_CIE_E = color_formulas.CIE_E
+_WHITE_D50 = np.array(color_formulas.WHITE_D50)
+_WHITE_D65 = np.array(color_formulas.WHITE_D65)
+_XYZ_TO_RGB = np.array(color_formulas.XYZ_TO_RGB)
+_RGB_TO_XYZ = np.array(color_formulas.RGB_TO_XYZ)
+_D50_TO_D65 = np.array(color_formulas.D50_TO_D65)
+
+
+# --- Отдельные шаги конвертации (массивы формы (n, каналы)) ---
+
+def _lab_to_xyz(lab: np.ndarray, white: np.ndarray) -> np.ndarray:
+    """LAB (L в диапазоне 0-100) -> XYZ."""
+    fy = (lab[:, 0] + 16.0) / 116.0
+    f = np.stack((lab[:, 1] / 500.0 + fy, fy, fy - lab[:, 2] / 200.0), axis=1)
+    cube = f ** 3
+    xyz = np.where(cube > _CIE_E, cube, (f - 16.0 / 116.0) / 7.787)
+    return xyz * white
+
+
+def _xyz_to_lab(xyz: np.ndarray, white: np.ndarray) -> np.ndarray:
+    """XYZ -> LAB (L в диапазоне 0-100)."""
+    t = xyz / white
+    f = np.where(t > _CIE_E, np.cbrt(t), 7.787 * t + 16.0 / 116.0)
+    return np.stack((116.0 * f[:, 1] - 16.0,
+                     500.0 * (f[:, 0] - f[:, 1]),
+                     200.0 * (f[:, 1] - f[:, 2])), axis=1)
+
+
+def _xyz_to_srgb(xyz: np.ndarray) -> np.ndarray:
+    """XYZ (D65) -> sRGB без ограничения сверху (как convert_color до clamped_rgb)."""
+    linear = np.maximum(xyz @ _XYZ_TO_RGB.T, 0.0)
+    with np.errstate(invalid="ignore"):
+        return np.where(linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1 / 2.4) - 0.055)
+
+
+def _srgb_to_xyz(rgb: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore"):
+        linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    return np.maximum(linear @ _RGB_TO_XYZ.T, 0.0)
+
+
+def _cmyk_to_srgb(cmyk: np.ndarray) -> np.ndarray:
+    k = cmyk[:, 3:4]
+    return 1.0 - (cmyk[:, :3] * (1.0 - k) + k)
+
+
+def _srgb_to_cmyk(rgb: np.ndarray) -> np.ndarray:
+    cmy = 1.0 - rgb
+    k = np.minimum(cmy.min(axis=1, keepdims=True), 1.0)
+    black = (k == 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cmy = np.where(black, 0.0, (cmy - k) / (1.0 - k))
+    return np.concatenate((cmy, k), axis=1)
+
+
+def _srgb_to_cmyk_keeping_black(rgb: np.ndarray, black: np.ndarray) -> np.ndarray:
+    """
+    sRGB -> CMYK с заданным черным black (форма (n, 1)), где цвет так получается;
+    остальные цвета - с черным, посчитанным заново (_srgb_to_cmyk).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cmy = (1.0 - rgb - black) / (1.0 - black)
+    fits = (black[:, 0] < 1.0) & np.all((cmy > -1e-9) & (cmy < 1.0 + 1e-9), axis=1)
+    kept = np.concatenate((np.clip(cmy, 0.0, 1.0), black), axis=1)
+    return np.where(fits[:, None], kept, _srgb_to_cmyk(rgb))
+
+
+def _to_srgb(values: np.ndarray, source: ColorMode) -> np.ndarray:
+    """Любой режим -> sRGB (без ограничения диапазона)."""
+    if source is ColorMode.RGB:
+        return values
+    if source is ColorMode.CMYK:
+        return _cmyk_to_srgb(values)
+    lab = values * (100.0, 1.0, 1.0)
+    return _xyz_to_srgb(_lab_to_xyz(lab, _WHITE_D50) @ _D50_TO_D65.T)
+
+
+def convert_array(values: np.ndarray | Sequence[Sequence[float]],
+                  source: ColorMode, target: ColorMode) -> np.ndarray:
+    """
+    Конвертирует массив нормализованных значений формы (n, каналы источника)
+    в массив формы (n, каналы цели). Результат совпадает с Color.convert_to
+    с точностью CONVERSION_TOLERANCE.
+    """
+    values = np.asarray(values, dtype=np.float64).reshape(-1, CHANNEL_COUNT[source])
+
+    if source is target:
+        # colormath для RGB -> RGB возвращает значения, ограниченные охватом sRGB
+        return np.clip(values, 0.0, 1.0) if target is ColorMode.RGB else values.copy()
+
+    if target is ColorMode.LAB:
+        # В LAB colormath всегда идет через XYZ с белой точкой D65
+        lab = _xyz_to_lab(_srgb_to_xyz(_to_srgb(values, source)), _WHITE_D65)
+        return lab / (100.0, 1.0, 1.0)
+
+    rgb = _to_srgb(values, source)
+    if target is ColorMode.RGB:
+        return np.clip(rgb, 0.0, 1.0)
+    return _srgb_to_cmyk(rgb)
+
+
+def convert_many(colors: Iterable[Color], target_mode: ColorMode) -> list[Color]:
+    """
+    Пакетный аналог [c.convert_to(target_mode) for c in colors].
+    Цвета группируются по исходному режиму, каждая группа конвертируется одним вызовом.
+    """
+    colors = list(colors)
+    result: list[Color | None] = [None] * len(colors)
+    target_class = Color.get_class_by_mode(target_mode)
+
+    by_mode: dict[ColorMode, list[int]] = {}
+    for i, color in enumerate(colors):
+        by_mode.setdefault(color.mode, []).append(i)
+
+    for mode, indices in by_mode.items():
+        values = np.array([colors[i].to_normalized() for i in indices], dtype=np.float64)
+        converted = convert_array(values, mode, target_mode).tolist()
+        for i, row in zip(indices, converted):
+            result[i] = target_class(*row, is_normalized=True)
+    return result
+
+
+@instrumented("engine.convert_store")
+def convert_store(store: SwatchStore, target_mode: ColorMode, indices: Iterable[int] | None = None) -> list[int]:
+    """
+    Конвертирует образцы хранилища на месте, работая напрямую с его массивами
+    (без создания объектов Swatch/Color). indices - какие образцы конвертировать
+    (по умолчанию все). Возвращает отсортированный список затронутых индексов.
+    """
+    store.drop_previews()
+    channels = np.frombuffer(store.channels, dtype=np.float32).reshape(-1, CHANNELS)
+    modes = np.frombuffer(store.modes, dtype=np.uint8)
+    rows = np.arange(len(store)) if indices is None else np.unique(np.fromiter(indices, dtype=np.intp))
+
+    target_channels = CHANNEL_COUNT[target_mode]
+    for code, mode in enumerate(MODE_CODES):
+        selected = rows[modes[rows] == code]
+        if not len(selected):
+            continue
+        converted = convert_array(channels[selected, :CHANNEL_COUNT[mode]], mode, target_mode)
+        channels[selected] = 0.0
+        channels[selected, :target_channels] = converted
+    modes[rows] = MODE_CODES.index(target_mode)
+    return rows.tolist()
+
+
+def _selected_rows(store: SwatchStore, indices: Iterable[int]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Массивы каналов и режимов хранилища (представления) и отсортированные индексы indices."""
+    channels = np.frombuffer(store.channels, dtype=np.float32).reshape(-1, CHANNELS)
+    modes = np.frombuffer(store.modes, dtype=np.uint8)
+    return channels, modes, np.unique(np.fromiter(indices, dtype=np.intp))
+
+
+@instrumented("engine.adjust_lightness")
+def adjust_lightness(store: SwatchStore, indices: Iterable[int], delta: float) -> list[int]:
+    """
+    Меняет светлоту L* образцов indices на delta (единицы пользователя, -100..100),
+    сохраняя их режимы. RGB и CMYK переводятся в LAB и обратно по одним и тем же
+    формулам (sRGB, D65), поэтому при delta = 0 цвет не меняется; результат
+    ограничивается охватом sRGB. У CMYK черный сохраняется, пока цвет можно
+    получить с ним, иначе считается заново (как при конвертации).
+    Возвращает отсортированный список затронутых индексов.
+    """
+    store.drop_previews()
+    channels, modes, rows = _selected_rows(store, indices)
+    for code, mode in enumerate(MODE_CODES):
+        selected = rows[modes[rows] == code]
+        if not len(selected):
+            continue
+        values = channels[selected, :CHANNEL_COUNT[mode]].astype(np.float64)
+        if mode is ColorMode.LAB:
+            values[:, 0] = np.clip(values[:, 0] + delta / 100.0, 0.0, 1.0)
+        else:
+            lab = _xyz_to_lab(_srgb_to_xyz(_to_srgb(values, mode)), _WHITE_D65)
+            lab[:, 0] = np.clip(lab[:, 0] + delta, 0.0, 100.0)
+            rgb = np.clip(_xyz_to_srgb(_lab_to_xyz(lab, _WHITE_D65)), 0.0, 1.0)
+            values = rgb if mode is ColorMode.RGB else _srgb_to_cmyk_keeping_black(rgb, values[:, 3:4])
+        channels[selected, :CHANNEL_COUNT[mode]] = values
+    return rows.tolist()
+
+
+@instrumented("engine.tint_store")
+def tint_store(store: SwatchStore, indices: Iterable[int], amount: float) -> list[int]:
+    """
+    Осветляет образцы indices к белому на долю amount (0-1), сохраняя их режимы:
+    CMYK - краски умножаются на 1 - amount (растровый тинт, как в полиграфии),
+    RGB - смешивание с белым, LAB - L тянется к 100, a и b - к нулю.
+    Возвращает отсортированный список затронутых индексов.
+    """
+    store.drop_previews()
+    channels, modes, rows = _selected_rows(store, indices)
+    keep = 1.0 - amount
+    for code, mode in enumerate(MODE_CODES):
+        selected = rows[modes[rows] == code]
+        if not len(selected):
+            continue
+        values = channels[selected, :CHANNEL_COUNT[mode]].astype(np.float64)
+        if mode is ColorMode.CMYK:
+            values *= keep
+        elif mode is ColorMode.RGB:
+            values = 1.0 - (1.0 - values) * keep
+        else:
+            values[:, 0] = 1.0 - (1.0 - values[:, 0]) * keep
+            values[:, 1:] *= keep
+        channels[selected, :CHANNEL_COUNT[mode]] = values
+    return rows.tolist()
+
+
+@instrumented("engine.store_to_lab")
+def store_to_lab(store: SwatchStore, indices: Iterable[int] | None = None) -> np.ndarray:
+    """
+    LAB координаты образцов хранилища в единицах пользователя (L 0-100), форма (n, 3).
+    Хранилище не меняется. Порядок строк - как в indices (по умолчанию все образцы).
+    Если LAB уже посчитаны (см. compute_previews), они берутся из store.lab.
+    """
+    if store.has_previews():
+        lab = np.frombuffer(store.lab, dtype=np.float64).reshape(-1, 3)
+        return lab.copy() if indices is None else lab[np.fromiter(indices, dtype=np.intp)]
+    channels = np.frombuffer(store.channels, dtype=np.float32).reshape(-1, CHANNELS)
+    modes = np.frombuffer(store.modes, dtype=np.uint8)
+    rows = np.arange(len(store)) if indices is None else np.fromiter(indices, dtype=np.intp)
+
+    lab = np.empty((len(rows), 3), dtype=np.float64)
+    row_modes = modes[rows]
+    for code, mode in enumerate(MODE_CODES):
+        selected = np.flatnonzero(row_modes == code)
+        if len(selected):
+            lab[selected] = convert_array(channels[rows[selected], :CHANNEL_COUNT[mode]], mode, ColorMode.LAB)
+    return lab * (100.0, 1.0, 1.0)
+
+
+@instrumented("engine.compute_previews")
+def compute_previews(store: SwatchStore) -> None:
+    """
+    Заполняет store.rgb и store.lab для всех образцов (см. SwatchStore.has_previews):
+    цвет для показа, как в Color.to_hex, и LAB, как в store_to_lab.
+    """
+    channels = np.frombuffer(store.channels, dtype=np.float32).reshape(-1, CHANNELS)
+    modes = np.frombuffer(store.modes, dtype=np.uint8)
+    store.drop_previews()
+    rgb = np.empty((len(store), 3), dtype=np.float64)
+    for code, mode in enumerate(MODE_CODES):
+        selected = np.flatnonzero(modes == code)
+        if len(selected):
+            rgb[selected] = convert_array(channels[selected, :CHANNEL_COUNT[mode]], mode, ColorMode.RGB)
+    lab = store_to_lab(store)
+    rgb8 = np.round(rgb * 255.0).astype(np.uint32)
+    packed = (rgb8[:, 0] << 16) | (rgb8[:, 1] << 8) | rgb8[:, 2]
+    store.rgb.frombytes(packed.tobytes())
+    store.lab.frombytes(lab.tobytes())
+
+
+@functools.lru_cache(maxsize=None)
+def _channel_sweep(mode: ColorMode, steps: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Шаблон градиентов каналов режима (кэшируется на режим): маска формы
+    (каналы, steps, каналы), где True - канал, который меняется в этой полосе,
+    и значения этого канала от минимума до максимума (нормализованные).
+    """
+    color_class = Color.get_class_by_mode(mode)
+    _, ranges = color_class.get_metadata()
+    low = color_class(*(r[0] for r in ranges), is_normalized=False).to_normalized()
+    high = color_class(*(r[1] for r in ranges), is_normalized=False).to_normalized()
+    count = len(ranges)
+    mask = np.zeros((count, steps, count), dtype=bool)
+    sweep = np.zeros((count, steps, count), dtype=np.float64)
+    for channel in range(count):
+        mask[channel, :, channel] = True
+        sweep[channel, :, channel] = np.linspace(low[channel], high[channel], steps)
+    mask.setflags(write=False)
+    sweep.setflags(write=False)
+    return mask, sweep
+
+
+@instrumented("engine.channel_gradients")
+def channel_gradients(mode: ColorMode, values: Sequence[float], steps: int) -> np.ndarray:
+    """
+    Цвета для полос-градиентов под ползунками каналов: строка channel - цвет
+    values (нормализованные значения режима mode), у которого канал channel
+    пробегает весь диапазон за steps шагов. Все полосы считаются одним вызовом
+    convert_array. Результат - uint32 0xRRGGBB формы (каналы, steps).
+    """
+    mask, sweep = _channel_sweep(mode, steps)
+    grid = np.where(mask, sweep, np.asarray(values, dtype=np.float64))
+    rgb = convert_array(grid.reshape(-1, len(values)), mode, ColorMode.RGB)
+    rgb8 = np.round(rgb * 255.0).astype(np.uint32)
+    packed = (rgb8[:, 0] << 16) | (rgb8[:, 1] << 8) | rgb8[:, 2]
+    return packed.reshape(len(values), steps)
@@ -0,0 +1,131 @@
+"""
+Формулы конвертации цветов в замкнутой форме на чистом Python.
+
+Нужны для цветов, которые показываются по одному (предпросмотр в окне
+правки, ячейки без посчитанных store.rgb, Color.to_hex): colormath на каждый
+вызов строит граф конвертации и создает несколько промежуточных объектов,
+а здесь то же самое - пара степеней и одна матрица 3x3, без импорта NumPy.
+Пакетный вариант тех же формул - color_engine.
+
+Константы и порядок шагов - как в colormath 3.0 (см. color_engine): результат
+совпадает с Color.convert_to с точностью до округления (~1e-12), поэтому
+точные конвертации (Color.convert_to) и эти функции взаимозаменяемы для
+показа. Шаги, которые не зависят от цвета (белая точка, адаптация Bradford
+D50 -> D65), сложены в одну матрицу при импорте модуля.
+
+Значения RGB и CMYK - 0-1, LAB - в единицах пользователя (L 0-100).
+"""
+from __future__ import annotations
+
+Matrix = tuple[tuple[float, float, float], tuple[float, float, float], tuple[float, float, float]]
+Vector = tuple[float, float, float]
+
+# Константы colormath.color_constants
+CIE_E = 216.0 / 24389.0
+WHITE_D50: Vector = (0.96422, 1.0, 0.82521)
+WHITE_D65: Vector = (0.95047, 1.0, 1.08883)
+
+# sRGBColor.conversion_matrices
+XYZ_TO_RGB: Matrix = (
+    (3.24071, -1.53726, -0.498571),
+    (-0.969258, 1.87599, 0.0415557),
+    (0.0556352, -0.203996, 1.05707),
+)
+RGB_TO_XYZ: Matrix = (
+    (0.412424, 0.357579, 0.180464),
+    (0.212656, 0.715158, 0.0721856),
+    (0.0193324, 0.119193, 0.950444),
+)
+
+# Матрица Bradford (colormath.chromatic_adaptation)
+BRADFORD: Matrix = (
+    (0.8951, 0.2664, -0.1614),
+    (-0.7502, 1.7135, 0.0367),
+    (0.0389, -0.0685, 1.0296),
+)
+
+
+def _mat_mul(a: Matrix, b: Matrix) -> Matrix:
+    return tuple(tuple(sum(a[i][k] * b[k][j] for k in range(3)) for j in range(3)) for i in range(3))
+
+
+def _diag(v: Vector) -> Matrix:
+    return ((v[0], 0.0, 0.0), (0.0, v[1], 0.0), (0.0, 0.0, v[2]))
+
+
+def _mat_vec(m: Matrix, v: Vector) -> Vector:
+    return tuple(m[i][0] * v[0] + m[i][1] * v[1] + m[i][2] * v[2] for i in range(3))
+
+
+def _inverse(m: Matrix) -> Matrix:
+    (a, b, c), (d, e, f), (g, h, i) = m
+    det = a * (e * i - f * h) - b * (d * i - f * g) + c * (d * h - e * g)
+    return (((e * i - f * h) / det, (c * h - b * i) / det, (b * f - c * e) / det),
+            ((f * g - d * i) / det, (a * i - c * g) / det, (c * d - a * f) / det),
+            ((d * h - e * g) / det, (b * g - a * h) / det, (a * e - b * d) / det))
+
+
+# Хроматическая адаптация XYZ D50 -> D65
+D50_TO_D65: Matrix = _mat_mul(
+    _mat_mul(_inverse(BRADFORD), _diag(tuple(d65 / d50 for d65, d50 in zip(_mat_vec(BRADFORD, WHITE_D65),
+                                                                          _mat_vec(BRADFORD, WHITE_D50))))),
+    BRADFORD)
+
+# LAB -> RGB: относительные XYZ (без белой точки D50) сразу в линейный sRGB
+_LAB_XYZ_TO_LINEAR = _mat_mul(_mat_mul(XYZ_TO_RGB, D50_TO_D65), _diag(WHITE_D50))
+# RGB -> LAB: линейный sRGB сразу в XYZ, деленные на белую точку D65
+_LINEAR_TO_LAB_XYZ = _mat_mul(_diag(tuple(1.0 / w for w in WHITE_D65)), RGB_TO_XYZ)
+
+
+def _lab_f_inverse(f: float) -> float:
+    cube = f * f * f
+    return cube if cube > CIE_E else (f - 16.0 / 116.0) / 7.787
+
+
+def _lab_f(t: float) -> float:
+    return t ** (1.0 / 3.0) if t > CIE_E else 7.787 * t + 16.0 / 116.0
+
+
+def _gamma(linear: float) -> float:
+    """Линейный канал -> sRGB (отрицательные значения дают 0, сверху не ограничивается)."""
+    if linear <= 0.0031308:
+        return max(linear, 0.0) * 12.92
+    return 1.055 * linear ** (1 / 2.4) - 0.055
+
+
+def _linearize(c: float) -> float:
+    return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+
+def clamp_rgb(r: float, g: float, b: float) -> Vector:
+    """Ограничение охватом sRGB, как clamped_rgb_* в colormath."""
+    return (0.0 if r < 0.0 else 1.0 if r > 1.0 else r,
+            0.0 if g < 0.0 else 1.0 if g > 1.0 else g,
+            0.0 if b < 0.0 else 1.0 if b > 1.0 else b)
+
+
+def lab_to_srgb(l: float, a: float, b: float) -> Vector:
+    """LAB (D50, L 0-100) -> sRGB без ограничения сверху."""
+    fy = (l + 16.0) / 116.0
+    x = _lab_f_inverse(a / 500.0 + fy)
+    y = _lab_f_inverse(fy)
+    z = _lab_f_inverse(fy - b / 200.0)
+    (m00, m01, m02), (m10, m11, m12), (m20, m21, m22) = _LAB_XYZ_TO_LINEAR
+    return (_gamma(m00 * x + m01 * y + m02 * z),
+            _gamma(m10 * x + m11 * y + m12 * z),
+            _gamma(m20 * x + m21 * y + m22 * z))
+
+
+def srgb_to_lab(r: float, g: float, b: float) -> Vector:
+    """sRGB (без ограничения диапазона) -> LAB относительно D65, L 0-100 (как colormath)."""
+    lr, lg, lb = _linearize(r), _linearize(g), _linearize(b)
+    (m00, m01, m02), (m10, m11, m12), (m20, m21, m22) = _LINEAR_TO_LAB_XYZ
+    fx = _lab_f(max(m00 * lr + m01 * lg + m02 * lb, 0.0))
+    fy = _lab_f(max(m10 * lr + m11 * lg + m12 * lb, 0.0))
+    fz = _lab_f(max(m20 * lr + m21 * lg + m22 * lb, 0.0))
+    return 116.0 * fy - 16.0, 500.0 * (fx - fy), 200.0 * (fy - fz)
+
+
+def cmyk_to_srgb(c: float, m: float, y: float, k: float) -> Vector:
+    """CMYK -> sRGB через CMY, как в colormath."""
+    return 1.0 - (c * (1.0 - k) + k), 1.0 - (m * (1.0 - k) + k), 1.0 - (y * (1.0 - k) + k)
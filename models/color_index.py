@@ -0,0 +1,336 @@
+"""
+Поиск ближайших цветов по Delta E среди образцов одной или нескольких библиотек.
+
+Индекс - равномерная сетка (воксели) в пространстве LAB с ребром CELL_SIZE
+единиц Delta E. Запрос обходит слои ячеек вокруг ячейки запрошенного цвета,
+пока найденные кандидаты гарантированно не станут ближе любой точки из
+необойденных слоев. Кандидаты отбираются по Delta E 1976 (евклидово расстояние
+в LAB) с запасом и затем переранжируются по CIEDE2000.
+
+Сетка выбрана вместо KD-дерева, потому что она обновляется точечно: добавление,
+изменение и удаление образца - это перенос одной точки между ячейками.
+Индекс подписывается на изменения моделей (SwatchModel.subscribe) и обновляется
+по их уведомлениям; полностью перестраивается только библиотека, получившая RESET.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+from dataclasses import dataclass, field
+from operator import itemgetter
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+from .common_data_classes import ModelChange, ModelEvent
+from .color_data_class import Color
+
+if TYPE_CHECKING:
+    from .swatch_model import SwatchModel
+
+Lab = tuple[float, float, float]
+Cell = tuple[int, int, int]
+
+# Ребро ячейки сетки в единицах Delta E
+CELL_SIZE = 4.0
+# Обход слоев прекращается в пользу полного перебора точек, когда пройдено больше
+# 1/SCAN_CELLS_RATIO от числа непустых ячеек: пустая ячейка обходится немногим
+# дешевле, чем проверяется точка
+SCAN_CELLS_RATIO = 2
+# В индексе из стольких точек и меньше полный перебор дешевле обхода слоев:
+# точки редкие, и до нужного радиуса обход проходит в основном пустые ячейки
+SCAN_POINTS = 3000
+
+
+# Сколько кандидатов по Delta E 1976 отбирается для переранжирования по CIEDE2000
+def _pool_size(k: int) -> int:
+    return max(3 * k, k + 10)
+
+
+@dataclass(frozen=True, slots=True)
+class ColorMatch:
+    """Найденный образец. Индекс в модели - model.index_of(swatch_id)."""
+    library: str
+    swatch_id: int
+    name: str
+    lab: Lab
+    delta_e76: float
+    delta_e2000: float
+    model: SwatchModel = field(compare=False, repr=False)
+
+
+def delta_e_cie1976(lab1: Sequence[float], lab2: Sequence[float]) -> float:
+    return math.dist(lab1, lab2)
+
+
+def delta_e_cie2000(lab1: Sequence[float], lab2: Sequence[float],
+                    kl: float = 1.0, kc: float = 1.0, kh: float = 1.0) -> float:
+    """CIEDE2000 (Sharma, Wu, Dalal 2005). Совпадает с colormath.color_diff.delta_e_cie2000."""
+    l1, a1, b1 = lab1
+    l2, a2, b2 = lab2
+
+    c_mean = (math.hypot(a1, b1) + math.hypot(a2, b2)) / 2.0
+    c_mean7 = c_mean ** 7
+    g = 0.5 * (1.0 - math.sqrt(c_mean7 / (c_mean7 + 25.0 ** 7)))
+    a1p, a2p = a1 * (1.0 + g), a2 * (1.0 + g)
+    c1p, c2p = math.hypot(a1p, b1), math.hypot(a2p, b2)
+    h1p = math.degrees(math.atan2(b1, a1p)) % 360.0 if c1p else 0.0
+    h2p = math.degrees(math.atan2(b2, a2p)) % 360.0 if c2p else 0.0
+
+    delta_l = l2 - l1
+    delta_c = c2p - c1p
+    if c1p * c2p == 0.0:
+        delta_h_angle = 0.0
+    else:
+        delta_h_angle = h2p - h1p
+        if delta_h_angle > 180.0:
+            delta_h_angle -= 360.0
+        elif delta_h_angle < -180.0:
+            delta_h_angle += 360.0
+    delta_h = 2.0 * math.sqrt(c1p * c2p) * math.sin(math.radians(delta_h_angle) / 2.0)
+
+    l_mean = (l1 + l2) / 2.0
+    cp_mean = (c1p + c2p) / 2.0
+    if c1p * c2p == 0.0:
+        hp_mean = h1p + h2p
+    elif abs(h1p - h2p) <= 180.0:
+        hp_mean = (h1p + h2p) / 2.0
+    else:
+        hp_mean = (h1p + h2p + 360.0) / 2.0 if h1p + h2p < 360.0 else (h1p + h2p - 360.0) / 2.0
+
+    t = (1.0 - 0.17 * math.cos(math.radians(hp_mean - 30.0))
+         + 0.24 * math.cos(math.radians(2.0 * hp_mean))
+         + 0.32 * math.cos(math.radians(3.0 * hp_mean + 6.0))
+         - 0.20 * math.cos(math.radians(4.0 * hp_mean - 63.0)))
+    delta_theta = 30.0 * math.exp(-(((hp_mean - 275.0) / 25.0) ** 2))
+    cp_mean7 = cp_mean ** 7
+    r_c = 2.0 * math.sqrt(cp_mean7 / (cp_mean7 + 25.0 ** 7))
+    s_l = 1.0 + (0.015 * (l_mean - 50.0) ** 2) / math.sqrt(20.0 + (l_mean - 50.0) ** 2)
+    s_c = 1.0 + 0.045 * cp_mean
+    s_h = 1.0 + 0.015 * cp_mean * t
+    r_t = -math.sin(math.radians(2.0 * delta_theta)) * r_c
+
+    dl, dc, dh = delta_l / (kl * s_l), delta_c / (kc * s_c), delta_h / (kh * s_h)
+    return math.sqrt(dl * dl + dc * dc + dh * dh + r_t * dc * dh)
+
+
+def lab_of(color: Color) -> Lab:
+    """
+    Точные LAB координаты цвета (L 0-100) теми же формулами, что и при построении
+    индекса. to_user здесь не подходит: он округляет L/a/b до целых.
+    """
+    return color.preview_lab()
+
+
+def _cell_of(lab: Sequence[float]) -> Cell:
+    return (math.floor(lab[0] / CELL_SIZE), math.floor(lab[1] / CELL_SIZE), math.floor(lab[2] / CELL_SIZE))
+
+
+def _shell(center: Cell, radius: int) -> Iterable[Cell]:
+    """Ячейки на расстоянии (по Чебышеву) ровно radius от center."""
+    cx, cy, cz = center
+    if radius == 0:
+        yield center
+        return
+    span = range(-radius, radius + 1)
+    for dx in span:
+        edge_x = abs(dx) == radius
+        for dy in span:
+            if edge_x or abs(dy) == radius:
+                for dz in span:
+                    yield cx + dx, cy + dy, cz + dz
+            else:
+                yield cx + dx, cy + dy, cz - radius
+                yield cx + dx, cy + dy, cz + radius
+
+
+class _Library:
+    """Подключенная к индексу модель и ее подписка на изменения."""
+
+    def __init__(self, index: ColorIndex, model: SwatchModel, name: str):
+        self.model = model
+        self.name = name
+        self.listener = lambda change: index._on_model_changed(self, change)
+
+
+class ColorIndex:
+    """
+    Индекс ближайших цветов по образцам подключенных моделей (библиотек).
+
+        index = ColorIndex()
+        index.attach(model, "Vendor A")
+        index.nearest((53.2, 80.1, 67.2), k=5)
+    """
+
+    # Пакет изменений больше этого размера выгоднее обработать полной перестройкой библиотеки
+    MAX_INCREMENTAL_CHANGES = 5000
+
+    def __init__(self):
+        self._libraries: dict[int, _Library] = {}  # id(model) -> библиотека
+        # Ключ точки - (библиотека, id образца); значение - (LAB, имя, ячейка)
+        self._points: dict[tuple[_Library, int], tuple[Lab, str, Cell]] = {}
+        # Ячейка -> {ключ точки: LAB}; LAB дублируется, чтобы обход ячейки не обращался к _points
+        self._cells: dict[Cell, dict[tuple[_Library, int], Lab]] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    # --- Библиотеки ---
+
+    def attach(self, model: SwatchModel, name: str | None = None) -> None:
+        """Добавляет образцы модели в индекс и подписывается на ее изменения."""
+        if id(model) in self._libraries:
+            return
+        library = _Library(self, model, name or model.get_file_path() or f"Library {len(self._libraries) + 1}")
+        self._libraries[id(model)] = library
+        self._rebuild(library)
+        model.subscribe(library.listener, first=True)
+
+    def detach(self, model: SwatchModel) -> None:
+        """Убирает образцы модели из индекса и отписывается от нее."""
+        library = self._libraries.pop(id(model), None)
+        if library is not None:
+            model.unsubscribe(library.listener)
+            self._remove_library_points(library)
+
+    def libraries(self) -> list[str]:
+        return [library.name for library in self._libraries.values()]
+
+    # --- Поиск ---
+
+    def nearest(self, color: Color | Sequence[float], k: int = 5,
+                libraries: Iterable[str] | None = None) -> list[ColorMatch]:
+        """
+        k образцов, ближайших к цвету (объект Color или LAB с L 0-100), по CIEDE2000.
+        Кандидаты отбираются по Delta E 1976 с запасом (_pool_size), поэтому
+        результат может отличаться от полного перебора по CIEDE2000 только для
+        цветов, у которых эти метрики расходятся в разы.
+        libraries - ограничить поиск библиотеками с этими именами.
+        """
+        if k <= 0 or not self._points:
+            return []
+        query = lab_of(color) if isinstance(color, Color) else tuple(float(v) for v in color)
+        allowed = None if libraries is None else set(libraries)
+
+        candidates = self._nearest76(query, _pool_size(k), allowed)
+        # Ключи точек не сравниваются (библиотеки не упорядочены), поэтому сортировка - только по расстояниям
+        ranked = sorted(((delta_e_cie2000(query, self._points[key][0]), distance, key)
+                         for distance, key in candidates), key=lambda item: item[:2])
+        matches = []
+        for delta_e2000, distance, key in ranked[:k]:
+            library, swatch_id = key
+            lab, name, _ = self._points[key]
+            matches.append(ColorMatch(library.name, swatch_id, name, lab, distance, delta_e2000, library.model))
+        return matches
+
+    def _nearest76(self, query: Lab, count: int, allowed: set[str] | None) -> list[tuple[float, tuple]]:
+        """count ближайших точек по Delta E 1976: обход слоев сетки от ячейки запроса."""
+        if len(self._points) <= SCAN_POINTS:
+            return self._scan(query, count, allowed)
+        center = _cell_of(query)
+        # Расстояние от запроса до ближайшей грани его ячейки: точки за слоем radius
+        # находятся от запроса не ближе radius * CELL_SIZE + margin
+        margin = min(min(v - c * CELL_SIZE, (c + 1) * CELL_SIZE - v) for v, c in zip(query, center))
+        best: list[tuple[float, int, tuple]] = []  # max-куча: (-расстояние, счетчик, ключ)
+        visited_cells = 0
+        radius = 0
+        while True:
+            for cell in _shell(center, radius):
+                entries = self._cells.get(cell)
+                if entries:
+                    self._collect(query, entries, count, allowed, best)
+            visited_cells += 24 * radius * radius + 2 if radius else 1
+            if len(best) >= count and -best[0][0] <= radius * CELL_SIZE + margin:
+                break
+            if visited_cells > len(self._cells) // SCAN_CELLS_RATIO:
+                # В разреженном индексе слои почти пусты, а до нужного радиуса далеко:
+                # дешевле перебрать все точки
+                return self._scan(query, count, allowed)
+            radius += 1
+        return sorted(((-distance, key) for distance, _, key in best), key=itemgetter(0))
+
+    def _scan(self, query: Lab, count: int, allowed: set[str] | None) -> list[tuple[float, tuple]]:
+        """count ближайших точек по Delta E 1976 полным перебором, одним проходом по всем точкам."""
+        dist = math.dist
+        points = self._points.items()
+        if allowed is not None:
+            points = [(key, point) for key, point in points if key[0].name in allowed]
+        return heapq.nsmallest(count, ((dist(query, lab), key) for key, (lab, _, _) in points), key=itemgetter(0))
+
+    @staticmethod
+    def _collect(query: Lab, entries: dict, count: int, allowed: set[str] | None, best: list) -> None:
+        dist = math.dist
+        bound = -best[0][0] if len(best) >= count else math.inf
+        for key, lab in entries.items():
+            distance = dist(query, lab)
+            if distance >= bound or (allowed is not None and key[0].name not in allowed):
+                continue
+            if len(best) < count:
+                heapq.heappush(best, (-distance, id(key), key))
+                if len(best) == count:
+                    bound = -best[0][0]
+            else:
+                heapq.heapreplace(best, (-distance, id(key), key))
+                bound = -best[0][0]
+
+    # --- Обновление по уведомлениям модели ---
+
+    def _on_model_changed(self, library: _Library, change: ModelChange) -> None:
+        if change.event is ModelEvent.BATCH:
+            if change.is_structural or len(change.changes) > self.MAX_INCREMENTAL_CHANGES:
+                self._rebuild(library)
+            else:
+                self._apply_batch(library, change.changes)
+        elif change.event is ModelEvent.RESET:
+            self._rebuild(library)
+        elif change.event in (ModelEvent.ADDED, ModelEvent.UPDATED):
+            self._put_rows(library, [change.index])
+        elif change.event is ModelEvent.REMOVED:
+            self._remove(library, change.swatch_id)
+        # REORDERED и FILE_PATH_CHANGED не меняют цвета: точки привязаны к id, а не к индексам
+
+    def _apply_batch(self, library: _Library, changes: Sequence[ModelChange]) -> None:
+        """Индексы внутри пакета могли сдвинуться, поэтому строки ищутся по id образцов."""
+        touched: set[int] = set()
+        for change in changes:
+            if change.event is ModelEvent.REMOVED:
+                self._remove(library, change.swatch_id)
+                touched.discard(change.swatch_id)
+            elif change.event in (ModelEvent.ADDED, ModelEvent.UPDATED):
+                touched.add(change.swatch_id)
+        if touched:
+            rows = [i for i, swatch_id in enumerate(library.model.get_swatch_ids()) if swatch_id in touched]
+            self._put_rows(library, rows)
+
+    def _rebuild(self, library: _Library) -> None:
+        self._remove_library_points(library)
+        self._put_rows(library, None)
+
+    def _put_rows(self, library: _Library, rows: Sequence[int] | None) -> None:
+        """Добавляет или обновляет точки для строк модели (по умолчанию - всех)."""
+        if rows is not None and not rows:
+            return
+        ids, names, labs = library.model.get_lab_coordinates(rows)
+        points, cells = self._points, self._cells
+        for swatch_id, name, lab in zip(ids, names, labs):
+            key = (library, swatch_id)
+            old = points.get(key)
+            cell = _cell_of(lab)
+            if old is not None and old[2] != cell:
+                self._discard_from_cell(key, old[2])
+            points[key] = (lab, name, cell)
+            cells.setdefault(cell, {})[key] = lab
+
+    def _remove(self, library: _Library, swatch_id: int) -> None:
+        key = (library, swatch_id)
+        old = self._points.pop(key, None)
+        if old is not None:
+            self._discard_from_cell(key, old[2])
+
+    def _remove_library_points(self, library: _Library) -> None:
+        for key in [key for key in self._points if key[0] is library]:
+            self._remove(library, key[1])
+
+    def _discard_from_cell(self, key: tuple, cell: Cell) -> None:
+        entries = self._cells[cell]
+        del entries[key]
+        if not entries:
+            del self._cells[cell]
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable
 from dataclasses import dataclass
 from enum import Enum
 
@@ -7,6 +7,16 @@ if TYPE_CHECKING:
     from .color_data_class import Color
 
 
+# Функция прогресса долгих операций: (обработано блоков, всего блоков)
+ProgressCallback = Callable[[int, int], None]
+# Функция проверки отмены: возвращает True, если операцию нужно прервать
+CancelCheck = Callable[[], bool]
+
+
+class OperationCancelled(Exception):
+    """Долгая операция модели прервана по запросу (см. CancelCheck)."""
+
+
 class SwatchType(Enum):
     SPOT = "Spot"
     PROCESS = "Process"
@@ -19,9 +29,41 @@ class ColorMode(Enum):
     CMYK = "CMYK"
 
 
-@dataclass
+@dataclass(slots=True)
 class Swatch:
     name: str
     type: SwatchType
     mode: ColorMode
     color: Color
+
+
+class ModelEvent(Enum):
+    """Виды изменений SwatchModel, о которых получают уведомления подписчики."""
+    ADDED = "added"
+    UPDATED = "updated"
+    REMOVED = "removed"
+    REORDERED = "reordered"
+    RESET = "reset"
+    FILE_PATH_CHANGED = "file_path_changed"
+    BATCH = "batch"  # несколько изменений, накопленных в транзакции
+
+
+@dataclass(frozen=True)
+class ModelChange:
+    """
+    Одно уведомление модели.
+    index/swatch_id заполняются для ADDED, UPDATED и REMOVED
+    (для REMOVED это индекс и id уже удаленного образца).
+    changes заполняется только для BATCH - изменения в порядке их возникновения.
+    """
+    event: ModelEvent
+    index: int | None = None
+    swatch_id: int | None = None
+    changes: tuple[ModelChange, ...] = ()
+
+    @property
+    def is_structural(self) -> bool:
+        """Требует ли изменение полного пересмотра данных (а не точечного обновления)."""
+        if self.event is ModelEvent.BATCH:
+            return any(c.is_structural for c in self.changes)
+        return self.event in (ModelEvent.RESET, ModelEvent.REORDERED)
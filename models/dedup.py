@@ -0,0 +1,165 @@
+"""
+Поиск почти одинаковых образцов (Delta E 1976 меньше порога) и повторяющихся имен.
+
+Попарное сравнение всех образцов - O(n^2). Здесь LAB координаты раскладываются
+по ячейкам сетки с ребром, равным порогу: два цвета ближе порога могут лежать
+только в одной или в соседних ячейках, поэтому каждая точка сравнивается лишь
+с точками из 27 ячеек вокруг нее. Найденные пары объединяются в кластеры
+(система непересекающихся множеств), так что цепочка A~B~C дает один кластер.
+
+Функции работают с "сырыми" последовательностями (id, имена, LAB) и не знают
+о модели; применение результата - SwatchModel.merge_duplicates.
+"""
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from itertools import product
+from typing import Sequence
+
+from .color_index import Lab
+
+DEFAULT_THRESHOLD = 1.0
+
+# Ключ ячейки упакован в одно целое, чтобы соседняя ячейка получалась сложением,
+# а не созданием кортежа. У основания _KEY_SPAN "перемешанные" младшие биты: при
+# основании вида 2^n (+1) младшие биты ключа, по которым dict выбирает слот,
+# зависели бы от осей слабо, и ячейки массово попадали бы в одни слоты.
+_KEY_SPAN = (1 << 21) + 40503
+_KEY_BIAS = 1 << 20
+# Половина окрестности ячейки: каждая пара соседних ячеек просматривается один раз
+_FORWARD_OFFSETS = [(dx * _KEY_SPAN + dy) * _KEY_SPAN + dz
+                    for dx, dy, dz in product((-1, 0, 1), repeat=3) if (dx, dy, dz) > (0, 0, 0)]
+
+# С какого числа сравниваемых пар выгоднее считать матрицу расстояний на NumPy
+_MATRIX_MIN_PAIRS = 2048
+
+
+def _cell_key(lab: Lab, size: float, part: int) -> int:
+    x, y, z = (math.floor(v / size) + _KEY_BIAS for v in lab)
+    return ((part * _KEY_SPAN + x) * _KEY_SPAN + y) * _KEY_SPAN + z
+
+
+@dataclass(frozen=True, slots=True)
+class DuplicateCluster:
+    """Группа почти одинаковых образцов. Все поля - id образцов, в порядке модели."""
+    representative: int
+    duplicates: tuple[int, ...]  # образцы, которые будут удалены при слиянии
+    max_delta_e: float           # наибольшее расстояние от представителя (из-за цепочек может превышать порог)
+
+    @property
+    def members(self) -> tuple[int, ...]:
+        return (self.representative,) + self.duplicates
+
+
+@dataclass(slots=True)
+class DedupReport:
+    threshold: float
+    clusters: list[DuplicateCluster] = field(default_factory=list)
+    duplicate_names: dict[str, tuple[int, ...]] = field(default_factory=dict)  # имя -> id образцов (2 и более)
+
+    @property
+    def removable_count(self) -> int:
+        return sum(len(cluster.duplicates) for cluster in self.clusters)
+
+    def summary(self) -> str:
+        return (f"{len(self.clusters)} groups of similar swatches (Delta E < {self.threshold:g}), "
+                f"{self.removable_count} swatches can be merged; "
+                f"{len(self.duplicate_names)} names are used more than once.")
+
+
+class _DisjointSet:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            # Корнем остается меньший индекс - он же будет представителем кластера
+            if root_a < root_b:
+                self.parent[root_b] = root_a
+            else:
+                self.parent[root_a] = root_b
+
+
+def find_similar_pairs(labs: Sequence[Lab], threshold: float,
+                       partition: Sequence[int] | None = None) -> list[tuple[int, int]]:
+    """
+    Пары индексов (i < j), для которых Delta E 1976 меньше threshold.
+    partition - необязательная метка для каждого цвета: сравниваются только цвета с одинаковой меткой.
+    """
+    if threshold <= 0:
+        raise ValueError("Threshold must be positive.")
+    cells: dict[int, list[int]] = defaultdict(list)
+    for i, lab in enumerate(labs):
+        cells[_cell_key(lab, threshold, 0 if partition is None else partition[i])].append(i)
+
+    pairs: list[tuple[int, int]] = []
+    for key, members in cells.items():
+        _collect_pairs(labs, members, members, threshold, pairs, same_cell=True)
+        for offset in _FORWARD_OFFSETS:
+            neighbour = cells.get(key + offset)
+            if neighbour:
+                _collect_pairs(labs, members, neighbour, threshold, pairs, same_cell=False)
+    return pairs
+
+
+def _collect_pairs(labs: Sequence[Lab], first: list[int], second: list[int], threshold: float,
+                   pairs: list[tuple[int, int]], same_cell: bool) -> None:
+    """Пары ближе порога между двумя ячейками (или внутри одной)."""
+    if len(first) * len(second) >= _MATRIX_MIN_PAIRS:
+        # Плотные ячейки (например, много почти черных цветов) - матрицей расстояний на NumPy
+        import numpy as np
+        a, b = np.array([labs[i] for i in first]), np.array([labs[j] for j in second])
+        close = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)) < threshold
+        if same_cell:
+            close = np.triu(close, k=1)
+        for row, col in zip(*np.nonzero(close)):
+            i, j = first[row], second[col]
+            pairs.append((i, j) if i < j else (j, i))
+        return
+
+    dist = math.dist
+    for pos, i in enumerate(first):
+        lab_i = labs[i]
+        for j in (second[pos + 1:] if same_cell else second):
+            if dist(lab_i, labs[j]) < threshold:
+                pairs.append((i, j) if i < j else (j, i))
+
+
+def find_duplicates(ids: Sequence[int], names: Sequence[str], labs: Sequence[Lab],
+                    threshold: float = DEFAULT_THRESHOLD,
+                    partition: Sequence[int] | None = None) -> DedupReport:
+    """
+    Отчет о дубликатах. Представитель кластера - первый по порядку образец,
+    остальные попадают в duplicates. Имена сравниваются точно (с учетом регистра).
+    """
+    report = DedupReport(threshold)
+
+    groups = _DisjointSet(len(ids))
+    for i, j in find_similar_pairs(labs, threshold, partition):
+        groups.union(i, j)
+    clusters: dict[int, list[int]] = defaultdict(list)
+    for i in range(len(ids)):
+        root = groups.find(i)
+        if root != i:
+            clusters[root].append(i)
+    for root in sorted(clusters):
+        members = clusters[root]
+        report.clusters.append(DuplicateCluster(
+            ids[root], tuple(ids[i] for i in members),
+            max(math.dist(labs[root], labs[i]) for i in members)))
+
+    by_name: dict[str, list[int]] = defaultdict(list)
+    for swatch_id, name in zip(ids, names):
+        by_name[name].append(swatch_id)
+    report.duplicate_names = {name: tuple(group) for name, group in by_name.items() if len(group) > 1}
+    return report
@@ -0,0 +1,182 @@
+"""
+История правок для Undo/Redo.
+
+Вместо снимков всей библиотеки хранятся небольшие команды: какие образцы
+изменились и их данные до и после правки. Данные хранятся в том же компактном
+виде, что и в модели (SwatchStore.take), поэтому конвертация 50 тысяч образцов
+- это одна запись из нескольких плотных массивов, а не 50 тысяч объектов Swatch.
+
+Команды ссылаются на образцы по индексам: отмена и повтор всегда применяются
+к тому же состоянию модели, в котором команда была выполнена (история линейна).
+Применяют команды приватные методы SwatchModel, которые меняют хранилище и
+рассылают уведомления, но сами в историю ничего не записывают.
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Sequence
+
+if TYPE_CHECKING:
+    from .swatch_model import SwatchModel
+    from .swatch_store import SwatchStore
+
+
+class Command(ABC):
+    """Одна запись истории: умеет отменить и повторить себя на модели."""
+    __slots__ = ()
+    description: str
+
+    @abstractmethod
+    def undo(self, model: SwatchModel) -> None: ...
+
+    @abstractmethod
+    def redo(self, model: SwatchModel) -> None: ...
+
+    @abstractmethod
+    def nbytes(self) -> int:
+        """Примерный объем памяти записи (байты) - для ограничения размера истории."""
+
+
+@dataclass(slots=True)
+class UpdateCommand(Command):
+    """Данные образцов по индексам заменены: before -> after."""
+    description: str
+    indices: Sequence[int]
+    before: SwatchStore
+    after: SwatchStore
+
+    def undo(self, model: SwatchModel) -> None:
+        model._put_rows(self.indices, self.before)
+
+    def redo(self, model: SwatchModel) -> None:
+        model._put_rows(self.indices, self.after)
+
+    def nbytes(self) -> int:
+        return 8 * len(self.indices) + self.before.nbytes() + self.after.nbytes()
+
+
+@dataclass(slots=True)
+class InsertCommand(Command):
+    """Образцы rows вставлены по индексам (по возрастанию)."""
+    description: str
+    indices: Sequence[int]
+    rows: SwatchStore
+
+    def undo(self, model: SwatchModel) -> None:
+        model._delete_rows(self.indices)
+
+    def redo(self, model: SwatchModel) -> None:
+        model._insert_rows(self.indices, self.rows)
+
+    def nbytes(self) -> int:
+        return 8 * len(self.indices) + self.rows.nbytes()
+
+
+@dataclass(slots=True)
+class DeleteCommand(Command):
+    """Образцы rows удалены с индексов (по возрастанию)."""
+    description: str
+    indices: Sequence[int]
+    rows: SwatchStore
+
+    def undo(self, model: SwatchModel) -> None:
+        model._insert_rows(self.indices, self.rows)
+
+    def redo(self, model: SwatchModel) -> None:
+        model._delete_rows(self.indices)
+
+    def nbytes(self) -> int:
+        return 8 * len(self.indices) + self.rows.nbytes()
+
+
+@dataclass(slots=True)
+class MoveCommand(Command):
+    description: str
+    old_index: int
+    new_index: int
+
+    def undo(self, model: SwatchModel) -> None:
+        model._move_row(self.new_index, self.old_index)
+
+    def redo(self, model: SwatchModel) -> None:
+        model._move_row(self.old_index, self.new_index)
+
+    def nbytes(self) -> int:
+        return 16
+
+
+@dataclass(slots=True)
+class CompoundCommand(Command):
+    """Несколько команд одной транзакции - отменяются и повторяются вместе."""
+    description: str
+    commands: tuple[Command, ...]
+
+    def undo(self, model: SwatchModel) -> None:
+        with model.transaction():
+            for command in reversed(self.commands):
+                command.undo(model)
+
+    def redo(self, model: SwatchModel) -> None:
+        with model.transaction():
+            for command in self.commands:
+                command.redo(model)
+
+    def nbytes(self) -> int:
+        return sum(command.nbytes() for command in self.commands)
+
+
+class History:
+    """
+    Стек отмены в виде кольцевого буфера: при переполнении по числу записей
+    или по памяти забываются самые старые записи. Новая запись очищает стек повтора.
+    """
+
+    MAX_ENTRIES = 100
+    MAX_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._undo: deque[Command] = deque()
+        self._redo: list[Command] = []
+
+    def push(self, command: Command) -> None:
+        self._redo.clear()
+        if command.nbytes() > self.max_bytes:
+            # Правку такого размера не сохранить - отменить ее нельзя, как и все, что было до нее
+            self.clear()
+            return
+        self._undo.append(command)
+        total = self.nbytes()
+        while len(self._undo) > self.max_entries or total > self.max_bytes:
+            total -= self._undo.popleft().nbytes()
+
+    def pop_undo(self) -> Command | None:
+        if not self._undo:
+            return None
+        command = self._undo.pop()
+        self._redo.append(command)
+        return command
+
+    def pop_redo(self) -> Command | None:
+        if not self._redo:
+            return None
+        command = self._redo.pop()
+        self._undo.append(command)
+        return command
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def clear(self) -> None:
+        self._undo.clear()
+        self._redo.clear()
+
+    def nbytes(self) -> int:
+        """Память, занятая записями истории (включая стек повтора)."""
+        return sum(c.nbytes() for c in self._undo) + sum(c.nbytes() for c in self._redo)
@@ -0,0 +1,304 @@
+"""
+Чтение и запись JSON в формате swatch.parse:
+    [ {'name', 'type', 'data': {'mode', 'values'}}*,
+      {'name', 'type': 'Color Group', 'swatches': [...]}* ]
+
+Форматы записи (JSON_FORMATS):
+    indented - как json.dump(indent=2), формат по умолчанию
+    compact  - тот же документ без пробелов и переводов строк
+    ndjson   - по одному элементу верхнего уровня на строку, без общего списка
+               (группа - одной строкой вместе со своими образцами)
+
+Запись идет потоково из блоков ASE (см. ase_parser), поэтому JSON любого
+размера формируется без промежуточного списка словарей. Чтение (iter_json_items)
+тоже потоковое: файл читается порциями, и в памяти находится только текущий
+элемент верхнего уровня, а у большой группы - текущий образец. Оно понимает
+и обычный JSON, и NDJSON.
+"""
+from __future__ import annotations
+
+import codecs
+import json
+import textwrap
+from typing import BinaryIO, Iterable, Iterator, TextIO
+
+from .ase_parser import AseBlock, BlockKind, group_start, group_end
+
+JSON_FORMATS = ("indented", "compact", "ndjson")
+
+# Размер порции чтения JSON (байт)
+READ_CHUNK_SIZE = 1 << 16
+
+_COMPACT = {"ensure_ascii": False, "separators": (",", ":")}
+_WHITESPACE = " \t\r\n"
+
+
+def _dump_indented(obj, indent: int) -> str:
+    """Сериализует объект так же, как json.dump(indent=2) внутри списка с отступом indent."""
+    return textwrap.indent(json.dumps(obj, ensure_ascii=False, indent=2), " " * indent)
+
+
+def write_blocks_json(blocks: Iterable[AseBlock], f: TextIO, fmt: str = "indented") -> tuple[int, int]:
+    """
+    Пишет блоки в JSON в формате fmt (см. JSON_FORMATS). Для indented результат
+    совпадает с json.dump(swatch.parse(...), indent=2).
+    Возвращает (количество элементов верхнего уровня, количество цветов).
+    """
+    if fmt == "compact":
+        return _write_compact(blocks, f)
+    if fmt == "ndjson":
+        return _write_ndjson(blocks, f)
+    if fmt != "indented":
+        raise ValueError(f"Unknown JSON format '{fmt}', expected one of {', '.join(JSON_FORMATS)}.")
+
+    items = colors = 0
+    in_group = False
+    first_in_group = True
+    f.write("[")
+    for block in blocks:
+        if block.kind is BlockKind.GROUP_END:
+            if in_group:
+                f.write("\n    ]\n  }" if not first_in_group else "]\n  }")
+                in_group = False
+            continue
+
+        if block.kind is BlockKind.COLOR:
+            colors += 1
+            if in_group:
+                f.write("" if first_in_group else ",")
+                f.write("\n" + _dump_indented(block.to_dict(), 6))
+                first_in_group = False
+                continue
+
+        f.write(",\n" if items else "\n")
+        items += 1
+        if block.kind is BlockKind.GROUP_START:
+            f.write("  {\n")
+            for key, value in block.to_dict().items():
+                f.write(f"    {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)},\n")
+            f.write('    "swatches": [')
+            in_group, first_in_group = True, True
+        else:
+            f.write(_dump_indented(block.to_dict(), 2))
+
+    if in_group:
+        # Блоки оборвались внутри группы - закрываем JSON корректно
+        f.write("\n    ]\n  }" if not first_in_group else "]\n  }")
+    f.write("\n]" if items else "]")
+    return items, colors
+
+
+def _write_compact(blocks: Iterable[AseBlock], f: TextIO) -> tuple[int, int]:
+    items = colors = 0
+    in_group = False
+    first_in_group = True
+    f.write("[")
+    for block in blocks:
+        if block.kind is BlockKind.GROUP_END:
+            if in_group:
+                f.write("]}")
+                in_group = False
+            continue
+        if block.kind is BlockKind.COLOR:
+            colors += 1
+            if in_group:
+                f.write(("" if first_in_group else ",") + json.dumps(block.to_dict(), **_COMPACT))
+                first_in_group = False
+                continue
+        f.write("," if items else "")
+        items += 1
+        if block.kind is BlockKind.GROUP_START:
+            # Словарь группы без закрывающей скобки, дальше дописываются образцы
+            f.write(json.dumps(block.to_dict(), **_COMPACT)[:-1] + ',"swatches":[')
+            in_group, first_in_group = True, True
+        else:
+            f.write(json.dumps(block.to_dict(), **_COMPACT))
+    f.write("]}]" if in_group else "]")
+    return items, colors
+
+
+def _write_ndjson(blocks: Iterable[AseBlock], f: TextIO) -> tuple[int, int]:
+    items = colors = 0
+    group: dict | None = None  # строку группы можно записать только целиком, после ее конца
+    for block in blocks:
+        if block.kind is BlockKind.GROUP_START:
+            group = dict(block.to_dict(), swatches=[])
+            continue
+        if block.kind is BlockKind.GROUP_END:
+            if group is not None:
+                f.write(json.dumps(group, **_COMPACT) + "\n")
+                items += 1
+                group = None
+            continue
+        colors += 1
+        if group is not None:
+            group["swatches"].append(block.to_dict())
+        else:
+            f.write(json.dumps(block.to_dict(), **_COMPACT) + "\n")
+            items += 1
+    if group is not None:
+        f.write(json.dumps(group, **_COMPACT) + "\n")
+        items += 1
+    return items, colors
+
+
+# --- Чтение ---
+
+def iter_json_items(fp: BinaryIO) -> Iterator[dict]:
+    """
+    Потоково читает элементы верхнего уровня из JSON списка или из NDJSON
+    (формат определяется по первому символу). Файл открыт в двоичном режиме,
+    поэтому fp.tell() между элементами показывает, сколько прочитано (для прогресса).
+    Некорректный документ вызывает json.JSONDecodeError (подкласс ValueError).
+
+    Группа, которая не уместилась в порцию чтения, разбирается по ключам: ее
+    словарь выдается, как только дошли до 'swatches' (после 'type', как пишут
+    write_blocks_json и swatch.parse), а 'swatches' в нем - итератор, который
+    разбирает образцы по одному. Пройти его нужно до следующего элемента;
+    непройденные образцы пропускаются.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        """Дочитывает порцию файла в буфер (уже разобранное начало отбрасывается)."""
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = fp.read(READ_CHUNK_SIZE)
+        eof = not chunk
+        buffer = buffer[pos:] + text_decoder.decode(chunk, final=eof)
+        pos = 0
+        return True
+
+    def skip(chars: str) -> str:
+        """Пропускает символы из chars и возвращает следующий символ ('' - конец файла)."""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not fill():
+                return ""
+
+    def decode():
+        """Разбирает одно значение с позиции pos, дочитывая файл, если оно оборвалось."""
+        nonlocal pos
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Дочитываем не меньше, чем уже есть в буфере: повторные
+                # разборы одного значения в сумме остаются линейными
+                need = 2 * (len(buffer) - pos)
+                if not fill():
+                    raise
+                while len(buffer) - pos < need and fill():
+                    pass
+                continue
+            # Число в конце буфера могло оборваться на границе порции
+            if end < len(buffer) or not fill():
+                pos = end
+                return value
+
+    def expect(char: str, message: str) -> None:
+        nonlocal pos
+        if skip(_WHITESPACE) != char:
+            raise json.JSONDecodeError(message, buffer, pos)
+        pos += 1
+
+    def members() -> Iterator[dict]:
+        """Образцы списка 'swatches' (его '[' уже пропущена) по одному."""
+        nonlocal pos
+        if skip(_WHITESPACE) == "]":
+            pos += 1
+            return
+        while True:
+            skip(_WHITESPACE)
+            yield decode()
+            if skip(_WHITESPACE) == "]":
+                pos += 1
+                return
+            expect(",", "Expecting ',' delimiter")
+
+    first = skip(_WHITESPACE)
+    in_list = first == "["
+    if in_list:
+        pos += 1
+    separators = _WHITESPACE + "," if in_list else _WHITESPACE
+    while True:
+        char = skip(separators)
+        if char == "":
+            if in_list:
+                raise json.JSONDecodeError("Unterminated list", buffer, pos)
+            return
+        if in_list and char == "]":
+            return
+        if char != "{":
+            item = decode()
+            raise ValueError(f"Expected a swatch or group object, got {type(item).__name__}.")
+        try:
+            item, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            item = None
+        if item is not None:
+            yield item
+            continue
+
+        # Объект оборвался на границе порции (скорее всего, большая группа):
+        # разбираем его по ключам, чтобы не разбирать заново с начала
+        item = {}
+        yielded = False
+        pos += 1
+        char = skip(_WHITESPACE)
+        while char != "}":
+            if char != '"':
+                raise json.JSONDecodeError("Expecting property name enclosed in double quotes", buffer, pos)
+            key = decode()
+            expect(":", "Expecting ':' delimiter")
+            if key == "swatches" and not yielded and item.get("type") == "Color Group" \
+                    and skip(_WHITESPACE) == "[":
+                pos += 1
+                item[key] = swatches = members()
+                yield item
+                yielded = True
+                for _ in swatches:  # потребитель мог пройти не все образцы
+                    pass
+            else:
+                skip(_WHITESPACE)
+                item[key] = decode()
+            char = skip(_WHITESPACE)
+            if char == ",":
+                pos += 1
+                char = skip(_WHITESPACE)
+                if char == "}":
+                    raise json.JSONDecodeError("Expecting property name enclosed in double quotes", buffer, pos)
+            elif char != "}":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+        pos += 1
+        if not yielded:
+            yield item
+
+
+def _color_block(item: dict) -> AseBlock:
+    try:
+        data = item['data']
+        return AseBlock(BlockKind.COLOR, item['name'], item['type'], data['mode'], list(data['values']))
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid swatch entry {item.get('name', '?')!r}: missing or malformed {e}.") from None
+
+
+def blocks_from_items(items: Iterable[dict]) -> Iterator[AseBlock]:
+    """Превращает словари в формате swatch.parse (включая группы) в блоки ASE."""
+    for item in items:
+        if item.get('type') == 'Color Group':
+            yield group_start(item['name'])
+            for member in item.get('swatches', []):
+                yield _color_block(member)
+            yield group_end()
+        else:
+            yield _color_block(item)
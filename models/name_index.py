@@ -0,0 +1,186 @@
+"""
+Поиск образцов по имени (фильтр списка).
+
+Запрос разбивается на слова; образец подходит, если каждое слово входит в его
+имя как подстрока, без учета регистра ("186 pantone" найдет "PANTONE 186 C").
+Для слов от TRIGRAM_LENGTH символов кандидаты берутся из триграммного индекса
+(пересечение списков образцов, содержащих каждую триграмму слова), затем
+проверяются подстрокой. Короткие запросы проверяются перебором уже приведенных
+к нижнему регистру имен - это быстрая операция над готовыми строками.
+
+Индекс привязан к id образцов и обновляется по уведомлениям модели.
+Триграммы строятся лениво, при первом длинном запросе после загрузки файла,
+чтобы не задерживать саму загрузку.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Sequence
+
+from .common_data_classes import ModelChange, ModelEvent
+
+if TYPE_CHECKING:
+    from .swatch_model import SwatchModel
+
+TRIGRAM_LENGTH = 3
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + TRIGRAM_LENGTH] for i in range(len(text) - TRIGRAM_LENGTH + 1)}
+
+
+def _terms(query: str) -> list[str]:
+    return query.casefold().split()
+
+
+class NameIndex:
+    """
+    Индекс имен образцов одной модели.
+
+        index = NameIndex()
+        index.attach(model)
+        index.search("pantone 186")  # -> индексы образцов в модели, по порядку
+    """
+
+    def __init__(self):
+        self._model: SwatchModel | None = None
+        self._folded: dict[int, str] = {}                # id образца -> имя в нижнем регистре
+        self._postings: dict[str, set[int]] | None = None  # триграмма -> id образцов; None - не построен
+        # Последний запрос и найденные id: следующий запрос, продолжающий его, проверяет только их
+        self._last_query: str | None = None
+        self._last_hits: set[int] = set()
+        # id образца -> индекс в модели; сбрасывается при вставке, удалении и перестановке
+        self._positions: dict[int, int] | None = None
+
+    def attach(self, model: SwatchModel) -> None:
+        self.detach()
+        self._model = model
+        model.subscribe(self._on_model_changed, first=True)
+        self._rebuild()
+
+    def detach(self) -> None:
+        if self._model is not None:
+            self._model.unsubscribe(self._on_model_changed)
+            self._model = None
+            self._folded.clear()
+            self._postings = None
+            self._last_query = None
+            self._positions = None
+
+    # --- Поиск ---
+
+    def search(self, query: str) -> list[int]:
+        """Индексы подходящих образцов в модели, по возрастанию. Пустой запрос - все образцы."""
+        terms = _terms(query)
+        if not terms:
+            return list(range(self._model.swatch_count()))
+
+        folded_query = " ".join(terms)
+        folded = self._folded
+        if self._last_query is not None and folded_query.startswith(self._last_query):
+            # Запрос уточняется (дописываются символы) - проверяем только прошлые результаты
+            hits = self._last_hits
+        else:
+            hits = self._candidates(terms)
+        if hits is None:
+            # Индекс не сузил выбор - первое слово проверяется перебором всех имен
+            hits = {swatch_id for swatch_id, name in folded.items() if terms[0] in name}
+            terms = terms[1:]
+        for term in terms:
+            hits = {swatch_id for swatch_id in hits if term in folded[swatch_id]}
+
+        self._last_query, self._last_hits = folded_query, hits
+        if len(hits) == len(folded):
+            return list(range(len(folded)))
+        if self._positions is None:
+            self._positions = {swatch_id: index for index, swatch_id in enumerate(self._model.get_swatch_ids())}
+        positions = self._positions
+        return sorted(positions[swatch_id] for swatch_id in hits)
+
+    def _candidates(self, terms: list[str]) -> set[int] | None:
+        """id образцов, содержащих все триграммы слов запроса; None, если все слова короче триграммы."""
+        grams = set().union(*(_trigrams(term) for term in terms))
+        if not grams:
+            return None
+        postings = self._ensure_postings()
+        lists = sorted((postings.get(gram, set()) for gram in grams), key=len)
+        return lists[0].intersection(*lists[1:])
+
+    def _ensure_postings(self) -> dict[str, set[int]]:
+        if self._postings is None:
+            self._postings = {}
+            for swatch_id, name in self._folded.items():
+                self._add_postings(swatch_id, name)
+        return self._postings
+
+    # --- Обновление по уведомлениям модели ---
+
+    def _on_model_changed(self, change: ModelChange) -> None:
+        if change.event is ModelEvent.FILE_PATH_CHANGED:
+            return
+        if change.event is not ModelEvent.UPDATED:
+            self._positions = None
+        if change.event is ModelEvent.REORDERED:
+            return  # имена не менялись
+        self._last_query = None
+        if change.event is ModelEvent.RESET or (change.event is ModelEvent.BATCH and change.is_structural):
+            self._rebuild()
+        elif change.event is ModelEvent.BATCH:
+            self._apply_batch(change.changes)
+        elif change.event in (ModelEvent.ADDED, ModelEvent.UPDATED):
+            self._put(change.swatch_id, self._model.get_swatch_names()[change.index])
+        elif change.event is ModelEvent.REMOVED:
+            self._remove(change.swatch_id)
+
+    def _apply_batch(self, changes: Sequence[ModelChange]) -> None:
+        """Индексы внутри пакета могли сдвинуться, поэтому имена ищутся по id образцов."""
+        touched: set[int] = set()
+        for change in changes:
+            if change.event is ModelEvent.REMOVED:
+                self._remove(change.swatch_id)
+                touched.discard(change.swatch_id)
+            elif change.event in (ModelEvent.ADDED, ModelEvent.UPDATED):
+                touched.add(change.swatch_id)
+        if touched:
+            names = self._model.get_swatch_names()
+            for index, swatch_id in enumerate(self._model.get_swatch_ids()):
+                if swatch_id in touched:
+                    self._put(swatch_id, names[index])
+
+    def _rebuild(self) -> None:
+        model = self._model
+        self._folded = {swatch_id: name.casefold()
+                        for swatch_id, name in zip(model.get_swatch_ids(), model.get_swatch_names())}
+        self._postings = None
+        self._last_query = None
+
+    def _put(self, swatch_id: int, name: str) -> None:
+        folded = name.casefold()
+        old = self._folded.get(swatch_id)
+        if old == folded:
+            return
+        if old is not None and self._postings is not None:
+            self._remove_postings(swatch_id, old)
+        self._folded[swatch_id] = folded
+        if self._postings is not None:
+            self._add_postings(swatch_id, folded)
+
+    def _remove(self, swatch_id: int) -> None:
+        old = self._folded.pop(swatch_id, None)
+        if old is not None and self._postings is not None:
+            self._remove_postings(swatch_id, old)
+
+    def _add_postings(self, swatch_id: int, folded: str) -> None:
+        postings = self._postings
+        for gram in _trigrams(folded):
+            ids = postings.get(gram)
+            if ids is None:
+                postings[gram] = {swatch_id}
+            else:
+                ids.add(swatch_id)
+
+    def _remove_postings(self, swatch_id: int, folded: str) -> None:
+        for gram in _trigrams(folded):
+            ids = self._postings[gram]
+            ids.discard(swatch_id)
+            if not ids:
+                del self._postings[gram]
@@ -0,0 +1,262 @@
+"""
+Кэш разбора ASE файлов на диске.
+
+Большие библиотеки открываются много раз за день, и каждый раз файл заново
+разбирается по блокам, а цвета заново переводятся в RGB и LAB. Кэш хранит уже
+разобранное хранилище (см. SwatchStore) вместе с посчитанными rgb/lab в
+двоичном файле, который при повторном открытии читается через mmap целыми
+массивами - без разбора блоков и без конвертации цветов.
+
+Запись кэша соответствует пути к файлу (имя записи - хэш полного пути) и
+проверяется по размеру, времени изменения и хэшу содержимого файла. Если
+совпадают размер и время изменения, запись используется сразу; если изменилось
+только время (файл скопировали или "потрогали"), сверяется хэш содержимого.
+
+Формат записи (little-endian, каждый раздел выровнен на 8 байт):
+    заголовок _HEADER
+    types    uint8   x n        modes    uint8   x n
+    groups   uint32  x n        channels float32 x n*CHANNELS
+    spans    int64   x 2n (если есть флаг _HAS_SPANS)
+    rgb      uint32  x n        lab      float64 x 3n
+    group_ids uint32 x g
+    names, group_names - строки UTF-8, разделенные '\\0'
+
+id образцов не хранятся: модель выдает новые при каждой загрузке.
+Размер каталога ограничен max_bytes; при превышении удаляются записи, которые
+дольше всего не использовались (время изменения файла записи обновляется при
+каждом попадании).
+"""
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Callable, Iterable
+
+from .ase_parser import atomic_write
+from .swatch_store import SwatchStore, CHANNELS
+
+from utils.instrumentation import instrumented
+
+CACHE_DIR_ENV = "YASE_CACHE_DIR"
+CACHE_SUFFIX = ".yasc"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_MAGIC = b"YASC"
+_VERSION = 1
+_HAS_SPANS = 1
+# magic, версия, флаги, CHANNELS, n, g, размер и время изменения источника,
+# хэш содержимого, длина names и group_names в байтах
+_HEADER = struct.Struct("<4sHHIIIqq16sQQ")
+_HASH_CHUNK = 1 << 20
+_SEPARATOR = "\0"
+
+
+def default_cache_dir() -> str:
+    """Каталог кэша: $YASE_CACHE_DIR, иначе yase в пользовательском каталоге кэшей."""
+    path = os.environ.get(CACHE_DIR_ENV)
+    if path:
+        return path
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "yase")
+
+
+def content_hash(path: str) -> bytes:
+    """Хэш содержимого файла (BLAKE2b, 16 байт)."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fp:
+        while chunk := fp.read(_HASH_CHUNK):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _padding(offset: int) -> int:
+    return -offset % 8
+
+
+class ParseCache:
+    """
+    Каталог записей кэша. Методы не выбрасывают исключений из-за проблем с самим
+    кэшем (нет прав, поврежденная запись): в худшем случае файл просто разбирается заново.
+
+        cache = ParseCache()
+        store = cache.load(path, new_ids)   # None - записи нет или она устарела
+        cache.save(path, store, stamp, digest)
+    """
+
+    def __init__(self, directory: str | None = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def entry_path(self, path: str) -> str:
+        key = hashlib.blake2b(os.path.normcase(os.path.abspath(path)).encode("utf-8"), digest_size=16)
+        return os.path.join(self.directory, key.hexdigest() + CACHE_SUFFIX)
+
+    # --- Чтение ---
+
+    @instrumented("cache.load")
+    def load(self, path: str, new_ids: Callable[[int], Iterable[int]]) -> SwatchStore | None:
+        """
+        Хранилище из записи для файла path или None, если записи нет или файл
+        изменился. new_ids(n) выдает n новых id для образцов.
+        """
+        entry = self.entry_path(path)
+        try:
+            stat = os.stat(path)
+            with open(entry, "rb") as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                header = _HEADER.unpack_from(mm)
+                (magic, version, flags, channels, count, group_count,
+                 size, mtime_ns, digest, names_size, group_names_size) = header
+                if magic != _MAGIC or version != _VERSION or channels != CHANNELS or size != stat.st_size:
+                    return None
+                fresh = mtime_ns == stat.st_mtime_ns
+                if not fresh and digest != content_hash(path):
+                    return None
+                with memoryview(mm) as view:
+                    store = self._decode(view, flags, count, group_count, names_size, group_names_size)
+            if not fresh:
+                # Содержимое то же - запоминаем новое время изменения, чтобы не считать хэш снова
+                with open(entry, "r+b") as fp:
+                    fp.write(_HEADER.pack(magic, version, flags, channels, count, group_count,
+                                          size, stat.st_mtime_ns, digest, names_size, group_names_size))
+            os.utime(entry)  # отметка для вытеснения давно не используемых записей
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error, UnicodeDecodeError):
+            self._remove(entry)  # поврежденная запись
+            return None
+        store.ids.extend(new_ids(len(store)))
+        return store
+
+    @staticmethod
+    def _decode(view: memoryview, flags: int, count: int, group_count: int,
+                names_size: int, group_names_size: int) -> SwatchStore:
+        store = SwatchStore()
+        offset = _HEADER.size + _padding(_HEADER.size)
+
+        def read(target: array, length: int) -> None:
+            nonlocal offset
+            end = offset + length * target.itemsize
+            if end > len(view):
+                raise ValueError("Truncated cache entry.")
+            target.frombytes(view[offset:end])
+            if sys.byteorder != "little":
+                target.byteswap()
+            offset = end + _padding(end)
+
+        def read_strings(size: int, expected: int) -> list[str]:
+            nonlocal offset
+            if offset + size > len(view):
+                raise ValueError("Truncated cache entry.")
+            text = str(view[offset:offset + size], "utf-8")
+            offset += size + _padding(size)
+            strings = text.split(_SEPARATOR) if expected else []
+            if len(strings) != expected:
+                raise ValueError("Corrupted cache entry.")
+            return strings
+
+        read(store.types, count)
+        read(store.modes, count)
+        read(store.groups, count)
+        read(store.channels, count * CHANNELS)
+        if flags & _HAS_SPANS:
+            read(store.spans, 2 * count)
+        read(store.rgb, count)
+        read(store.lab, 3 * count)
+        group_ids = array('I')
+        read(group_ids, group_count)
+        store.names = list(map(sys.intern, read_strings(names_size, count)))
+        store.group_names = dict(zip(group_ids, read_strings(group_names_size, group_count)))
+        return store
+
+    # --- Запись ---
+
+    @instrumented("cache.save")
+    def save(self, path: str, store: SwatchStore, stamp: tuple[int, int], digest: bytes) -> bool:
+        """
+        Записывает хранилище (с посчитанными rgb/lab, см. SwatchStore.has_previews)
+        как запись для файла path. stamp - (размер, время изменения) файла, digest -
+        content_hash, оба взяты до чтения файла. Возвращает False, если записать не удалось.
+        """
+        if not store.has_previews():
+            raise ValueError("Store previews must be computed before caching.")
+        names = _SEPARATOR.join(store.names)
+        group_names = _SEPARATOR.join(store.group_names.values())
+        if names.count(_SEPARATOR) != max(len(store) - 1, 0) or \
+                group_names.count(_SEPARATOR) != max(len(store.group_names) - 1, 0):
+            return False  # '\0' в имени не сохранить в этом формате; ASE такое не пишет
+        flags = _HAS_SPANS if store.has_spans() else 0
+        sections: list[bytes | array] = [store.types, store.modes, store.groups, store.channels]
+        if flags & _HAS_SPANS:
+            sections.append(store.spans)
+        sections += [store.rgb, store.lab, array('I', store.group_names),
+                     names.encode("utf-8"), group_names.encode("utf-8")]
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with atomic_write(self.entry_path(path)) as fp:
+                header = _HEADER.pack(_MAGIC, _VERSION, flags, CHANNELS, len(store), len(store.group_names),
+                                      stamp[0], stamp[1], digest, len(sections[-2]), len(sections[-1]))
+                offset = 0
+                for data in [header] + sections:
+                    if isinstance(data, array) and sys.byteorder != "little":
+                        data = array(data.typecode, data)
+                        data.byteswap()
+                    fp.write(data)
+                    offset += len(data) * (data.itemsize if isinstance(data, array) else 1)
+                    fp.write(b"\0" * _padding(offset))
+                    offset += _padding(offset)
+        except OSError:
+            return False
+        self.evict()
+        return True
+
+    # --- Размер каталога ---
+
+    def entries(self) -> list[tuple[str, int, float]]:
+        """Записи кэша: (путь, размер, время последнего использования)."""
+        result = []
+        try:
+            with os.scandir(self.directory) as it:
+                for item in it:
+                    if item.name.endswith(CACHE_SUFFIX):
+                        try:
+                            stat = item.stat()
+                        except OSError:
+                            continue
+                        result.append((item.path, stat.st_size, stat.st_mtime))
+        except OSError:
+            pass
+        return result
+
+    def total_bytes(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self) -> int:
+        """Удаляет давно не использованные записи, пока кэш больше max_bytes. Возвращает число удаленных."""
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> None:
+        for path, _, _ in self.entries():
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -1,7 +1,23 @@
-import swatch
-import json
-from .common_data_classes import Swatch, ColorMode, SwatchType
-from models import Color
+import itertools
+import os
+import re
+import sys
+from array import array
+from contextlib import contextmanager
+from typing import Callable, Collection, Iterable, Iterator, Sequence
+from .common_data_classes import (Swatch, ColorMode, SwatchType, ModelEvent, ModelChange,
+                                  OperationCancelled, ProgressCallback, CancelCheck)
+from .ase_parser import (read_header, iter_blocks, write_ase, patch_blocks, encode_item, atomic_write,
+                         AseBlock, BlockKind, READ_BUFFER_SIZE, group_start, group_end)
+from .json_io import write_blocks_json, iter_json_items, blocks_from_items
+from .swatch_store import SwatchStore, SwatchListView, PreviewColorsView, NO_GROUP, TYPE_CODES
+from .parse_cache import ParseCache, content_hash
+from .color_index import ColorIndex, ColorMatch
+from .name_index import NameIndex
+from .dedup import find_duplicates, DedupReport, DuplicateCluster, DEFAULT_THRESHOLD
+from .history import History, Command, UpdateCommand, InsertCommand, DeleteCommand, MoveCommand, CompoundCommand
+from models import Color, conversion_cache
+from utils.instrumentation import instrumented
 
 # deprecated
 # # Эти функции теперь являются частью логики модели
@@ -24,19 +40,191 @@ from models import Color
 #     }
 
 
+def _file_stamp(path: str) -> tuple[int, int] | None:
+    """Размер и время изменения файла - чтобы заметить, что его изменили извне."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
 class SwatchModel:
     """
     Модель данных. Управляет списком образцов и операциями с файлами.
-    Не зависит от UI (Tkinter).
+    Не зависит от UI (Tkinter): об изменениях сообщает подписчикам (см. subscribe).
+    Долгие операции с файлами разделены на чтение/запись, которые можно выполнять
+    в фоновом потоке (read_ase_store, read_json_store, write_ase_file, export_to_json),
+    и применение результата (apply_loaded_store, apply_imported_store, mark_saved),
+    которое выполняется в потоке подписчиков.
     """
 
+    # Как часто (в блоках) долгие операции сообщают о прогрессе и проверяют отмену
+    PROGRESS_STEP = 1000
+
     def __init__(self):
-        self.swatches: list[Swatch] = []
+        # Образцы хранятся в компактном виде (см. SwatchStore), объекты Swatch
+        # создаются только при обращении. У каждого образца есть стабильный id:
+        # он не меняется при редактировании и сдвиге индексов, поэтому View
+        # может по нему сопоставлять свои элементы с образцами.
+        self._store = SwatchStore()
+        self._id_counter = itertools.count(1)
         self.file_path: str | None = None
+        # Кэш разбора ASE файлов на диске (см. parse_cache); None - без кэша
+        self.parse_cache: ParseCache | None = None
+        # Образцы выгружены для экономии памяти (см. unload), остался только путь к файлу
+        self._unloaded = False
+
+        # Подписчики на изменения и изменения, накопленные в открытой транзакции
+        self._listeners: list[Callable[[ModelChange], None]] = []
+        self._transaction_depth = 0
+        self._pending_changes: list[ModelChange] = []
+
+        # История правок (Undo/Redo) и команды, накопленные в открытой транзакции
+        self._history = History()
+        self._pending_commands: list[Command] = []
+        self._transaction_description: str | None = None
+
+        # Несохраненные изменения: индексы измененных образцов и признак вставок,
+        # удалений или перестановок после загрузки или последнего сохранения.
+        # Пока порядок не менялся, измененные образцы можно дописать в файл на место
+        # их блоков (см. SwatchStore.spans), если файл не изменили извне (_saved_stamp).
+        self._changed_indices: set[int] = set()
+        self._structure_changed = False
+        self._saved_stamp: tuple[int, int] | None = None
+        # Расположение блоков, записанное write_ase_file, до подтверждения в mark_saved
+        self._written_spans: tuple[str, array] | None = None
+
+        # Участки групп (см. get_group_runs), вычисляются при обращении
+        self._group_runs: list[tuple[int, int, int]] | None = None
+
+        # Индексы для find_similar и filter_by_name, создаются при первом поиске
+        self._color_index: ColorIndex | None = None
+        self._name_index: NameIndex | None = None
+
+    # --- Уведомления об изменениях ---
+
+    def subscribe(self, listener: Callable[[ModelChange], None], first: bool = False) -> None:
+        """
+        Подписывает функцию на изменения модели. Она получает ModelChange.
+        first=True - уведомлять раньше остальных: так подписываются индексы
+        (ColorIndex, NameIndex), чтобы к моменту реакции View они уже были обновлены.
+        """
+        if first:
+            self._listeners.insert(0, listener)
+        else:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[ModelChange], None]) -> None:
+        self._listeners.remove(listener)
+
+    @contextmanager
+    def transaction(self, description: str | None = None) -> Iterator['SwatchModel']:
+        """
+        Группирует изменения: внутри блока with подписчики не уведомляются,
+        а по его завершении получают одно уведомление (BATCH, если изменений несколько).
+        Правки транзакции попадают в историю одной записью (description - ее название для Undo).
+        Транзакции могут быть вложенными - уведомление отправляется при выходе из внешней.
+        """
+        self._transaction_depth += 1
+        if self._transaction_description is None:
+            self._transaction_description = description
+        try:
+            yield self
+        finally:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                commands, self._pending_commands = self._pending_commands, []
+                description, self._transaction_description = self._transaction_description, None
+                if len(commands) == 1 and description is None:
+                    self._history.push(commands[0])
+                elif commands:
+                    self._history.push(CompoundCommand(description or commands[-1].description, tuple(commands)))
+            if self._transaction_depth == 0 and self._pending_changes:
+                changes, self._pending_changes = self._pending_changes, []
+                self._emit(changes[0] if len(changes) == 1 else ModelChange(ModelEvent.BATCH, changes=tuple(changes)))
+
+    def _notify(self, event: ModelEvent, index: int | None = None, swatch_id: int | None = None) -> None:
+        if event not in (ModelEvent.UPDATED, ModelEvent.FILE_PATH_CHANGED):
+            self._group_runs = None
+        if event is ModelEvent.UPDATED:
+            self._changed_indices.add(index)
+        elif event in (ModelEvent.ADDED, ModelEvent.REMOVED, ModelEvent.REORDERED):
+            self._structure_changed = True
+        change = ModelChange(event, index, swatch_id)
+        if self._transaction_depth:
+            self._pending_changes.append(change)
+        else:
+            self._emit(change)
+
+    def _emit(self, change: ModelChange) -> None:
+        for listener in list(self._listeners):
+            listener(change)
+
+    # --- История правок (Undo/Redo) ---
+
+    def undo(self) -> str | None:
+        """Отменяет последнюю правку. Возвращает ее название или None, если отменять нечего."""
+        command = self._history.pop_undo()
+        if command is None:
+            return None
+        command.undo(self)
+        return command.description
+
+    def redo(self) -> str | None:
+        """Повторяет последнюю отмененную правку. Возвращает ее название или None."""
+        command = self._history.pop_redo()
+        if command is None:
+            return None
+        command.redo(self)
+        return command.description
+
+    def can_undo(self) -> bool:
+        return self._history.can_undo()
+
+    def can_redo(self) -> bool:
+        return self._history.can_redo()
+
+    def _record(self, command: Command) -> None:
+        if self._transaction_depth:
+            self._pending_commands.append(command)
+        else:
+            self._history.push(command)
+
+    # Примитивы, через которые команды истории меняют модель (в историю не записываются)
+
+    def _put_rows(self, indices: Sequence[int], rows: SwatchStore) -> None:
+        self._store.put(indices, rows)
+        with self.transaction():
+            for index in indices:
+                self._notify(ModelEvent.UPDATED, index, self._store.ids[index])
+
+    def _insert_rows(self, indices: Sequence[int], rows: SwatchStore) -> None:
+        self._store.insert_many(indices, rows)
+        with self.transaction():
+            for index in indices:
+                self._notify(ModelEvent.ADDED, index, self._store.ids[index])
+
+    def _delete_rows(self, indices: Sequence[int]) -> None:
+        removed_ids = self._store.delete_many(indices)
+        with self.transaction():
+            # С конца, чтобы индекс каждого уведомления был верен на момент "его" удаления
+            for index, swatch_id in reversed(list(zip(indices, removed_ids))):
+                self._notify(ModelEvent.REMOVED, index, swatch_id)
+
+    def _move_row(self, old_index: int, new_index: int) -> None:
+        self._store.move(old_index, new_index)
+        self._notify(ModelEvent.REORDERED)
+
+    def _set_file_path(self, file_path: str | None) -> None:
+        if file_path != self.file_path:
+            self.file_path = file_path
+            self._notify(ModelEvent.FILE_PATH_CHANGED)
 
     # --- Методы-помощники (теперь инкапсулированы в классе) ---
 
     @staticmethod
+    @instrumented("model.create_swatch")
     def _create_swatch_from_data(data: dict, is_normalized: bool) -> Swatch:
         """Создает объект Swatch из словаря данных."""
         return Swatch(
@@ -55,52 +243,544 @@ class SwatchModel:
             'data': swatch.color.to_data()
         }
 
+    @staticmethod
+    def _parse_raw(data: dict) -> tuple[str, SwatchType, ColorMode, list[float]]:
+        """Проверяет словарь в формате swatch.parse и возвращает (имя, тип, режим, нормализованные значения)."""
+        color_class = Color.get_class_by_mode(data['data']['mode'])
+        return data['name'], SwatchType(data['type']), color_class.mode, list(data['data']['values'])
+
+    def _iter_ase_blocks(self) -> Iterator[AseBlock]:
+        """
+        Блоки для записи в ASE прямо из хранилища, без объектов Swatch.
+        Маркеры групп вставляются там, где меняется группа образца.
+        """
+        store = self._store
+        current_group = NO_GROUP
+        for index in range(len(store)):
+            group = store.groups[index]
+            if group != current_group:
+                if current_group != NO_GROUP:
+                    yield group_end()
+                if group != NO_GROUP:
+                    yield group_start(store.group_names[group])
+                current_group = group
+            yield self._color_block(index)
+        if current_group != NO_GROUP:
+            yield group_end()
+
+    def _color_block(self, index: int) -> AseBlock:
+        store = self._store
+        return AseBlock(BlockKind.COLOR, store.names[index], store.type_of(index).value,
+                        store.mode_of(index).value, store.values(index))
+
     # --- Основной API для Контроллера ---
 
-    def get_swatches(self) -> list[Swatch]:
-        """Возвращает список всех образцов."""
-        return self.swatches
+    def get_swatches(self) -> SwatchListView:
+        """Возвращает последовательность всех образцов (объекты создаются при обращении)."""
+        return SwatchListView(self._store)
+
+    def get_preview_colors(self) -> PreviewColorsView:
+        """HEX цвета образцов для показа (последовательность, см. SwatchStore.preview_hex)."""
+        return PreviewColorsView(self._store)
 
     def get_swatch(self, index: int) -> Swatch:
-        """Возвращает образец по индексу."""
-        return self.swatches[index]
+        """Возвращает образец по индексу (копию: изменения вносятся через update_swatch)."""
+        return self._store.get(index)
+
+    def get_swatch_ids(self) -> Sequence[int]:
+        """Возвращает последовательность стабильных идентификаторов образцов (в порядке образцов)."""
+        return self._store.ids
+
+    def get_swatch_names(self) -> Sequence[str]:
+        """Имена образцов по порядку (только для чтения)."""
+        return self._store.names
+
+    # --- Группы (Color Group) ---
+
+    def has_groups(self) -> bool:
+        return any(group != NO_GROUP for group, _, _ in self.get_group_runs())
+
+    def get_group_runs(self) -> list[tuple[int, int, int]]:
+        """
+        Разбиение списка на участки подряд идущих образцов одной группы:
+        (id группы или NO_GROUP, начальный индекс, конечный индекс не включительно).
+        Результат кэшируется до ближайшего изменения состава или порядка образцов.
+        """
+        if self._group_runs is None:
+            runs = []
+            start = 0
+            for group, members in itertools.groupby(self._store.groups):
+                count = sum(1 for _ in members)
+                runs.append((group, start, start + count))
+                start += count
+            self._group_runs = runs
+        return self._group_runs
+
+    def get_group_name(self, group: int) -> str:
+        return self._store.group_names[group]
+
+    def group_of(self, index: int) -> int:
+        """id группы образца (NO_GROUP - вне групп)."""
+        return self._store.groups[index]
+
+    def get_swatch_id(self, index: int) -> int:
+        return self._store.ids[index]
+
+    def swatch_count(self) -> int:
+        return len(self._store)
+
+    def index_of(self, swatch_id: int) -> int:
+        """Текущий индекс образца по его id. Если образца нет, выбрасывает ValueError."""
+        return self._store.ids.index(swatch_id)
+
+    def indices_of(self, swatch_ids: Collection[int]) -> list[int]:
+        """Текущие индексы образцов с id из swatch_ids (по возрастанию); отсутствующие id пропускаются."""
+        return [i for i, swatch_id in enumerate(self._store.ids) if swatch_id in swatch_ids]
+
+    def get_lab_coordinates(self, indices: Sequence[int] | None = None
+                            ) -> tuple[list[int], list[str], list[tuple[float, float, float]]]:
+        """
+        Возвращает (ids, имена, LAB координаты) образцов по индексам (по умолчанию всех).
+        LAB - в единицах пользователя (L 0-100), считается пакетно (см. color_engine.store_to_lab).
+        """
+        from .color_engine import store_to_lab
+        rows = range(len(self._store)) if indices is None else indices
+        labs = [tuple(lab) for lab in store_to_lab(self._store, rows).tolist()]
+        return [self._store.ids[i] for i in rows], [self._store.names[i] for i in rows], labs
+
+    @instrumented("model.load")
+    def read_ase_store(self, filename: str, progress: ProgressCallback | None = None,
+                       cancel: CancelCheck | None = None) -> SwatchStore:
+        """
+        Читает ASE файл в новое хранилище, не меняя состояние модели, поэтому
+        может выполняться в фоновом потоке. Результат применяется через apply_loaded_store.
+        progress вызывается каждые PROGRESS_STEP блоков и в конце; если cancel
+        возвращает True, чтение прерывается исключением OperationCancelled.
+        Образцы из Color Group получают id группы; пустые группы не сохраняются.
+        Если задан parse_cache, хранилище берется из кэша, а после разбора
+        файла сохраняется в него вместе с цветами для показа (compute_previews).
+        """
+        cache = self.parse_cache
+        if cache is not None:
+            store = cache.load(filename, lambda count: itertools.islice(self._id_counter, count))
+            if store is not None:
+                if progress:
+                    progress(len(store), len(store))
+                return store
+            stamp, digest = _file_stamp(filename), content_hash(filename)
+
+        store = SwatchStore()
+        with open(filename, "rb", buffering=READ_BUFFER_SIZE) as fp:
+            total = read_header(fp)
+            processed = self._fill_store(store, iter_blocks(fp),
+                                         lambda done: self._check_progress(done, total, progress, cancel))
+        if cache is not None and stamp is not None and _file_stamp(filename) == stamp:
+            from .color_engine import compute_previews
+            self._check_progress(processed, max(total, processed), None, cancel)
+            compute_previews(store)
+            cache.save(filename, store, stamp, digest)
+        if progress:
+            progress(processed, max(total, processed))
+        return store
+
+    @instrumented("model.import_json")
+    def read_json_store(self, filename: str, progress: ProgressCallback | None = None,
+                        cancel: CancelCheck | None = None) -> SwatchStore:
+        """
+        Читает JSON или NDJSON (формат swatch.parse, см. json_io) в новое хранилище,
+        как read_ase_store. Файл разбирается потоково, по одному элементу верхнего
+        уровня. Прогресс считается в байтах файла. Результат - apply_imported_store.
+        """
+        store = SwatchStore()
+        size = os.path.getsize(filename)
+        with open(filename, "rb") as fp:
+            self._fill_store(store, blocks_from_items(iter_json_items(fp)),
+                             lambda _: self._check_progress(fp.tell(), size, progress, cancel))
+        if progress:
+            progress(size, size)
+        return store
+
+    @instrumented("model.parse_blocks")
+    def _fill_store(self, store: SwatchStore, blocks: Iterable[AseBlock],
+                    on_step: Callable[[int], None]) -> int:
+        """
+        Укладывает поток блоков в хранилище. on_step(обработано блоков) вызывается
+        каждые PROGRESS_STEP блоков. Возвращает количество блоков.
+        """
+        processed = 0
+        group = NO_GROUP
+        for block in blocks:
+            if block.kind is BlockKind.COLOR:
+                store.append_raw(*self._parse_raw(block.to_dict()), next(self._id_counter), group)
+                if block.size:  # блок прочитан из ASE файла - запоминаем, где он лежит
+                    store.spans.extend((block.offset, block.size))
+            elif block.kind is BlockKind.GROUP_START:
+                group = store.add_group(block.name)
+            else:
+                group = NO_GROUP
+            processed += 1
+            if processed % self.PROGRESS_STEP == 0:
+                on_step(processed)
+        return processed
+
+    def apply_loaded_store(self, store: SwatchStore, filename: str) -> None:
+        """Делает прочитанное хранилище текущим (вызывается в потоке подписчиков)."""
+        with self.transaction():
+            self._store = store
+            self._unloaded = False
+            self._history.clear()
+            self._notify(ModelEvent.RESET)
+            self._set_file_path(filename)
+            self._reset_modified(filename)
+
+    def apply_imported_store(self, store: SwatchStore) -> None:
+        """
+        Делает текущим хранилище, импортированное из JSON. У библиотеки нет ASE
+        файла, поэтому она считается несохраненной (Save предложит выбрать файл).
+        """
+        with self.transaction():
+            self._store = store
+            self._unloaded = False
+            self._history.clear()
+            self._notify(ModelEvent.RESET)
+            self._set_file_path(None)
+            self._reset_modified(None)
+            self._structure_changed = True
+
+    def import_from_json(self, filename: str) -> None:
+        """Загружает данные из JSON или NDJSON. При ошибке выбрасывает исключение."""
+        self.apply_imported_store(self.read_json_store(filename))
 
     def load_from_ase(self, filename: str) -> None:
-        """Загружает данные из ASE файла. При ошибке выбрасывает исключение."""
-        raw_swatches = swatch.parse(filename)
-        self.swatches = [self._create_swatch_from_data(raw, is_normalized=True) for raw in raw_swatches]
-        self.file_path = filename
+        """
+        Загружает данные из ASE файла. При ошибке выбрасывает исключение.
+        Блоки читаются потоково и сразу укладываются в компактное хранилище.
+        """
+        self.apply_loaded_store(self.read_ase_store(filename), filename)
+
+    @instrumented("model.save")
+    def write_ase_file(self, filename: str, progress: ProgressCallback | None = None,
+                       cancel: CancelCheck | None = None, full: bool = False) -> int:
+        """
+        Записывает образцы в ASE файл, не уведомляя подписчиков, поэтому может
+        выполняться в фоновом потоке (пока идет запись, модель менять нельзя).
+        Возвращает количество записанных блоков.
+
+        Если с загрузки (сохранения) этого же файла менялись только данные образцов
+        и размеры их блоков не изменились, переписываются только эти блоки. Иначе
+        файл пишется целиком, атомарно (см. write_ase): при ошибке или отмене
+        прежний файл не портится. full=True - всегда писать файл целиком.
+        """
+        patches = None if full else self._patch_plan(filename)
+        if patches is not None:
+            return patch_blocks(filename, patches)
+
+        spans = array('q')
+        count = write_ase(self._iter_blocks_with_progress(progress, cancel), filename, spans)
+        # Расположение блоков в новом файле станет действительным в mark_saved
+        self._written_spans = (filename, spans)
+        return count
 
-    def save_to_ase(self, filename: str | None = None) -> str:
-        """Сохраняет данные в ASE файл. Возвращает путь к файлу."""
+    def _patch_plan(self, filename: str) -> list[tuple[int, bytes]] | None:
+        """
+        Блоки измененных образцов для записи поверх файла: (смещение, байты блока).
+        None - файл нужно переписать целиком.
+        """
+        store = self._store
+        if (filename != self.file_path or self._structure_changed or not store.has_spans()
+                or self._saved_stamp is None or self._saved_stamp != _file_stamp(filename)):
+            return None
+        patches = []
+        for index in sorted(self._changed_indices):
+            data = encode_item(self._color_block(index))
+            if len(data) != store.spans[2 * index + 1]:
+                return None  # имя стало длиннее или короче, или сменился режим
+            patches.append((store.spans[2 * index], data))
+        return patches
+
+    def save_to_ase(self, filename: str | None = None, full: bool = False) -> str:
+        """
+        Сохраняет данные в ASE файл. Возвращает путь к файлу.
+        Если изменений нет (см. needs_save), файл не трогается; full=True - записать
+        файл целиком в любом случае.
+        """
+        path_to_save = self.resolve_save_path(filename)
+        if full or self.needs_save(path_to_save):
+            self.write_ase_file(path_to_save, full=full)
+            self.mark_saved(path_to_save)
+        return path_to_save
+
+    def resolve_save_path(self, filename: str | None = None) -> str:
+        """
+        Путь, по которому будет выполнено сохранение. Без пути, а также для
+        выгруженной библиотеки (см. unload) выбрасывает ValueError.
+        """
+        if self._unloaded:
+            raise ValueError("The library is unloaded; reload it before saving.")
         path_to_save = filename or self.file_path
         if not path_to_save:
             raise ValueError("File path is not specified for saving.")
-
-        raw_swatches = [self._swatch_to_data(sw) for sw in self.swatches]
-        swatch.write(raw_swatches, path_to_save)
-        self.file_path = path_to_save
         return path_to_save
 
-    def export_to_json(self, filename: str) -> None:
-        """Экспортирует данные в JSON."""
-        data_to_export = [self._swatch_to_data(sw) for sw in self.swatches]
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(data_to_export, f, ensure_ascii=False, indent=2)
+    def mark_saved(self, filename: str) -> None:
+        """Запоминает путь после успешной записи (вызывается в потоке подписчиков)."""
+        if self._written_spans is not None and self._written_spans[0] == filename:
+            self._store.spans = self._written_spans[1]
+        self._written_spans = None
+        self._set_file_path(filename)
+        self._reset_modified(filename)
+
+    # --- Несохраненные изменения ---
+
+    def is_modified(self) -> bool:
+        """Есть ли правки после загрузки или последнего сохранения."""
+        return self._structure_changed or bool(self._changed_indices)
+
+    def needs_save(self, filename: str | None = None) -> bool:
+        """
+        Нужно ли записывать файл: есть правки, сохранение идет в другой файл,
+        или файл на диске изменили (удалили) после загрузки или сохранения.
+        """
+        path = filename or self.file_path
+        return (self.is_modified() or path != self.file_path
+                or self._saved_stamp is None or self._saved_stamp != _file_stamp(path))
+
+    def _reset_modified(self, filename: str | None) -> None:
+        self._changed_indices.clear()
+        self._structure_changed = False
+        self._saved_stamp = _file_stamp(filename) if filename else None
+
+    @staticmethod
+    def _check_progress(processed: int, total: int, progress: ProgressCallback | None,
+                        cancel: CancelCheck | None) -> None:
+        if cancel and cancel():
+            raise OperationCancelled()
+        if progress:
+            progress(processed, max(total, processed))
+
+    def _iter_blocks_with_progress(self, progress: ProgressCallback | None,
+                                   cancel: CancelCheck | None) -> Iterator[AseBlock]:
+        """Блоки для записи (_iter_ase_blocks) с отметками прогресса и проверкой отмены."""
+        total = len(self._store)
+        for processed, block in enumerate(self._iter_ase_blocks(), 1):
+            yield block
+            if processed % self.PROGRESS_STEP == 0:
+                self._check_progress(processed, total, progress, cancel)
+        if progress:
+            progress(total, total)
+
+    @instrumented("model.export_json")
+    def export_to_json(self, filename: str, fmt: str = "indented", progress: ProgressCallback | None = None,
+                       cancel: CancelCheck | None = None) -> int:
+        """
+        Экспортирует данные в JSON (формат swatch.parse, группы - вложенными списками).
+        fmt - indented, compact или ndjson (см. json_io). Образцы пишутся по мере
+        обхода хранилища, файл заменяется атомарно. Как и write_ase_file, не меняет
+        модель и может выполняться в фоновом потоке. Возвращает количество цветов.
+        """
+        with atomic_write(filename, "w", encoding="utf-8") as f:
+            _, colors = write_blocks_json(self._iter_blocks_with_progress(progress, cancel), f, fmt)
+        return colors
 
     def add_swatch(self, swatch: Swatch) -> None:
         """Добавляет новый образец в список."""
-        self.swatches.append(swatch)
+        self._store.append(swatch, next(self._id_counter))
+        index = len(self._store) - 1
+        self._record(InsertCommand("Add swatch", (index,), self._store.take((index,))))
+        self._notify(ModelEvent.ADDED, index, self._store.ids[index])
 
     def update_swatch(self, index: int, updated_swatch: Swatch) -> None:
-        """Обновляет существующий образец."""
-        if 0 <= index < len(self.swatches):
-            self.swatches[index] = updated_swatch
+        """Обновляет существующий образец. Кэш конвертаций старого цвета сбрасывается."""
+        if 0 <= index < len(self._store):
+            before = self._store.take((index,))
+            conversion_cache.invalidate(self._store.get(index).color)
+            self._store.set(index, updated_swatch)
+            self._record(UpdateCommand("Edit swatch", (index,), before, self._store.take((index,))))
+            self._notify(ModelEvent.UPDATED, index, self._store.ids[index])
 
     def delete_swatch(self, index: int) -> None:
         """Удаляет образец по индексу."""
-        if 0 <= index < len(self.swatches):
-            del self.swatches[index]
+        if 0 <= index < len(self._store):
+            self._record(DeleteCommand("Delete swatch", (index,), self._store.take((index,))))
+            swatch_id = self._store.delete(index)
+            self._notify(ModelEvent.REMOVED, index, swatch_id)
+
+    def move_swatch(self, old_index: int, new_index: int) -> None:
+        """Перемещает образец на новую позицию."""
+        if old_index == new_index or not (0 <= old_index < len(self._store)):
+            return
+        new_index = max(0, min(new_index, len(self._store) - 1))
+        self._store.move(old_index, new_index)
+        self._record(MoveCommand("Move swatch", old_index, new_index))
+        self._notify(ModelEvent.REORDERED)
+
+    @instrumented("model.convert_all")
+    def convert_all(self, target_mode: ColorMode) -> None:
+        """Конвертирует все образцы в указанный цветовой режим одним пакетом (см. color_engine)."""
+        self.convert_swatches(range(len(self._store)), target_mode)
+
+    # --- Пакетные правки (выделение в сетке) ---
+    # Каждая правка меняет хранилище целиком за один проход, записывается в историю
+    # одной командой и рассылает одно уведомление BATCH
+
+    def _valid_rows(self, indices: Iterable[int]) -> Sequence[int]:
+        """
+        Существующие индексы из indices, по возрастанию и без повторов. Сплошной
+        диапазон остается range: для него SwatchStore.take и put копируют срезы.
+        """
+        count = len(self._store)
+        if isinstance(indices, range) and indices.step == 1:
+            return range(max(indices.start, 0), min(max(indices.stop, 0), count))
+        return array('I', sorted({index for index in indices if 0 <= index < count}))
+
+    def _apply_update(self, description: str, rows: Sequence[int], before: SwatchStore) -> None:
+        """Записывает в историю замену данных образцов rows (before - их копия до правки) и уведомляет."""
+        if not rows:
+            return
+        self._record(UpdateCommand(description, rows, before, self._store.take(rows)))
+        with self.transaction():
+            for index in rows:
+                self._notify(ModelEvent.UPDATED, index, self._store.ids[index])
+
+    def convert_swatches(self, indices: Iterable[int], target_mode: ColorMode) -> int:
+        """Конвертирует образцы indices в режим target_mode. Возвращает число образцов."""
+        # color_engine тянет NumPy - импортируем при первом использовании, а не при запуске
+        from .color_engine import convert_store
+        rows = self._valid_rows(indices)
+        before = self._store.take(rows)
+        convert_store(self._store, target_mode, rows)
+        self._apply_update(f"Convert to {target_mode.value}", rows, before)
+        return len(rows)
+
+    def set_swatch_type(self, indices: Iterable[int], swatch_type: SwatchType) -> int:
+        """Меняет тип (Global/Spot/Process) образцов indices. Возвращает число измененных."""
+        code = TYPE_CODES.index(swatch_type)
+        rows = array('I', (i for i in self._valid_rows(indices) if self._store.types[i] != code))
+        before = self._store.take(rows)
+        for index in rows:
+            self._store.types[index] = code
+        self._apply_update(f"Set type to {swatch_type.value}", rows, before)
+        return len(rows)
+
+    def rename_swatches(self, indices: Iterable[int], pattern: str, replacement: str) -> int:
+        """
+        Переименовывает образцы indices заменой по регулярному выражению (re.sub).
+        Неверное выражение или замена выбрасывают re.error. Возвращает число переименованных.
+        """
+        regex = re.compile(pattern)
+        names = self._store.names
+        renamed = {}
+        for index in self._valid_rows(indices):
+            name = regex.sub(replacement, names[index])
+            if name != names[index]:
+                renamed[index] = sys.intern(name)
+        rows = array('I', renamed)
+        before = self._store.take(rows)
+        for index, name in renamed.items():
+            names[index] = name
+        self._apply_update("Rename swatches", rows, before)
+        return len(rows)
+
+    def adjust_lightness(self, indices: Iterable[int], delta: float) -> int:
+        """Меняет светлоту L* образцов indices на delta (-100..100), см. color_engine.adjust_lightness."""
+        from .color_engine import adjust_lightness
+        rows = self._valid_rows(indices)
+        before = self._store.take(rows)
+        adjust_lightness(self._store, rows, delta)
+        self._apply_update(f"Lightness {delta:+g}", rows, before)
+        return len(rows)
+
+    def tint_swatches(self, indices: Iterable[int], amount: float) -> int:
+        """Осветляет образцы indices к белому на долю amount (0-1), см. color_engine.tint_store."""
+        from .color_engine import tint_store
+        rows = self._valid_rows(indices)
+        before = self._store.take(rows)
+        tint_store(self._store, rows, amount)
+        self._apply_update(f"Tint {amount:.0%}", rows, before)
+        return len(rows)
+
+    def delete_swatches(self, indices: Iterable[int]) -> int:
+        """Удаляет образцы indices одной правкой. Возвращает число удаленных."""
+        rows = self._valid_rows(indices)
+        if rows:
+            self._record(DeleteCommand("Delete swatches", rows, self._store.take(rows)))
+            self._delete_rows(rows)
+        return len(rows)
+
+    def find_similar(self, color: Color | Sequence[float], k: int = 5) -> list[ColorMatch]:
+        """
+        k образцов, ближайших к цвету по CIEDE2000 (см. ColorIndex.nearest).
+        Индекс строится при первом вызове и дальше обновляется по уведомлениям модели.
+        Для поиска сразу по нескольким библиотекам используйте общий ColorIndex.
+        """
+        if self._color_index is None:
+            self._color_index = ColorIndex()
+            self._color_index.attach(self)
+        return self._color_index.nearest(color, k)
+
+    def filter_by_name(self, query: str) -> list[int]:
+        """
+        Индексы образцов, в имени которых есть все слова запроса (без учета регистра).
+        Индекс имен создается при первом вызове и дальше обновляется по уведомлениям модели.
+        """
+        if self._name_index is None:
+            self._name_index = NameIndex()
+            self._name_index.attach(self)
+        return self._name_index.search(query)
+
+    @instrumented("model.find_duplicates")
+    def find_duplicates(self, threshold: float = DEFAULT_THRESHOLD, same_type: bool = True) -> DedupReport:
+        """
+        Ищет образцы, отличающиеся меньше чем на threshold (Delta E 1976), и повторяющиеся имена.
+        same_type - считать дубликатами только образцы одного типа (Spot с Process не сливаются).
+        Модель не меняется; применить результат - merge_duplicates.
+        """
+        ids, names, labs = self.get_lab_coordinates()
+        return find_duplicates(ids, names, labs, threshold, self._store.types if same_type else None)
+
+    def merge_duplicates(self, clusters: Iterable[DuplicateCluster]) -> int:
+        """
+        Удаляет дубликаты из кластеров (представители остаются) одной транзакцией.
+        Образцы, которых уже нет в модели, пропускаются. Возвращает количество удаленных.
+        """
+        doomed = {swatch_id for cluster in clusters for swatch_id in cluster.duplicates}
+        rows = array('I', (i for i, swatch_id in enumerate(self._store.ids) if swatch_id in doomed))
+        if rows:
+            self._record(DeleteCommand("Merge duplicates", rows, self._store.take(rows)))
+            self._delete_rows(rows)
+        return len(rows)
+
+    def memory_usage(self) -> int:
+        """Примерный объем памяти, занимаемый данными образцов (байты)."""
+        return self._store.nbytes()
+
+    # --- Выгрузка (см. Workspace) ---
+
+    def can_unload(self) -> bool:
+        """Можно ли выгрузить образцы без потерь: они есть в файле и не правились."""
+        return self.file_path is not None and not self._unloaded and not self.is_modified()
+
+    def is_unloaded(self) -> bool:
+        """Выгружены ли образцы (загрузить снова - read_ase_store и apply_loaded_store с file_path)."""
+        return self._unloaded
+
+    def unload(self) -> None:
+        """
+        Освобождает память библиотеки, оставляя путь к файлу: образцы, история
+        правок и индексы поиска удаляются. Подписчики получают RESET (пустой список).
+        """
+        if not self.can_unload():
+            raise ValueError("Only an unmodified library with a file can be unloaded.")
+        if self._color_index is not None:
+            self._color_index.detach(self)
+        if self._name_index is not None:
+            self._name_index.detach()
+        self._color_index = self._name_index = None
+        with self.transaction():
+            self._store = SwatchStore()
+            self._history.clear()
+            self._notify(ModelEvent.RESET)
+        self._unloaded = True
 
     # --- НОВЫЕ МЕТОДЫ, НЕОБХОДИМЫЕ КОНТРОЛЛЕРУ ---
 
@@ -127,5 +807,10 @@ class SwatchModel:
 
     def clear(self):
         """Очищает текущий список образцов и сбрасывает путь к файлу."""
-        self.swatches.clear()
-        self.file_path = None
+        with self.transaction():
+            self._store = SwatchStore()
+            self._unloaded = False
+            self._history.clear()
+            self._notify(ModelEvent.RESET)
+            self._set_file_path(None)
+            self._reset_modified(None)
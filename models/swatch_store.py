@@ -0,0 +1,347 @@
+"""
+Компактное хранилище образцов ("структура массивов").
+
+Вместо списка объектов Swatch (dataclass + Enum + объект Color + float-атрибуты,
+сотни байт на цвет) каждое поле хранится в отдельном плотном массиве:
+    names    - список строк, имена интернируются (одинаковые имена - один объект,
+               в том числе в разных библиотеках, см. Workspace)
+    types    - uint8, индекс в TYPE_CODES
+    modes    - uint8, индекс в MODE_CODES
+    channels - float32, по CHANNELS значений на образец (лишние каналы = 0)
+    ids      - int64, стабильные идентификаторы образцов
+    groups   - uint32, id группы (Color Group) образца; NO_GROUP - вне групп
+
+Названия групп хранятся в group_names (id группы -> имя). Образцы одной группы
+идут подряд; запись в ASE/JSON восстанавливает группы по смене id группы.
+
+spans - смещение и размер блока каждого образца в ASE файле, из которого
+хранилище прочитано или в который записано (по два int64 на образец). Нужны,
+чтобы сохранять правки цветов переписыванием отдельных блоков. Любая вставка,
+удаление или перестановка делает их недействительными (см. has_spans).
+
+rgb и lab - заранее посчитанные цвета для показа и поиска: 0xRRGGBB (uint32)
+и LAB в единицах пользователя (float64, по 3 на образец). Их заполняет
+compute_previews (или кэш разбора, см. parse_cache); любое изменение хранилища
+их сбрасывает, и тогда цвета считаются по значениям каналов (см. has_previews).
+
+float32 - это точность самого ASE формата, поэтому значения из файла хранятся без потерь.
+Объекты Swatch создаются только по запросу (get) и не связаны с хранилищем:
+изменения вносятся через set/insert/delete.
+"""
+from __future__ import annotations
+
+import sys
+from array import array
+from typing import Iterable, Iterator, Sequence
+
+from .common_data_classes import Swatch, SwatchType, ColorMode
+from .color_data_class import Color
+
+CHANNELS = 4
+NO_GROUP = 0
+# До скольких образцов delete_many/insert_many сдвигают массивы по одному образцу,
+# а не пересобирают их целиком (сдвиг - memmove на C, пересборка - цикл на Python)
+_DIRECT_EDIT_LIMIT = 64
+TYPE_CODES: list[SwatchType] = list(SwatchType)
+MODE_CODES: list[ColorMode] = list(ColorMode)
+_TYPE_INDEX = {t: i for i, t in enumerate(TYPE_CODES)}
+_MODE_INDEX = {m: i for i, m in enumerate(MODE_CODES)}
+_MODE_CHANNELS = [len(Color.get_class_by_mode(m).get_metadata()[0]) for m in MODE_CODES]
+_MODE_CLASSES = [Color.get_class_by_mode(m) for m in MODE_CODES]
+
+
+def _padded(values: Sequence[float]) -> list[float]:
+    if len(values) > CHANNELS:
+        raise ValueError(f"Too many color channels: {len(values)}")
+    return list(values) + [0.0] * (CHANNELS - len(values))
+
+
+class SwatchStore:
+    """Плотное хранилище образцов с доступом по индексу."""
+
+    def __init__(self):
+        self.names: list[str] = []
+        self.types = array('B')
+        self.modes = array('B')
+        self.channels = array('f')
+        self.ids = array('q')
+        self.groups = array('I')
+        self.group_names: dict[int, str] = {}
+        self.spans = array('q')
+        self.rgb = array('I')
+        self.lab = array('d')
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    # --- Чтение ---
+
+    def type_of(self, index: int) -> SwatchType:
+        return TYPE_CODES[self.types[index]]
+
+    def mode_of(self, index: int) -> ColorMode:
+        return MODE_CODES[self.modes[index]]
+
+    def values(self, index: int) -> list[float]:
+        """Нормализованные значения каналов образца (без дополнения до CHANNELS)."""
+        start = index * CHANNELS
+        return self.channels[start:start + _MODE_CHANNELS[self.modes[index]]].tolist()
+
+    def has_spans(self) -> bool:
+        """Соответствуют ли spans текущему порядку образцов."""
+        return len(self.spans) == 2 * len(self)
+
+    def has_previews(self) -> bool:
+        """Посчитаны ли rgb и lab для текущих данных образцов."""
+        return len(self.rgb) == len(self) and len(self.lab) == 3 * len(self)
+
+    def preview_hex(self, index: int) -> str:
+        """HEX цвет образца для показа: из rgb, если он посчитан, иначе через Color.to_hex."""
+        if len(self.rgb) == len(self):
+            return f"#{self.rgb[index]:06x}"
+        return self.get(index).color.to_hex()
+
+    def drop_previews(self) -> None:
+        del self.rgb[:]
+        del self.lab[:]
+
+    def add_group(self, name: str) -> int:
+        """Регистрирует группу и возвращает ее id (образцы добавляются с этим id)."""
+        group_id = len(self.group_names) + 1  # группы не удаляются из таблицы, id не повторяются
+        self.group_names[group_id] = sys.intern(name)
+        return group_id
+
+    def get(self, index: int) -> Swatch:
+        """Создает объект Swatch для образца. Объект - копия, а не ссылка на данные."""
+        if index < 0:
+            index += len(self)
+        mode_code = self.modes[index]
+        color = _MODE_CLASSES[mode_code](*self.values(index), is_normalized=True)
+        return Swatch(name=self.names[index], type=TYPE_CODES[self.types[index]],
+                      mode=MODE_CODES[mode_code], color=color)
+
+    # --- Изменение ---
+
+    def append_raw(self, name: str, swatch_type: SwatchType, mode: ColorMode,
+                   values: Sequence[float], swatch_id: int, group: int = NO_GROUP) -> None:
+        """Добавляет образец из "сырых" значений, без создания объектов Swatch/Color."""
+        self.names.append(sys.intern(name))
+        self.types.append(_TYPE_INDEX[swatch_type])
+        self.modes.append(_MODE_INDEX[mode])
+        self.channels.extend(_padded(values))
+        self.ids.append(swatch_id)
+        self.groups.append(group)
+
+    def append(self, swatch: Swatch, swatch_id: int, group: int = NO_GROUP) -> None:
+        self.append_raw(swatch.name, swatch.type, swatch.mode, swatch.color.to_normalized(), swatch_id, group)
+
+    def insert(self, index: int, swatch: Swatch, swatch_id: int, group: int = NO_GROUP) -> None:
+        del self.spans[:]
+        self.drop_previews()
+        self.names.insert(index, sys.intern(swatch.name))
+        self.types.insert(index, _TYPE_INDEX[swatch.type])
+        self.modes.insert(index, _MODE_INDEX[swatch.mode])
+        start = index * CHANNELS
+        self.channels[start:start] = array('f', _padded(swatch.color.to_normalized()))
+        self.ids.insert(index, swatch_id)
+        self.groups.insert(index, group)
+
+    def set(self, index: int, swatch: Swatch) -> None:
+        """Записывает данные образца по индексу (id сохраняется)."""
+        self.names[index] = sys.intern(swatch.name)
+        self.types[index] = _TYPE_INDEX[swatch.type]
+        self.set_color(index, swatch.mode, swatch.color.to_normalized())
+
+    def set_color(self, index: int, mode: ColorMode, values: Sequence[float]) -> None:
+        self.drop_previews()
+        self.modes[index] = _MODE_INDEX[mode]
+        start = index * CHANNELS
+        self.channels[start:start + CHANNELS] = array('f', _padded(values))
+
+    def delete(self, index: int) -> int:
+        """Удаляет образец и возвращает его id."""
+        swatch_id = self.ids[index]
+        del self.spans[:]
+        self.drop_previews()
+        del self.names[index]
+        del self.types[index]
+        del self.modes[index]
+        del self.channels[index * CHANNELS:(index + 1) * CHANNELS]
+        del self.ids[index]
+        del self.groups[index]
+        return swatch_id
+
+    def delete_many(self, indices: Iterable[int]) -> list[int]:
+        """
+        Удаляет несколько образцов за один проход по массивам (а не сдвигом
+        хвоста на каждое удаление). Возвращает id удаленных образцов.
+        """
+        doomed = set(indices)
+        if not doomed:
+            return []
+        removed = [self.ids[i] for i in sorted(doomed)]
+        del self.spans[:]
+        self.drop_previews()
+        if len(doomed) <= _DIRECT_EDIT_LIMIT:
+            for i in sorted(doomed, reverse=True):
+                self.delete(i)
+            return removed
+        keep = [i for i in range(len(self)) if i not in doomed]
+        # Массивы меняются на месте: View держит ссылку на ids (см. SwatchModel.get_swatch_ids)
+        channels = array('f')
+        for i in keep:
+            channels.extend(self.channels[i * CHANNELS:(i + 1) * CHANNELS])
+        self.names[:] = [self.names[i] for i in keep]
+        self.types[:] = array('B', (self.types[i] for i in keep))
+        self.modes[:] = array('B', (self.modes[i] for i in keep))
+        self.ids[:] = array('q', (self.ids[i] for i in keep))
+        self.groups[:] = array('I', (self.groups[i] for i in keep))
+        self.channels[:] = channels
+        return removed
+
+    def take(self, indices: Sequence[int]) -> SwatchStore:
+        """Копия образцов по индексам (вместе с id и группами), например для истории правок."""
+        rows = SwatchStore()
+        rows.group_names = self.group_names
+        if isinstance(indices, range) and indices.step == 1:
+            start, stop = indices.start, indices.stop
+            rows.names = self.names[start:stop]
+            rows.types = self.types[start:stop]
+            rows.modes = self.modes[start:stop]
+            rows.channels = self.channels[start * CHANNELS:stop * CHANNELS]
+            rows.ids = self.ids[start:stop]
+            rows.groups = self.groups[start:stop]
+            return rows
+        rows.names = [self.names[i] for i in indices]
+        rows.types = array('B', (self.types[i] for i in indices))
+        rows.modes = array('B', (self.modes[i] for i in indices))
+        for i in indices:
+            rows.channels.extend(self.channels[i * CHANNELS:(i + 1) * CHANNELS])
+        rows.ids = array('q', (self.ids[i] for i in indices))
+        rows.groups = array('I', (self.groups[i] for i in indices))
+        return rows
+
+    def put(self, indices: Sequence[int], rows: SwatchStore) -> None:
+        """Записывает данные образцов rows (см. take) по индексам. id и группы не меняются."""
+        self.drop_previews()
+        if isinstance(indices, range) and indices.step == 1:
+            start, stop = indices.start, indices.stop
+            self.names[start:stop] = rows.names
+            self.types[start:stop] = rows.types
+            self.modes[start:stop] = rows.modes
+            self.channels[start * CHANNELS:stop * CHANNELS] = rows.channels
+            return
+        for k, i in enumerate(indices):
+            self.names[i] = rows.names[k]
+            self.types[i] = rows.types[k]
+            self.modes[i] = rows.modes[k]
+            self.channels[i * CHANNELS:(i + 1) * CHANNELS] = rows.channels[k * CHANNELS:(k + 1) * CHANNELS]
+
+    def insert_many(self, indices: Sequence[int], rows: SwatchStore) -> None:
+        """
+        Вставляет образцы rows (см. take) так, чтобы они оказались по индексам
+        indices (по возрастанию, в итоговом списке). Обратная операция к delete_many.
+        """
+        if not indices:
+            return
+        del self.spans[:]
+        self.drop_previews()
+        if len(indices) <= _DIRECT_EDIT_LIMIT:
+            for k, i in enumerate(indices):
+                self.names.insert(i, rows.names[k])
+                self.types.insert(i, rows.types[k])
+                self.modes.insert(i, rows.modes[k])
+                self.channels[i * CHANNELS:i * CHANNELS] = rows.channels[k * CHANNELS:(k + 1) * CHANNELS]
+                self.ids.insert(i, rows.ids[k])
+                self.groups.insert(i, rows.groups[k])
+            return
+        total = len(self) + len(indices)
+        sources: list[tuple[SwatchStore, int]] = []
+        k = src = 0
+        for position in range(total):
+            if k < len(indices) and indices[k] == position:
+                sources.append((rows, k))
+                k += 1
+            else:
+                sources.append((self, src))
+                src += 1
+        channels = array('f')
+        for store, i in sources:
+            channels.extend(store.channels[i * CHANNELS:(i + 1) * CHANNELS])
+        # Массивы меняются на месте, как и в delete_many
+        self.names[:] = [store.names[i] for store, i in sources]
+        self.types[:] = array('B', (store.types[i] for store, i in sources))
+        self.modes[:] = array('B', (store.modes[i] for store, i in sources))
+        self.ids[:] = array('q', (store.ids[i] for store, i in sources))
+        self.groups[:] = array('I', (store.groups[i] for store, i in sources))
+        self.channels[:] = channels
+
+    def move(self, old_index: int, new_index: int) -> None:
+        swatch, swatch_id, group = self.get(old_index), self.ids[old_index], self.groups[old_index]
+        self.delete(old_index)
+        self.insert(new_index, swatch, swatch_id, group)
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def nbytes(self) -> int:
+        """
+        Примерный объем данных хранилища в байтах. После сжатия массивов больше
+        всего на образец занимают имена, поэтому считаются и сами строки, и ссылки
+        на них в списке. Повторяющиеся имена и имена, общие с другими библиотеками
+        (они интернируются), считаются в каждом месте: оценка лучше завышена, чем
+        занижена (см. Workspace.enforce_budget), а отбор различных строк вдвое дороже.
+        """
+        arrays = (self.types, self.modes, self.channels, self.ids, self.groups, self.spans, self.rgb, self.lab)
+        strings = sum(map(sys.getsizeof, self.names)) + sum(map(sys.getsizeof, self.group_names.values()))
+        return sum(a.itemsize * len(a) for a in arrays) + 8 * len(self.names) + strings
+
+
+class SwatchListView(Sequence[Swatch]):
+    """
+    Неизменяемое представление хранилища в виде последовательности Swatch.
+    Объекты создаются при обращении, поэтому View может держать ссылку
+    на весь список, не увеличивая расход памяти.
+    """
+
+    def __init__(self, store: SwatchStore):
+        self._store = store
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._store.get(i) for i in range(*index.indices(len(self._store)))]
+        if not -len(self._store) <= index < len(self._store):
+            raise IndexError("swatch index out of range")
+        return self._store.get(index)
+
+    def __iter__(self) -> Iterator[Swatch]:
+        return (self._store.get(i) for i in range(len(self._store)))
+
+
+class PreviewColorsView(Sequence[str]):
+    """HEX цвета образцов хранилища для показа (см. SwatchStore.preview_hex), по индексу."""
+
+    def __init__(self, store: SwatchStore):
+        self._store = store
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._store.preview_hex(i) for i in range(*index.indices(len(self._store)))]
+        if not -len(self._store) <= index < len(self._store):
+            raise IndexError("swatch index out of range")
+        return self._store.preview_hex(index % len(self._store))
+
+
+def build_store(items: Iterable[tuple[str, SwatchType, ColorMode, Sequence[float]]],
+                ids: Iterator[int]) -> SwatchStore:
+    """Собирает хранилище из потока кортежей (имя, тип, режим, значения)."""
+    store = SwatchStore()
+    for (name, swatch_type, mode, values), swatch_id in zip(items, ids):
+        store.append_raw(name, swatch_type, mode, values, swatch_id)
+    return store
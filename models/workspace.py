@@ -0,0 +1,151 @@
+"""
+Рабочее пространство: несколько открытых библиотек (SwatchModel) одновременно.
+
+Активна одна библиотека - ее показывает View и правит контроллер. Остальные
+остаются в памяти, пока общий объем их данных не превышает memory_budget;
+при превышении неактивные библиотеки, которые можно прочитать заново (есть
+файл, нет несохраненных правок), выгружаются (SwatchModel.unload), начиная
+с тех, что дольше всего не были активными. Выгруженная библиотека помнит
+только путь к файлу и загружается снова, когда на нее переключаются; с кэшем
+разбора (см. parse_cache) это занимает доли секунды.
+
+Имена образцов и групп интернируются (sys.intern), поэтому одинаковые имена
+в разных библиотеках хранятся одним объектом. Цвета в SwatchStore лежат в
+плотных массивах, без объектов на образец, так что разделять между
+библиотеками здесь нечего.
+"""
+from __future__ import annotations
+
+import itertools
+import os
+from typing import Iterator
+
+from .swatch_model import SwatchModel
+from .parse_cache import ParseCache
+
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024
+
+
+def _same_path(a: str | None, b: str | None) -> bool:
+    if a is None or b is None:
+        return False
+    return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+class Workspace:
+    """
+    Список открытых библиотек и активная библиотека. В пространстве всегда
+    есть хотя бы одна библиотека (возможно, пустая и без файла).
+
+        workspace = Workspace(memory_budget=256 << 20, parse_cache=ParseCache())
+        model = workspace.add_library()
+        workspace.activate(workspace.index_of(model))
+    """
+
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET, parse_cache: ParseCache | None = None):
+        self.memory_budget = memory_budget
+        self.parse_cache = parse_cache
+        self._libraries: list[SwatchModel] = []
+        self._active = 0
+        # Момент последней активации библиотеки - для выбора, кого выгружать первым
+        self._clock = itertools.count()
+        self._last_used: dict[SwatchModel, int] = {}
+        self.add_library()
+
+    def __len__(self) -> int:
+        return len(self._libraries)
+
+    def __iter__(self) -> Iterator[SwatchModel]:
+        return iter(self._libraries)
+
+    def __getitem__(self, index: int) -> SwatchModel:
+        return self._libraries[index]
+
+    @property
+    def active(self) -> SwatchModel:
+        return self._libraries[self._active]
+
+    @property
+    def active_index(self) -> int:
+        return self._active
+
+    def index_of(self, model: SwatchModel) -> int:
+        return next(i for i, library in enumerate(self._libraries) if library is model)
+
+    def find_by_path(self, path: str) -> int | None:
+        """Индекс библиотеки, открытой из файла path, или None."""
+        for i, library in enumerate(self._libraries):
+            if _same_path(library.get_file_path(), path):
+                return i
+        return None
+
+    def title(self, index: int) -> str:
+        """Короткое название библиотеки для вкладки: имя файла или Untitled."""
+        path = self._libraries[index].get_file_path()
+        return os.path.basename(path) if path else "Untitled"
+
+    # --- Изменение списка ---
+
+    def add_library(self) -> SwatchModel:
+        """Добавляет пустую библиотеку в конец списка (активной она не становится)."""
+        model = SwatchModel()
+        model.parse_cache = self.parse_cache
+        self._libraries.append(model)
+        self._last_used[model] = next(self._clock)
+        return model
+
+    def remove_library(self, index: int) -> SwatchModel:
+        """
+        Убирает библиотеку из пространства и возвращает ее. Несохраненные правки
+        не проверяются - это дело вызывающего. Если библиотека была активной,
+        активной становится соседняя; последняя библиотека заменяется пустой.
+        """
+        model = self._libraries.pop(index)
+        del self._last_used[model]
+        if not self._libraries:
+            self.add_library()
+        if index < self._active or self._active >= len(self._libraries):
+            self._active -= 1
+        self._active = max(self._active, 0)
+        self._last_used[self.active] = next(self._clock)
+        return model
+
+    def activate(self, index: int) -> SwatchModel:
+        """
+        Делает библиотеку активной и выгружает неактивные сверх memory_budget.
+        Если активная библиотека выгружена, ее нужно загрузить заново
+        (SwatchModel.is_unloaded) - это делает вызывающий, обычно в фоне.
+        """
+        if not 0 <= index < len(self._libraries):
+            raise IndexError("library index out of range")
+        self._active = index
+        self._last_used[self.active] = next(self._clock)
+        self.enforce_budget()
+        return self.active
+
+    # --- Память ---
+
+    def memory_usage(self) -> int:
+        """Примерный объем данных всех библиотек в памяти (байты)."""
+        return sum(library.memory_usage() for library in self._libraries)
+
+    def enforce_budget(self) -> list[SwatchModel]:
+        """
+        Выгружает неактивные библиотеки, начиная с давно не использованных, пока
+        объем данных больше memory_budget. Библиотеки с несохраненными правками
+        и без файла не выгружаются. Возвращает выгруженные библиотеки.
+        """
+        usage = self.memory_usage()
+        if usage <= self.memory_budget:
+            return []
+        candidates = sorted((library for library in self._libraries
+                             if library is not self.active and library.can_unload()),
+                            key=self._last_used.__getitem__)
+        unloaded = []
+        for library in candidates:
+            if usage <= self.memory_budget:
+                break
+            usage -= library.memory_usage()
+            library.unload()
+            unloaded.append(library)
+        return unloaded
@@ -0,0 +1,125 @@
+"""
+Быстрый путь для показа (color_formulas, Color.preview_rgb / preview_lab)
+против точной конвертации через colormath: расхождение не больше
+CONVERSION_TOLERANCE во всех режимах, в том числе для LAB вне охвата sRGB
+и для CMYK с K = 1.
+
+    python -m unittest discover tests
+"""
+import random
+import unittest
+
+from colormath.color_conversions import convert_color
+from colormath.color_objects import CMYKColor, LabColor, sRGBColor
+
+from models import ColorMode, conversion_cache
+from models import color_formulas
+from models.color_data_class import Color, ColorCMYK, ColorLAB, ColorRGB
+from models.color_engine import CONVERSION_TOLERANCE
+
+COUNT = 500
+
+# LAB далеко за пределами sRGB: каналы RGB уходят ниже 0 и выше 1
+OUT_OF_GAMUT_LAB = [(50.0, 127.0, -128.0), (100.0, -128.0, 127.0), (0.0, 100.0, 100.0),
+                    (95.0, -80.0, 90.0), (30.0, -128.0, -128.0), (100.0, 127.0, 127.0)]
+
+
+def random_colors(mode: ColorMode, seed: int = 0) -> list[Color]:
+    rnd = random.Random(seed)
+    if mode is ColorMode.LAB:
+        colors = [ColorLAB(rnd.random(), rnd.uniform(-128, 127), rnd.uniform(-128, 127), is_normalized=True)
+                  for _ in range(COUNT)]
+        return colors + [ColorLAB(l / 100, a, b, is_normalized=True) for l, a, b in OUT_OF_GAMUT_LAB]
+    if mode is ColorMode.CMYK:
+        colors = [ColorCMYK(*(rnd.random() for _ in range(4)), is_normalized=True) for _ in range(COUNT)]
+        return colors + [ColorCMYK(rnd.random(), rnd.random(), rnd.random(), 1.0, is_normalized=True)
+                         for _ in range(10)]
+    return [ColorRGB(*(rnd.random() for _ in range(3)), is_normalized=True) for _ in range(COUNT)]
+
+
+class FormulasTest(unittest.TestCase):
+    """Функции color_formulas против convert_color из colormath."""
+
+    def assertClose(self, got, expected, msg=None):
+        self.assertEqual(len(got), len(expected), msg)
+        for g, e in zip(got, expected):
+            self.assertAlmostEqual(g, e, delta=CONVERSION_TOLERANCE, msg=msg)
+
+    def test_lab_to_srgb(self):
+        rnd = random.Random(1)
+        values = [(rnd.uniform(0, 100), rnd.uniform(-128, 127), rnd.uniform(-128, 127)) for _ in range(COUNT)]
+        for lab in values + OUT_OF_GAMUT_LAB:
+            rgb = convert_color(LabColor(*lab), sRGBColor)
+            self.assertClose(color_formulas.lab_to_srgb(*lab), rgb.get_value_tuple(), lab)
+
+    def test_lab_to_srgb_is_not_clamped_from_above(self):
+        r, g, b = color_formulas.lab_to_srgb(100.0, 127.0, 127.0)
+        self.assertGreater(max(r, g, b), 1.0)
+
+    def test_srgb_to_lab(self):
+        rnd = random.Random(2)
+        for rgb in [tuple(rnd.random() for _ in range(3)) for _ in range(COUNT)] + [(0, 0, 0), (1, 1, 1)]:
+            lab = convert_color(sRGBColor(*rgb), LabColor)
+            self.assertClose(color_formulas.srgb_to_lab(*rgb), lab.get_value_tuple(), rgb)
+
+    def test_cmyk_to_srgb(self):
+        rnd = random.Random(3)
+        values = [tuple(rnd.random() for _ in range(4)) for _ in range(COUNT)]
+        for cmyk in values + [(0, 0, 0, 0), (1, 1, 1, 1)]:
+            rgb = convert_color(CMYKColor(*cmyk), sRGBColor)
+            self.assertClose(color_formulas.cmyk_to_srgb(*cmyk), rgb.get_value_tuple(), cmyk)
+
+    def test_cmyk_full_black(self):
+        rnd = random.Random(4)
+        for _ in range(20):
+            cmy = (rnd.random(), rnd.random(), rnd.random())
+            self.assertClose(color_formulas.cmyk_to_srgb(*cmy, 1.0), (0.0, 0.0, 0.0), cmy)
+            self.assertClose(color_formulas.srgb_to_lab(*color_formulas.cmyk_to_srgb(*cmy, 1.0)),
+                             (0.0, 0.0, 0.0), cmy)
+
+    def test_clamp_rgb(self):
+        self.assertEqual(color_formulas.clamp_rgb(-0.5, 0.25, 1.5), (0.0, 0.25, 1.0))
+
+
+class PreviewTest(unittest.TestCase):
+    """Color.preview_rgb / preview_lab против Color.convert_to."""
+
+    def setUp(self):
+        conversion_cache.clear()
+
+    def check(self, mode: ColorMode):
+        for color in random_colors(mode):
+            with self.subTest(mode=mode.value, values=color.to_normalized()):
+                rgb = color.convert_to(ColorMode.RGB).to_normalized()
+                for got, expected in zip(color.preview_rgb(), rgb):
+                    self.assertAlmostEqual(got, expected, delta=CONVERSION_TOLERANCE)
+                    self.assertTrue(0.0 <= got <= 1.0)
+                # В convert_to L нормализован (0-1), preview_lab - в единицах пользователя
+                l, a, b = color.convert_to(ColorMode.LAB).to_normalized()
+                for got, expected in zip(color.preview_lab(), (l * 100, a, b)):
+                    self.assertAlmostEqual(got, expected, delta=CONVERSION_TOLERANCE)
+
+    def test_rgb(self):
+        self.check(ColorMode.RGB)
+
+    def test_lab(self):
+        self.check(ColorMode.LAB)
+
+    def test_cmyk(self):
+        self.check(ColorMode.CMYK)
+
+    def test_out_of_gamut_lab_is_clamped(self):
+        for l, a, b in OUT_OF_GAMUT_LAB:
+            color = ColorLAB(l / 100, a, b, is_normalized=True)
+            unclamped = color_formulas.lab_to_srgb(l, a, b)
+            self.assertEqual(color.preview_rgb(), color_formulas.clamp_rgb(*unclamped))
+            self.assertEqual(color.to_hex(), ColorRGB(*color.preview_rgb(), is_normalized=True).to_hex())
+
+    def test_cmyk_full_black(self):
+        color = ColorCMYK(0.2, 0.6, 0.9, 1.0, is_normalized=True)
+        self.assertEqual(color.to_hex(), "#000000")
+        self.assertEqual(color.convert_to(ColorMode.RGB).to_normalized(), [0.0, 0.0, 0.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
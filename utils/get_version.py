@@ -1,9 +1,22 @@
+import functools
 import os
 import sys
 import tomllib
 
 
+@functools.cache
 def get_version_from_pyproject(filename="pyproject.toml") -> str:
+    """
+    Возвращает версию приложения. Вычисляется один раз за запуск.
+    В сборке PyInstaller версия вшита в модуль utils._build_version (его создает YASE.spec),
+    поэтому pyproject.toml читать не нужно.
+    """
+    try:
+        from ._build_version import VERSION
+        return VERSION
+    except ImportError:
+        pass
+
     if hasattr(sys, "_MEIPASS"):
         # Работаем в PyInstaller-сборке
         path = os.path.join(sys._MEIPASS, filename)
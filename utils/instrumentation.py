@@ -0,0 +1,274 @@
+"""
+Встроенные замеры горячих участков (режим профилирования).
+
+Включается флагом --profile (или --profile=cprofile) либо переменной окружения
+YASE_PROFILE=1 (или YASE_PROFILE=cprofile). В выключенном состоянии замеры
+стоят одну проверку флага на вызов.
+
+Участки размечаются декоратором instrumented("model.load") или блоком
+with instrumentation.section(...). Для каждого участка копятся число вызовов,
+суммарное и наибольшее время, а для внешних участков (не вложенных в другие
+в том же потоке) - пик памяти по tracemalloc. Пик общий для всех потоков,
+поэтому при одновременной работе фоновой операции и GUI он приблизительный.
+
+Режим cprofile дополнительно запускает cProfile в главном потоке и в потоках
+фоновых операций (см. profile_thread); при сохранении статистика объединяется.
+При выходе из программы отчет сохраняется в каталог YASE_PROFILE_DIR (по
+умолчанию текущий): yase-profile-<время>.json и, в режиме cprofile, .prof
+(смотреть: python -m pstats файл.prof или snakeviz).
+"""
+from __future__ import annotations
+
+import atexit
+import datetime
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Iterator, Sequence, TypeVar
+
+if TYPE_CHECKING:
+    import cProfile
+
+PROFILE_FLAG = "--profile"
+PROFILE_ENV = "YASE_PROFILE"
+PROFILE_DIR_ENV = "YASE_PROFILE_DIR"
+# Режимы: stats - замеры участков и памяти, cprofile - то же и cProfile
+PROFILE_MODES = ("stats", "cprofile")
+
+F = TypeVar("F", bound=Callable)
+
+
+def is_profile_flag(arg: str) -> bool:
+    return arg == PROFILE_FLAG or arg.startswith(PROFILE_FLAG + "=")
+
+
+def profile_mode(argv: Sequence[str], environ=os.environ) -> str | None:
+    """
+    Режим профилирования из аргументов командной строки или окружения, None - выключено.
+    Флаг важнее переменной; неизвестный режим выбрасывает ValueError.
+    """
+    value = None
+    for arg in argv:
+        if is_profile_flag(arg):
+            value = arg.partition("=")[2] or "stats"
+    if value is None:
+        value = environ.get(PROFILE_ENV, "").strip().lower()
+        if value in ("", "0", "no", "off", "false"):
+            return None
+        if value in ("1", "yes", "on", "true"):
+            value = "stats"
+    if value not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{value}', expected one of {', '.join(PROFILE_MODES)}.")
+    return value
+
+
+@dataclass(slots=True)
+class SectionStats:
+    calls: int = 0
+    total: float = 0.0      # секунды
+    max: float = 0.0        # секунды, самый долгий вызов
+    peak_bytes: int = 0     # наибольший прирост пика tracemalloc за вызов (только внешние вызовы)
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.calls * 1000 if self.calls else 0.0,
+            "max_ms": self.max * 1000,
+            "peak_bytes": self.peak_bytes,
+        }
+
+
+class Instrumentation:
+    """Счетчики участков одного процесса. Используйте общий экземпляр instrumentation."""
+
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self._stats: dict[str, SectionStats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()  # глубина вложенности участков в потоке
+        self._profiler: cProfile.Profile | None = None
+        self._thread_profiles: list[cProfile.Profile] = []
+        self._started = time.time()
+        # Пик памяти процесса: участки сбрасывают пик tracemalloc, поэтому он копится здесь
+        self._memory_peak = 0
+
+    def enable(self, memory: bool = True, cprofile: bool = False, dump_dir: str | None = None) -> None:
+        """
+        Включает замеры. memory - следить за памятью через tracemalloc (замедляет
+        выделение памяти в несколько раз); cprofile - запустить cProfile в текущем
+        потоке; dump_dir - сохранить отчет в этот каталог при выходе (см. dump).
+        """
+        self.enabled = True
+        self.memory = memory
+        self._started = time.time()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if cprofile and self._profiler is None:
+            import cProfile  # только в режиме cprofile, чтобы не замедлять обычный запуск
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        if dump_dir is not None:
+            atexit.register(self.dump, dump_dir)
+
+    def is_cprofile_enabled(self) -> bool:
+        return self._profiler is not None
+
+    # --- Замеры ---
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        """Замер участка name (если замеры включены)."""
+        if not self.enabled:
+            yield
+            return
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        local.depth = depth + 1
+        track_memory = self.memory and depth == 0 and tracemalloc.is_tracing()
+        if track_memory:
+            self._memory_peak = max(self._memory_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] - base if track_memory else 0
+            local.depth = depth
+            with self._lock:
+                stats = self._stats.get(name)
+                if stats is None:
+                    stats = self._stats[name] = SectionStats()
+                stats.calls += 1
+                stats.total += elapsed
+                stats.max = max(stats.max, elapsed)
+                stats.peak_bytes = max(stats.peak_bytes, peak)
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Считает события без замера времени."""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = SectionStats()
+            stats.calls += n
+
+    @contextmanager
+    def profile_thread(self) -> Iterator[None]:
+        """
+        Включает cProfile в текущем (фоновом) потоке, если выбран режим cprofile.
+        С Python 3.12 профилировщик общий для всех потоков (sys.monitoring) и
+        второй не запускается - тогда поток уже учтен основным профилировщиком.
+        """
+        if self._profiler is None:
+            yield
+            return
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # "Another profiling tool is already active"
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._thread_profiles.append(profiler)
+
+    # --- Отчеты ---
+
+    def snapshot(self) -> dict:
+        """Все счетчики и текущая память в виде словаря (формат JSON отчета)."""
+        with self._lock:
+            sections = {name: stats.to_dict() for name, stats in sorted(self._stats.items())}
+        report = {
+            "started": datetime.datetime.fromtimestamp(self._started).isoformat(timespec="seconds"),
+            "elapsed_s": time.time() - self._started,
+            "sections": sections,
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            report["memory"] = {"current_bytes": current, "peak_bytes": max(peak, self._memory_peak)}
+        return report
+
+    def report(self) -> str:
+        """Текстовая таблица участков, самые затратные - первыми."""
+        sections = self.snapshot()["sections"]
+        lines = [f"{'section':<28}{'calls':>9}{'total ms':>12}{'mean ms':>10}{'max ms':>10}{'peak MB':>9}"]
+        for name, data in sorted(sections.items(), key=lambda item: -item[1]["total_ms"]):
+            lines.append(f"{name:<28}{data['calls']:>9}{data['total_ms']:>12.1f}{data['mean_ms']:>10.3f}"
+                         f"{data['max_ms']:>10.1f}{data['peak_bytes'] / 2 ** 20:>9.1f}")
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        """Обнуляет счетчики (cProfile продолжает копить статистику)."""
+        with self._lock:
+            self._stats.clear()
+        self._started = time.time()
+        self._memory_peak = 0
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    def dump_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def dump_cprofile(self, path: str) -> None:
+        """Сохраняет объединенную статистику cProfile всех потоков (формат pstats)."""
+        if self._profiler is None:
+            raise ValueError("cProfile is not enabled (use --profile=cprofile).")
+        import pstats
+        with self._lock:
+            profiles = list(self._thread_profiles)
+        stats = pstats.Stats(self._profiler)
+        for profile in profiles:
+            stats.add(profile)
+        stats.dump_stats(path)
+
+    def dump(self, directory: str) -> list[str]:
+        """Сохраняет JSON отчет (и .prof в режиме cprofile) в directory. Возвращает пути файлов."""
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(directory, f"yase-profile-{stamp}")
+        paths = [base + ".json"]
+        os.makedirs(directory, exist_ok=True)
+        if self._profiler is not None:
+            self._profiler.disable()
+            self.dump_cprofile(base + ".prof")
+            paths.append(base + ".prof")
+        self.dump_json(paths[0])
+        if sys.stderr is not None:
+            print(self.report(), file=sys.stderr)
+            print("Profile saved to " + ", ".join(paths), file=sys.stderr)
+        return paths
+
+
+def default_dump_dir() -> str:
+    return os.environ.get(PROFILE_DIR_ENV) or os.getcwd()
+
+
+instrumentation = Instrumentation()
+
+
+def instrumented(name: str) -> Callable[[F], F]:
+    """Декоратор: замер каждого вызова функции как участка name."""
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled:
+                return func(*args, **kwargs)
+            with instrumentation.section(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
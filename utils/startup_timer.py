@@ -0,0 +1,42 @@
+import os
+import sys
+import time
+
+
+class StartupTimer:
+    """
+    Замер времени запуска по этапам (режим --startup-time).
+    Отсчет идет от момента, переданного в start (как можно раньше в main.py).
+    """
+
+    def __init__(self, start: float, enabled: bool = False):
+        self.enabled = enabled
+        self._start = start
+        self._marks: list[tuple[str, float]] = []
+
+    def mark(self, stage: str) -> None:
+        """Запоминает время окончания этапа."""
+        if self.enabled:
+            self._marks.append((stage, time.perf_counter()))
+
+    def report(self) -> str:
+        lines = ["Startup time:"]
+        previous = self._start
+        for stage, moment in self._marks:
+            lines.append(f"  {stage:<20} +{(moment - previous) * 1000:7.1f} ms  = {(moment - self._start) * 1000:7.1f} ms")
+            previous = moment
+        if getattr(sys, 'frozen', False):
+            lines.append("  (onefile build: time spent unpacking before Python starts is not included)")
+        return "\n".join(lines)
+
+    def write_report(self, log_dir: str) -> None:
+        """
+        Печатает отчет в stderr. В оконной сборке stderr нет,
+        поэтому отчет пишется в startup_time.log рядом с программой.
+        """
+        text = self.report()
+        if sys.stderr is not None:
+            print(text, file=sys.stderr)
+        else:
+            with open(os.path.join(log_dir, "startup_time.log"), "a", encoding="utf-8") as f:
+                f.write(text + "\n")
@@ -0,0 +1,91 @@
+"""
+Расчет сетки образцов без привязки к Tkinter.
+
+Все координаты - в системе координат содержимого холста (с учетом прокрутки),
+поэтому расчеты можно выполнять и проверять без окна.
+"""
+from __future__ import annotations
+
+
+class GridLayout:
+    """Геометрия сетки: ячейки одинакового размера, строки сверху вниз."""
+
+    def __init__(self, padding_x: int, padding_y: int, swatch_size: int, text_gap: int, text_width: int):
+        self.padding_x = padding_x
+        self.padding_y = padding_y
+        self.swatch_size = swatch_size
+        self.text_gap = text_gap
+        self.text_width = text_width
+
+    @property
+    def spacing_x(self) -> int:
+        return self.swatch_size + self.text_gap + self.text_width
+
+    @property
+    def spacing_y(self) -> int:
+        return self.swatch_size + self.padding_y
+
+    def columns(self, width: int) -> int:
+        """Количество колонок, помещающихся в ширину холста."""
+        return max(1, width // self.spacing_x)
+
+    def row_count(self, count: int, cols: int) -> int:
+        return (count + cols - 1) // cols
+
+    def content_height(self, count: int, cols: int) -> int:
+        """Полная высота содержимого (для scrollregion)."""
+        return self.padding_y + self.row_count(count, cols) * self.spacing_y
+
+    def cell_origin(self, index: int, cols: int) -> tuple[int, int]:
+        """Левый верхний угол квадрата образца с данным индексом."""
+        row, col = divmod(index, cols)
+        return self.padding_x + col * self.spacing_x, self.padding_y + row * self.spacing_y
+
+    def visible_range(self, top: float, height: int, count: int, cols: int, overscan: int = 2) -> range:
+        """
+        Индексы образцов в строках, попадающих в окно [top, top + height),
+        плюс overscan строк сверху и снизу.
+        """
+        first_row = max(0, int((top - self.padding_y) // self.spacing_y) - overscan)
+        last_row = int((top + height - self.padding_y) // self.spacing_y) + overscan
+        return range(min(count, first_row * cols), min(count, (last_row + 1) * cols))
+
+    def index_at(self, x: float, y: float, count: int, cols: int) -> int | None:
+        """Индекс образца под точкой (x, y) или None, если точка не на квадрате образца."""
+        if x < self.padding_x or y < self.padding_y:
+            return None
+        col = int((x - self.padding_x) // self.spacing_x)
+        row = int((y - self.padding_y) // self.spacing_y)
+        if col >= cols:
+            return None
+        idx = row * cols + col
+        if 0 <= idx < count:
+            # Проверяем, что клик был в пределах высоты квадрата
+            relative_y = (y - self.padding_y) % self.spacing_y
+            if relative_y < self.swatch_size:
+                return idx
+        return None
+
+    def indices_in_rect(self, x0: float, y0: float, x1: float, y1: float, count: int, cols: int) -> list[int]:
+        """
+        Индексы образцов, ячейки которых (квадрат и подпись) пересекают прямоугольник
+        с углами (x0, y0) и (x1, y1) - для выделения рамкой.
+        """
+        left, right = sorted((x0, x1))
+        top, bottom = sorted((y0, y1))
+        cell_width = self.swatch_size + self.text_gap + self.text_width
+        first_row = max(0, int((top - self.padding_y) // self.spacing_y))
+        last_row = int((bottom - self.padding_y) // self.spacing_y)
+        first_col = max(0, int((left - self.padding_x) // self.spacing_x))
+        last_col = min(cols - 1, int((right - self.padding_x) // self.spacing_x))
+        result = []
+        for row in range(first_row, last_row + 1):
+            cell_top = self.padding_y + row * self.spacing_y
+            if cell_top + self.swatch_size < top:
+                continue  # прямоугольник начинается в промежутке под строкой
+            for col in range(first_col, last_col + 1):
+                cell_left = self.padding_x + col * self.spacing_x
+                index = row * cols + col
+                if index < count and cell_left + cell_width >= left:
+                    result.append(index)
+        return result
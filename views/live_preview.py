@@ -0,0 +1,100 @@
+"""
+Живой предпросмотр цвета в окне правки: планировщик перерисовки и полосы-градиенты.
+
+Ползунок Tk вызывает команду на каждое движение мыши, а синхронизация
+ползунка и поля ввода добавляет еще вызовы. Вместо пересчета на каждый
+вызов запросы схлопываются: перерисовка выполняется один раз, когда Tk
+обработает накопившиеся события (after_idle), и не чаще раза в кадр. Если
+сама перерисовка дольше кадра (медленная машина), следующая откладывается
+на столько же, чтобы не меньше половины времени оставалось на ввод.
+
+GradientStrip - полоса под ползунком канала с цветами, которые получатся при
+движении ползунка; сами цвета считает color_engine.channel_gradients.
+"""
+from __future__ import annotations
+
+import time
+import tkinter as tk
+from typing import Callable
+
+
+class PreviewScheduler:
+    """
+    scheduler = PreviewScheduler(window, redraw)
+    scheduler.request()   # сколько угодно раз; redraw выполнится один раз
+    """
+
+    # Длительность кадра (~60 кадров в секунду)
+    FRAME_MS = 16
+
+    def __init__(self, widget: tk.Misc, callback: Callable[[], None], frame_ms: int = FRAME_MS):
+        self._widget = widget
+        self._callback = callback
+        self.frame_ms = frame_ms
+        self._pending: str | None = None
+        self._last_end = 0.0    # perf_counter окончания прошлой перерисовки
+        self._last_cost = 0.0   # ее длительность, секунды
+
+    def request(self) -> None:
+        """Просит перерисовать предпросмотр; повторные запросы до перерисовки ничего не добавляют."""
+        if self._pending is not None:
+            return
+        since_last = time.perf_counter() - self._last_end
+        wait = max(self.frame_ms / 1000 - since_last, self._last_cost - since_last)
+        if wait > 0:
+            self._pending = self._widget.after(max(1, round(wait * 1000)), self._run)
+        else:
+            self._pending = self._widget.after_idle(self._run)
+
+    def flush(self) -> None:
+        """Выполняет отложенную перерисовку сразу (например, перед сохранением)."""
+        if self._pending is not None:
+            self.cancel()
+            self._run()
+
+    def cancel(self) -> None:
+        if self._pending is not None:
+            self._widget.after_cancel(self._pending)
+            self._pending = None
+
+    def _run(self) -> None:
+        self._pending = None
+        if not self._widget.winfo_exists():
+            return  # окно закрыли, пока перерисовка ждала очереди
+        start = time.perf_counter()
+        try:
+            self._callback()
+        finally:
+            self._last_end = time.perf_counter()
+            self._last_cost = self._last_end - start
+
+
+class GradientStrip(tk.Canvas):
+    """Полоса-градиент: цвета show() растягиваются на всю ширину полосы."""
+
+    HEIGHT = 6
+
+    def __init__(self, master: tk.Misc):
+        super().__init__(master, height=self.HEIGHT, highlightthickness=0, borderwidth=0)
+        self._colors: list[str] = []
+        self._image: tk.PhotoImage | None = None
+        self.bind("<Configure>", lambda _event: self._render())
+
+    def show(self, colors: list[str]) -> None:
+        """colors - HEX цвета слева направо."""
+        if colors != self._colors:
+            self._colors = colors
+            self._render()
+
+    def _render(self) -> None:
+        width = self.winfo_width()
+        if width <= 1 or not self._colors:
+            return  # еще не размещена
+        if self._image is None or self._image.width() != width:
+            self._image = tk.PhotoImage(master=self, width=width, height=self.HEIGHT)
+            self.delete("all")
+            self.create_image(0, 0, image=self._image, anchor=tk.NW)
+        count = len(self._colors)
+        row = " ".join(self._colors[x * count // width] for x in range(width))
+        # Одна строка пикселей, размноженная на всю высоту (put с to повторяет данные)
+        self._image.put("{" + row + "}", to=(0, 0, width, self.HEIGHT))
@@ -1,13 +1,15 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING
-import copy
+from typing import TYPE_CHECKING, Sequence
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog  # Импортируем ttk
+from tkinter import ttk, messagebox, filedialog, simpledialog  # Импортируем ttk
 from pathlib import Path
 
 from models import Swatch, ColorMode, SwatchType
 from models import Color
 from utils import get_version_from_pyproject
+from utils.instrumentation import instrumented
+from .grid_layout import GridLayout
+from .live_preview import PreviewScheduler, GradientStrip
 
 if TYPE_CHECKING:
     from controllers import SwatchController
@@ -19,6 +21,14 @@ class SwatchEditorView(tk.Tk):
     действия пользователя контроллеру. Не содержит бизнес-логики.
     """
 
+    # Сколько строк сверх видимой области держать отрисованными при прокрутке
+    OVERSCAN_ROWS = 2
+    # Сколько цветов в полосе-градиенте под ползунком канала в окне правки
+    GRADIENT_STEPS = 64
+    # На сколько пикселей сдвинуть мышь с нажатой кнопкой, чтобы начать выделение рамкой
+    DRAG_THRESHOLD = 4
+    SELECTION_OUTLINE = "#1e6fd9"
+
     def __init__(self):
         super().__init__()
         # Применяем тему ttk для современного вида.
@@ -40,17 +50,62 @@ class SwatchEditorView(tk.Tk):
             'text_width': 150
         }
 
-        self.swatches_to_display: list[Swatch] = []
+        self.grid_layout = GridLayout(**self.layout)
+
+        self.swatches_to_display: Sequence[Swatch] = []
+        self.swatch_ids: Sequence[int] = []
+        self.preview_colors: Sequence[str] | None = None  # HEX цвета ячеек; None - считаются по образцам
+        # Фильтр и группы: какие индексы модели показывать и в каком порядке (None - все).
+        # Отрицательный элемент -g - заголовок группы g, его подпись в group_headers.
+        # Ячейки сетки нумеруются позициями в этом списке, а не индексами модели.
+        self.display_indices: Sequence[int] | None = None
+        self.group_headers: dict[int, str] = {}
+        # id выделенных образцов (выделение хранит контроллер, View только показывает)
+        self.selected_ids: set[int] = set()
+        self._stats_window: tk.Toplevel | None = None
+        # Нажатие кнопки мыши на холсте: точка (в координатах содержимого) и рамка выделения
+        self._press: tuple[float, float] | None = None
+        self._band: int | None = None
+
+        # Виртуализация: элементы холста существуют только для видимых образцов
+        # и переиспользуются при прокрутке. Ключ - стабильный id образца из модели
+        # (для заголовка группы - отрицательный элемент списка), поэтому при
+        # вставке/удалении соседние ячейки только сдвигаются.
+        self._visible_items: dict[int, tuple[int, int]] = {}  # ключ ячейки -> (квадрат, подпись)
+        self._drawn_at: dict[int, int] = {}                   # ключ ячейки -> позиция в сетке, где размещена ячейка
+        self._free_items: list[tuple[int, int]] = []          # скрытые пары элементов для повторного использования
+        self._columns = 0
+        self._drawn_count = 0
 
         self.create_ui()
         self.canvas.bind("<Double-1>", self.on_double_click)
-        self.bind("<Configure>", lambda e: self.draw_swatches())
+        self.canvas.bind("<Button-1>", self.on_press)
+        self.canvas.bind("<B1-Motion>", self.on_drag)
+        self.canvas.bind("<ButtonRelease-1>", self.on_release)
+        self.canvas.bind("<Configure>", lambda e: self._refresh_visible())
 
     def set_controller(self, controller: SwatchController):
         """Связывает View с контроллером и завершает настройку GUI."""
         self.controller = controller
         # Теперь, когда контроллер гарантированно существует, создаем меню
         self.create_menu()
+        self.protocol("WM_DELETE_WINDOW", self.controller.close)
+        # Привязки к главному окну, а не bind_all: в окне редактирования образца не срабатывают
+        self.bind("<Control-z>", lambda e: self.controller.undo())
+        self.bind("<Control-y>", lambda e: self.controller.redo())
+        self.bind("<Control-w>", lambda e: self.controller.close_library())
+        self.bind("<Control-a>", self._grid_shortcut(self.controller.select_all))
+        self.bind("<Delete>", self._grid_shortcut(self.controller.delete_selection))
+        self.bind("<Escape>", self._grid_shortcut(self.controller.clear_selection))
+
+    def _grid_shortcut(self, action):
+        """Обработчик клавиши для сетки: в полях ввода клавиша работает как обычно."""
+        def handler(event):
+            if isinstance(event.widget, (tk.Entry, ttk.Entry)):
+                return None
+            action()
+            return "break"
+        return handler
 
     def create_menu(self):
         # tk.Menu не имеет прямого аналога в ttk и используется как есть
@@ -58,41 +113,272 @@ class SwatchEditorView(tk.Tk):
         file_menu = tk.Menu(menubar, tearoff=0)
         file_menu.add_command(label="New", command=self.controller.new_swatch_file)
         file_menu.add_command(label="Load", command=self.controller.load_ase_dialog)
+        file_menu.add_command(label="Open in New Tab...", command=self.controller.open_in_new_tab_dialog)
+        file_menu.add_command(label="Close Tab", accelerator="Ctrl+W", command=self.controller.close_library)
         file_menu.add_command(label="Save", command=self.controller.save_ase)
         file_menu.add_command(label="Save As...", command=self.controller.save_ase_as_dialog)
-        file_menu.add_command(label="Export Json", command=self.controller.export_json_dialog)
+        file_menu.add_separator()
+        file_menu.add_command(label="Import JSON...", command=self.controller.import_json_dialog)
+        export_menu = tk.Menu(file_menu, tearoff=0)
+        export_menu.add_command(label="Indented...", command=lambda: self.controller.export_json_dialog("indented"))
+        export_menu.add_command(label="Compact...", command=lambda: self.controller.export_json_dialog("compact"))
+        export_menu.add_command(label="NDJSON (one item per line)...",
+                                command=lambda: self.controller.export_json_dialog("ndjson"))
+        file_menu.add_cascade(label="Export JSON", menu=export_menu)
         menubar.add_cascade(label="File", menu=file_menu)
 
         edit_menu = tk.Menu(menubar, tearoff=0)
+        edit_menu.add_command(label="Undo", accelerator="Ctrl+Z", command=self.controller.undo)
+        edit_menu.add_command(label="Redo", accelerator="Ctrl+Y", command=self.controller.redo)
+        edit_menu.add_separator()
         edit_menu.add_command(label="Add", command=self.controller.add_swatch)
+        edit_menu.add_separator()
+        edit_menu.add_command(label="Find Duplicates...", command=self.controller.find_duplicates)
         menubar.add_cascade(label="Edit", menu=edit_menu)
 
+        # Пакетные правки выделенных образцов: каждая - одна запись в истории
+        select_menu = tk.Menu(menubar, tearoff=0)
+        select_menu.add_command(label="Select All", accelerator="Ctrl+A", command=self.controller.select_all)
+        select_menu.add_command(label="Select None", accelerator="Esc", command=self.controller.clear_selection)
+        select_menu.add_separator()
+        convert_menu = tk.Menu(select_menu, tearoff=0)
+        for mode in ColorMode:
+            convert_menu.add_command(label=mode.value, command=lambda m=mode: self.controller.convert_selection(m))
+        select_menu.add_cascade(label="Convert To", menu=convert_menu)
+        type_menu = tk.Menu(select_menu, tearoff=0)
+        for swatch_type in SwatchType:
+            type_menu.add_command(label=swatch_type.value,
+                                  command=lambda t=swatch_type: self.controller.set_selection_type(t))
+        select_menu.add_cascade(label="Set Type", menu=type_menu)
+        select_menu.add_command(label="Rename...", command=self.controller.rename_selection)
+        select_menu.add_command(label="Adjust Lightness...", command=self.controller.adjust_selection_lightness)
+        select_menu.add_command(label="Tint...", command=self.controller.tint_selection)
+        select_menu.add_separator()
+        select_menu.add_command(label="Delete", accelerator="Del", command=self.controller.delete_selection)
+        menubar.add_cascade(label="Selection", menu=select_menu)
+
+        if self.controller.is_profiling():
+            tools_menu = tk.Menu(menubar, tearoff=0)
+            tools_menu.add_command(label="Profiling Stats...", command=self.controller.show_profile_stats)
+            menubar.add_cascade(label="Tools", menu=tools_menu)
+
         self.config(menu=menubar)
 
     def create_ui(self):
         """Создает основные виджеты интерфейса."""
+        self.create_tab_bar()
+        self.create_filter_bar()
+        self.create_status_bar()
+
         # tk.Canvas также не имеет аналога в ttk
-        self.canvas = tk.Canvas(self, bg="white")
-        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas = tk.Canvas(self, bg="white", yscrollincrement=self.grid_layout.spacing_y)
+        scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        # Колесо мыши: Windows/macOS присылают <MouseWheel>, X11 - кнопки 4 и 5
+        self.canvas.bind("<MouseWheel>", lambda e: self._scroll_rows(-1 if e.delta > 0 else 1))
+        self.canvas.bind("<Button-4>", lambda e: self._scroll_rows(-1))
+        self.canvas.bind("<Button-5>", lambda e: self._scroll_rows(1))
+
+    def create_tab_bar(self):
+        """
+        Вкладки открытых библиотек. Сетка образцов одна на все вкладки,
+        поэтому страницы Notebook пустые - он служит только полосой вкладок.
+        """
+        self.tab_bar = ttk.Notebook(self, height=0)
+        self.tab_bar.pack(side=tk.TOP, fill=tk.X, padx=5, pady=(2, 0))
+        self.tab_bar.bind("<<NotebookTabChanged>>",
+                          lambda e: self.controller.select_library(self.tab_bar.index("current")))
+
+    def create_filter_bar(self):
+        """Поле фильтра по имени над сеткой. Каждое изменение текста сразу передается контроллеру."""
+        filter_bar = ttk.Frame(self, padding=(5, 2))
+        filter_bar.pack(side=tk.TOP, fill=tk.X)
+        ttk.Label(filter_bar, text="Filter:").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add('write', lambda *_: self.controller.filter_changed(self.filter_var.get()))
+        filter_entry = ttk.Entry(filter_bar, textvariable=self.filter_var)
+        filter_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        filter_entry.bind("<Escape>", lambda e: self.filter_var.set(""))
+
+    def create_status_bar(self):
+        """Строка состояния внизу окна: сообщение, прогресс фоновой операции и кнопка отмены."""
+        self.status_bar = ttk.Frame(self, padding=(5, 2))
+        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.status_var = tk.StringVar()
+        ttk.Label(self.status_bar, textvariable=self.status_var).pack(side=tk.LEFT)
+        self.cancel_button = ttk.Button(self.status_bar, text="Cancel",
+                                        command=lambda: self.controller.cancel_operation())
+        self.progress_bar = ttk.Progressbar(self.status_bar, orient=tk.HORIZONTAL, length=200, maximum=1.0)
+        self._progress_text = ""
 
     # --- Публичные методы, вызываемые Контроллером ---
 
-    def update_swatches(self, swatches: list[Swatch]):
-        """API для контроллера: обновить список образцов и перерисовать."""
+    def show_progress(self, text: str, cancellable: bool):
+        """API для контроллера: началась фоновая операция."""
+        self._progress_text = text
+        self.status_var.set(text + "...")
+        self.progress_bar.configure(value=0)
+        if cancellable:
+            self.cancel_button.pack(side=tk.RIGHT)
+        self.progress_bar.pack(side=tk.RIGHT, padx=5)
+
+    def update_progress(self, processed: int, total: int):
+        """API для контроллера: обработано processed блоков из total."""
+        self.progress_bar.configure(value=processed / total if total else 0)
+        self.status_var.set(f"{self._progress_text}: {processed} / {total}")
+
+    def hide_progress(self):
+        """API для контроллера: фоновая операция завершилась."""
+        self.progress_bar.pack_forget()
+        self.cancel_button.pack_forget()
+        self.status_var.set("")
+
+    def show_status(self, text: str):
+        """API для контроллера: короткое сообщение в строке состояния."""
+        self.status_var.set(text)
+
+
+    def update_swatches(self, swatches: Sequence[Swatch], swatch_ids: Sequence[int],
+                        display_indices: Sequence[int] | None = None,
+                        group_headers: dict[int, str] | None = None,
+                        preview_colors: Sequence[str] | None = None):
+        """
+        API для контроллера: показать новый список образцов (полная перерисовка).
+        View хранит ссылки на последовательности модели и не изменяет их.
+        display_indices - индексы модели, прошедшие фильтр, и заголовки групп
+        (None - показывать все); group_headers - подписи заголовков;
+        preview_colors - HEX цвета образцов (по умолчанию Color.to_hex).
+        """
         self.swatches_to_display = swatches
+        self.swatch_ids = swatch_ids
+        self.preview_colors = preview_colors
+        self.display_indices = display_indices
+        self.group_headers = group_headers or {}
         self.draw_swatches()
 
-    def update_title(self, file_path: str | None):
-        """API для контроллера: обновить заголовок окна."""
+    def set_display_indices(self, display_indices: Sequence[int] | None,
+                            group_headers: dict[int, str] | None = None, scroll_to_top: bool = False):
+        """
+        API для контроллера: сменить набор показываемых образцов (фильтр, свернутые группы).
+        Ячейки оставшихся образцов не перерисовываются, а только перемещаются;
+        заголовки групп перерисовываются, так как их подписи могли измениться.
+        """
+        self.display_indices = display_indices
+        self.group_headers = group_headers or {}
+        for key in [key for key in self._visible_items if key < 0]:
+            self._release_items(key)
+        if scroll_to_top:
+            self.canvas.yview_moveto(0)
+        self._refresh_visible()
+
+    def swatch_added(self, index: int):
+        """API для контроллера: образец вставлен в модель по индексу."""
+        self._refresh_visible()
+
+    def swatch_updated(self, index: int):
+        """API для контроллера: образец изменен. Перекрашивается только его ячейка, если она видна."""
+        swatch_id = self.swatch_ids[index]
+        if swatch_id in self._visible_items:
+            self._fill_cell(self._drawn_at[swatch_id])
+
+    def swatch_removed(self, index: int):
+        """API для контроллера: образец удален из модели. Его ячейка уходит в пул, соседние сдвигаются."""
+        self._refresh_visible()
+
+    def set_selection(self, swatch_ids: set[int]):
+        """API для контроллера: выделенные образцы (по id). Перекрашиваются только рамки видимых ячеек."""
+        self.selected_ids = swatch_ids
+        for key, (rect, _) in self._visible_items.items():
+            if key >= 0:
+                self._outline_cell(rect, key)
+
+    def update_library_tabs(self, titles: Sequence[str], active: int):
+        """API для контроллера: названия вкладок открытых библиотек и активная вкладка."""
+        tabs = self.tab_bar.tabs()
+        for tab in tabs[len(titles):]:
+            self.tab_bar.forget(tab)
+        for i, title in enumerate(titles):
+            if i < len(tabs):
+                self.tab_bar.tab(i, text=title)
+            else:
+                self.tab_bar.add(ttk.Frame(self.tab_bar), text=title)
+        if self.tab_bar.index("current") != active:
+            self.tab_bar.select(active)
+
+    def update_title(self, file_path: str | None, modified: bool = False):
+        """API для контроллера: обновить заголовок окна. modified - есть несохраненные правки."""
         title = f"Swatch Editor v{get_version_from_pyproject()} "
         if file_path:
             file_name = Path(file_path).name
             title += '[' + file_name + ']'
+        if modified:
+            title += ' *'
         self.title(title)
 
+    STATS_REFRESH_MS = 1000
+
+    def open_stats_window(self, cprofile: bool):
+        """
+        Окно замеров режима профилирования: таблица участков (обновляется раз в
+        секунду) и память процесса. cprofile - доступно сохранение статистики cProfile.
+        """
+        if self._stats_window is not None and self._stats_window.winfo_exists():
+            self._stats_window.lift()
+            return
+        win = self._stats_window = tk.Toplevel(self)
+        win.title("Profiling Stats")
+        win.geometry("640x360")
+
+        columns = ("calls", "total", "mean", "max", "peak")
+        headings = ("Calls", "Total, ms", "Mean, ms", "Max, ms", "Peak, MB")
+        tree = ttk.Treeview(win, columns=columns)
+        tree.heading("#0", text="Section")
+        tree.column("#0", width=200)
+        for column, heading in zip(columns, headings):
+            tree.heading(column, text=heading)
+            tree.column(column, width=80, anchor=tk.E)
+        memory_var = tk.StringVar()
+
+        buttons = ttk.Frame(win, padding=5)
+        buttons.pack(side=tk.BOTTOM, fill=tk.X)
+        ttk.Label(win, textvariable=memory_var, padding=(5, 2)).pack(side=tk.BOTTOM, anchor=tk.W)
+        tree.pack(fill=tk.BOTH, expand=True)
+
+        def refresh():
+            if not win.winfo_exists():
+                return
+            stats = self.controller.get_profile_stats()
+            tree.delete(*tree.get_children())
+            sections = sorted(stats["sections"].items(), key=lambda item: -item[1]["total_ms"])
+            for name, data in sections:
+                tree.insert("", tk.END, text=name, values=(
+                    data["calls"], f"{data['total_ms']:.1f}", f"{data['mean_ms']:.3f}",
+                    f"{data['max_ms']:.1f}", f"{data['peak_bytes'] / 2 ** 20:.1f}"))
+            memory = stats.get("memory")
+            memory_var.set(f"Traced memory: {memory['current_bytes'] / 2 ** 20:.1f} MB, "
+                           f"peak {memory['peak_bytes'] / 2 ** 20:.1f} MB" if memory else "Memory tracing is off")
+            win.after(self.STATS_REFRESH_MS, refresh)
+
+        def reset():
+            self.controller.reset_profile_stats()
+            tree.delete(*tree.get_children())
+
+        ttk.Button(buttons, text="Reset", command=reset).pack(side=tk.LEFT)
+        ttk.Button(buttons, text="Save JSON...",
+                   command=lambda: self.controller.save_profile_stats_dialog("json")).pack(side=tk.LEFT, padx=5)
+        if cprofile:
+            ttk.Button(buttons, text="Save cProfile...",
+                       command=lambda: self.controller.save_profile_stats_dialog("cprofile")).pack(side=tk.LEFT)
+        ttk.Button(buttons, text="Close", command=win.destroy).pack(side=tk.RIGHT)
+        refresh()
+
     def open_edit_window(self, idx: int, swatch_to_edit: Swatch):
         """Открывает окно редактирования с использованием виджетов ttk."""
-        temp_swatch = copy.deepcopy(swatch_to_edit)
+        # Модель отдает копию образца (см. SwatchModel.get_swatch), поэтому окно правит ее напрямую
+        temp_swatch = swatch_to_edit
 
         # --- Настройка окна ---
         self.update_idletasks()
@@ -101,7 +387,7 @@ class SwatchEditorView(tk.Tk):
         parent_w = self.winfo_width()
         parent_h = self.winfo_height()
         win_w = 400  # Немного шире для ttk виджетов
-        win_h = 350
+        win_h = 380
         x = parent_x + (parent_w - win_w) // 2
         y = parent_y + (parent_h - win_h) // 2
 
@@ -151,7 +437,28 @@ class SwatchEditorView(tk.Tk):
 
         type_var.trace_add('write', update_mode_menu)
 
+        # Предпросмотр (квадрат с цветом и полосы-градиенты под ползунками) пересчитывается
+        # не на каждое движение ползунка, а раз в кадр - см. PreviewScheduler.
+        # preview - виджеты текущего режима, их создает draw_color_inputs
+        preview = {}
+
+        def redraw_preview():
+            from models.color_engine import channel_gradients  # NumPy - только при открытии окна правки
+            try:
+                current_values = [float(var.get()) for var in preview['vars']]
+                temp_color = preview['class'](*current_values, is_normalized=False)
+            except (ValueError, TypeError):
+                return  # Игнорируем ошибки во время ввода
+            temp_swatch.color = temp_color
+            preview['square'].config(bg=temp_color.to_hex())
+            gradients = channel_gradients(temp_color.mode, temp_color.to_normalized(), self.GRADIENT_STEPS)
+            for strip, row in zip(preview['strips'], gradients.tolist()):
+                strip.show(['#%06x' % color for color in row])
+
+        scheduler = PreviewScheduler(win, redraw_preview)
+
         def draw_color_inputs(mode, values=None):
+            scheduler.cancel()
             for widget in color_labelframe.winfo_children():
                 widget.destroy()
 
@@ -166,16 +473,8 @@ class SwatchEditorView(tk.Tk):
             color_square.grid(row=0, column=3, rowspan=len(labels), padx=(10, 0), pady=2, sticky="ns")
 
             color_vars = []
-
-            def update_color_preview():
-                try:
-                    current_values = [float(var.get()) for var in color_vars]
-                    temp_color = color_class(*current_values, is_normalized=False)
-                    temp_swatch.color = temp_color
-                    hex_color = temp_color.to_hex()
-                    color_square.config(bg=hex_color)
-                except (ValueError, Exception):
-                    pass  # Игнорируем ошибки во время ввода
+            strips = []
+            preview.update({'class': color_class, 'vars': color_vars, 'square': color_square, 'strips': strips})
 
             for i, (label, rng) in enumerate(zip(labels, ranges)):
                 ttk.Label(color_labelframe, text=label + ":").grid(row=i, column=0, sticky="w", padx=2, pady=3)
@@ -184,8 +483,14 @@ class SwatchEditorView(tk.Tk):
                 entry_var = tk.StringVar(value=str(round(values[i])))
                 color_vars.append(entry_var)
 
-                scale = ttk.Scale(color_labelframe, from_=rng[0], to=rng[1], orient="horizontal", variable=scale_var)
-                scale.grid(row=i, column=1, padx=5, pady=3, sticky="ew")
+                # Ползунок и под ним полоса с цветами, которые он дает
+                scale_cell = ttk.Frame(color_labelframe)
+                scale_cell.grid(row=i, column=1, padx=5, pady=3, sticky="ew")
+                scale = ttk.Scale(scale_cell, from_=rng[0], to=rng[1], orient="horizontal", variable=scale_var)
+                scale.pack(fill="x")
+                strip = GradientStrip(scale_cell)
+                strip.pack(fill="x")
+                strips.append(strip)
 
                 entry = ttk.Entry(color_labelframe, textvariable=entry_var, width=5)
                 entry.grid(row=i, column=2, padx=(0, 5), pady=3, sticky="w")
@@ -193,15 +498,15 @@ class SwatchEditorView(tk.Tk):
                 # --- Логика синхронизации ---
                 def make_callbacks(s_var, e_var, current_range):
                     def scale_to_entry(*_):
+                        # Запись в поле вызовет entry_to_scale, он и запросит перерисовку
                         e_var.set(str(round(s_var.get())))
-                        update_color_preview()
 
                     def entry_to_scale(*_):
                         try:
                             val = float(e_var.get())
                             clamped_val = max(current_range[0], min(val, current_range[1]))
                             if s_var.get() != clamped_val: s_var.set(clamped_val)
-                            update_color_preview()
+                            scheduler.request()
                         except (ValueError, TypeError):
                             pass
 
@@ -211,11 +516,12 @@ class SwatchEditorView(tk.Tk):
                 scale.config(command=scale_cb)
                 entry_var.trace_add('write', entry_cb)
 
-            update_color_preview()
+            scheduler.request()
 
         def on_mode_change(*args):
             if temp_swatch.mode.value == mode_var.get(): return
             old_mode, new_mode = temp_swatch.mode, ColorMode(mode_var.get())
+            scheduler.flush()  # temp_swatch.color - с последним движением ползунка
             try:
                 new_color = temp_swatch.color.convert_to(new_mode)
                 temp_swatch.color, temp_swatch.mode = new_color, new_mode
@@ -231,6 +537,7 @@ class SwatchEditorView(tk.Tk):
         btn_frame.grid(row=4, column=0, columnspan=2, pady=(10, 0))
 
         def on_save():
+            scheduler.flush()
             temp_swatch.name = name_var.get()
             temp_swatch.type = SwatchType(type_var.get())
             self.controller.save_edited_swatch(idx, temp_swatch)
@@ -261,57 +568,225 @@ class SwatchEditorView(tk.Tk):
     def show_error(self, title, message):
         messagebox.showerror(title, message)
 
-    def ask_open_filename(self):
-        return filedialog.askopenfilename(filetypes=[("ASE files", "*.ase")])
+    def ask_yes_no(self, title, message) -> bool:
+        return messagebox.askyesno(title, message)
+
+    def ask_open_filename(self, ftypes=None):
+        return filedialog.askopenfilename(filetypes=ftypes or [("ASE files", "*.ase")])
 
     def ask_save_as_filename(self, ext, ftypes):
         return filedialog.asksaveasfilename(defaultextension=ext, filetypes=ftypes)
 
-    # --- Внутренние методы View ---
+    def ask_number(self, title, prompt, minvalue: float, maxvalue: float, initial: float = 0) -> float | None:
+        return simpledialog.askfloat(title, prompt, parent=self, minvalue=minvalue, maxvalue=maxvalue,
+                                     initialvalue=initial)
 
-    def draw_swatches(self):
-        self.canvas.delete("all")
-        if not self.swatches_to_display: return
-        spacing_x, spacing_y, cols = self._get_grid_params()
+    def ask_rename_pattern(self, count: int) -> tuple[str, str] | None:
+        """
+        Окно переименования выделенных образцов: регулярное выражение и замена
+        (синтаксис re.sub, \\1 - первая группа). Возвращает (выражение, замена) или None.
+        """
+        win = tk.Toplevel(self)
+        win.title(f"Rename {count} Swatches")
+        win.transient(self)
+        win.resizable(False, False)
+        frame = ttk.Frame(win, padding="10")
+        frame.pack(fill="both", expand=True)
+        pattern_var = tk.StringVar(value="^(.*)$")
+        replacement_var = tk.StringVar(value="\\1")
+        ttk.Label(frame, text="Find (regex):").grid(row=0, column=0, sticky="e", pady=2)
+        pattern_entry = ttk.Entry(frame, textvariable=pattern_var, width=30)
+        pattern_entry.grid(row=0, column=1, sticky="ew", pady=2)
+        ttk.Label(frame, text="Replace with:").grid(row=1, column=0, sticky="e", pady=2)
+        ttk.Entry(frame, textvariable=replacement_var, width=30).grid(row=1, column=1, sticky="ew", pady=2)
+        result = []
+
+        def on_ok(*_):
+            result.append((pattern_var.get(), replacement_var.get()))
+            win.destroy()
 
-        for index, sw in enumerate(self.swatches_to_display):
-            row, col = index // cols, index % cols
-            x = self.layout['padding_x'] + col * spacing_x
-            y = self.layout['padding_y'] + row * spacing_y
-            x2 = x + self.layout['swatch_size']
-            y2 = y + self.layout['swatch_size']
+        buttons = ttk.Frame(frame)
+        buttons.grid(row=2, column=0, columnspan=2, pady=(10, 0))
+        ttk.Button(buttons, text="Rename", command=on_ok).pack(side="left", padx=5)
+        ttk.Button(buttons, text="Cancel", command=win.destroy).pack(side="left", padx=5)
+        win.bind("<Return>", on_ok)
+        win.bind("<Escape>", lambda e: win.destroy())
+        pattern_entry.focus_set()
+        pattern_entry.select_range(0, tk.END)
+        win.grab_set()
+        win.wait_window()
+        return result[0] if result else None
 
-            try:
-                hex_color = sw.color.to_hex()
-            except Exception as e:
-                print(f"⚠️ Ошибка в цвете {sw.name}: {e}")
-                hex_color = "#888888"
+    # --- Внутренние методы View ---
 
-            self.canvas.create_rectangle(x, y, x2, y2, fill=hex_color, outline="black", width=1)
-            self.canvas.create_text(x2 + self.layout['text_gap'], y + self.layout['swatch_size'] // 2,
-                                    text=sw.name, anchor='w', font=("Arial", 12))
+    @instrumented("view.redraw")
+    def draw_swatches(self):
+        """Перерисовывает видимую часть сетки после смены списка образцов."""
+        for key in list(self._visible_items):
+            self._release_items(key)
+        self._columns = 0  # заставляет пересчитать scrollregion
+        self._refresh_visible()
+
+    @instrumented("view.refresh_visible")
+    def _refresh_visible(self):
+        """
+        Сравнивает видимую область с уже отрисованными ячейками (по id образцов):
+        новые ячейки берутся из пула и заполняются, ушедшие - скрываются и
+        возвращаются в пул, сдвинутые - только перемещаются.
+        """
+        count = self._display_count()
+        cols = self.grid_layout.columns(self.canvas.winfo_width())
+        relayout = cols != self._columns
+        if relayout or count != self._drawn_count:
+            self._columns, self._drawn_count = cols, count
+            self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(),
+                                                self.grid_layout.content_height(count, cols)))
+
+        visible = self.grid_layout.visible_range(self.canvas.canvasy(0), self.canvas.winfo_height(),
+                                                 count, cols, self.OVERSCAN_ROWS)
+        wanted = {self._cell_key(position): position for position in visible}
+        for key in [key for key in self._visible_items if key not in wanted]:
+            self._release_items(key)
+        for key, position in wanted.items():
+            if key not in self._visible_items:
+                self._visible_items[key] = self._acquire_items()
+                self._place_cell(position)
+                self._fill_cell(position)
+            elif relayout or self._drawn_at[key] != position:
+                self._place_cell(position)
+
+    def _display_count(self) -> int:
+        if self.display_indices is None:
+            return len(self.swatches_to_display)
+        return len(self.display_indices)
+
+    def _model_index(self, position: int) -> int:
+        """Индекс образца в модели по позиции ячейки в сетке (отрицательный - заголовок группы)."""
+        if self.display_indices is None:
+            return position
+        return self.display_indices[position]
+
+    def _cell_key(self, position: int) -> int:
+        """Ключ ячейки: id образца или отрицательный элемент заголовка группы."""
+        index = self._model_index(position)
+        return index if index < 0 else self.swatch_ids[index]
+
+    def _acquire_items(self) -> tuple[int, int]:
+        if self._free_items:
+            return self._free_items.pop()
+        rect = self.canvas.create_rectangle(0, 0, 0, 0, outline="black", width=1)
+        text = self.canvas.create_text(0, 0, anchor='w', font=("Arial", 12))
+        return rect, text
+
+    def _release_items(self, key: int):
+        items = self._visible_items.pop(key)
+        del self._drawn_at[key]
+        for item in items:
+            self.canvas.itemconfigure(item, state=tk.HIDDEN)
+        self._free_items.append(items)
+
+    def _place_cell(self, position: int):
+        """Перемещает элементы ячейки в позицию сетки."""
+        key = self._cell_key(position)
+        rect, text = self._visible_items[key]
+        x, y = self.grid_layout.cell_origin(position, self._columns)
+        size = self.grid_layout.swatch_size
+        self.canvas.coords(rect, x, y, x + size, y + size)
+        self.canvas.coords(text, x + size + self.grid_layout.text_gap, y + size // 2)
+        self._drawn_at[key] = position
+
+    @instrumented("view.fill_cell")
+    def _fill_cell(self, position: int):
+        """Заполняет элементы ячейки в позиции сетки данными образца."""
+        index = self._model_index(position)
+        if index < 0:
+            # Заголовок группы: серый квадрат и подпись со стрелкой и числом образцов
+            rect, text = self._visible_items[index]
+            self.canvas.itemconfigure(rect, fill="#dddddd", outline="black", width=1, state=tk.NORMAL)
+            self.canvas.itemconfigure(text, text=self.group_headers.get(index, ""), state=tk.NORMAL)
+            return
+        sw = self.swatches_to_display[index]
+        rect, text = self._visible_items[self.swatch_ids[index]]
+
+        try:
+            hex_color = self.preview_colors[index] if self.preview_colors is not None else sw.color.to_hex()
+        except Exception as e:
+            print(f"⚠️ Ошибка в цвете {sw.name}: {e}")
+            hex_color = "#888888"
+
+        self.canvas.itemconfigure(rect, fill=hex_color, state=tk.NORMAL)
+        self.canvas.itemconfigure(text, text=sw.name, state=tk.NORMAL)
+        self._outline_cell(rect, self.swatch_ids[index])
+
+    def _outline_cell(self, rect: int, swatch_id: int):
+        if swatch_id in self.selected_ids:
+            self.canvas.itemconfigure(rect, outline=self.SELECTION_OUTLINE, width=3)
+        else:
+            self.canvas.itemconfigure(rect, outline="black", width=1)
+
+    def _on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        self._refresh_visible()
+
+    def _scroll_rows(self, rows: int):
+        self.canvas.yview_scroll(rows, "units")
+        self._refresh_visible()
+
+    # --- Мышь: щелчок выделяет образец или сворачивает группу, протяжка - выделение рамкой ---
+
+    def on_press(self, event):
+        self.canvas.focus_set()  # чтобы Ctrl+A и Delete относились к сетке, а не к полю фильтра
+        self._press = (self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+
+    def on_drag(self, event):
+        if self._press is None:
+            return
+        x0, y0 = self._press
+        x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        if self._band is None:
+            if abs(x - x0) < self.DRAG_THRESHOLD and abs(y - y0) < self.DRAG_THRESHOLD:
+                return
+            self._band = self.canvas.create_rectangle(x0, y0, x, y, outline=self.SELECTION_OUTLINE, dash=(4, 2))
+        self.canvas.coords(self._band, x0, y0, x, y)
+
+    def on_release(self, event):
+        if self._press is None:
+            return
+        x0, y0 = self._press
+        self._press = None
+        toggle = bool(event.state & 0x0004)  # Ctrl
+        extend = bool(event.state & 0x0001)  # Shift
+        if self._band is not None:
+            self.canvas.delete(self._band)
+            self._band = None
+            x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+            positions = self.grid_layout.indices_in_rect(x0, y0, x, y, self._display_count(),
+                                                         self.grid_layout.columns(self.canvas.winfo_width()))
+            indices = [index for index in map(self._model_index, positions) if index >= 0]
+            self.controller.select_swatches(indices, add=toggle or extend)
+            return
+        entry = self._entry_at(event.x, event.y)
+        if entry is None:
+            if not (toggle or extend):
+                self.controller.clear_selection()
+        elif entry < 0:
+            self.controller.toggle_group(-entry)
+        else:
+            self.controller.click_swatch(entry, toggle=toggle, extend=extend)
 
     def on_double_click(self, event):
         idx = self.get_swatch_index_at(event.x, event.y)
         if idx is not None:
             self.controller.edit_swatch(idx)
 
-    def _get_grid_params(self):
-        spacing_x = self.layout['swatch_size'] + self.layout['text_gap'] + self.layout['text_width']
-        spacing_y = self.layout['swatch_size'] + self.layout['padding_y']
-        width = self.winfo_width()
-        cols = max(1, width // spacing_x)
-        return spacing_x, spacing_y, cols
-
     def get_swatch_index_at(self, x, y):
-        spacing_x, spacing_y, cols = self._get_grid_params()
-        if x < self.layout['padding_x'] or y < self.layout['padding_y']: return None
-        col = (x - self.layout['padding_x']) // spacing_x
-        row = (y - self.layout['padding_y']) // spacing_y
-        idx = row * cols + col
-        if 0 <= idx < len(self.swatches_to_display):
-            # Проверяем, что клик был в пределах высоты квадрата
-            relative_y = (y - self.layout['padding_y']) % spacing_y
-            if relative_y < self.layout['swatch_size']:
-                return idx
-        return None
+        """Индекс образца в модели под точкой (координаты события холста), с учетом прокрутки и фильтра."""
+        entry = self._entry_at(x, y)
+        return None if entry is None or entry < 0 else entry
+
+    def _entry_at(self, x, y) -> int | None:
+        """Элемент списка показа под точкой: индекс образца или заголовок группы (< 0)."""
+        cols = self.grid_layout.columns(self.canvas.winfo_width())
+        position = self.grid_layout.index_at(self.canvas.canvasx(x), self.canvas.canvasy(y),
+                                             self._display_count(), cols)
+        return None if position is None else self._model_index(position)